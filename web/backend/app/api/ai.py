@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import Dict, Any, Optional
-from pydantic import BaseModel
-from app.services.ai_text import rewrite_text
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from contextlib import aclosing
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field
+from app.services.ai_text import rewrite_text, rewrite_texts, stream_rewrite_text, get_rewrite_provider_stats
+from app.services.rewrite_cache import rewrite_cache
+from app.services.token_budget import trim_to_length
+from app.core.openai_client import openai_client
 from app.core.config import settings
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/ai",
@@ -14,6 +23,7 @@ class TextRewriteRequest(BaseModel):
     text: str
     style: Optional[str] = "engaging"
     max_length: Optional[int] = None
+    force_refresh: bool = False
 
 class TextRewriteResponse(BaseModel):
     original: str
@@ -34,7 +44,8 @@ async def rewrite_content(request: TextRewriteRequest):
     rewritten = await rewrite_text(
         text=request.text,
         style=request.style,
-        max_length=max_length
+        max_length=max_length,
+        force_refresh=request.force_refresh
     )
     
     if not rewritten:
@@ -47,4 +58,134 @@ async def rewrite_content(request: TextRewriteRequest):
         original=request.text,
         rewritten=rewritten,
         character_count=len(rewritten)
-    ) 
\ No newline at end of file
+    )
+
+class BatchRewriteRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1)
+    style: Optional[str] = "engaging"
+    max_length: Optional[int] = None
+    force_refresh: bool = False
+
+class BatchRewriteItem(BaseModel):
+    index: int
+    original: str
+    rewritten: Optional[str] = None
+    character_count: int = 0
+    success: bool
+
+class BatchRewriteResponse(BaseModel):
+    results: List[BatchRewriteItem]
+    succeeded: int
+    failed: int
+
+@router.post("/rewrite/batch", response_model=BatchRewriteResponse)
+async def rewrite_content_batch(request: BatchRewriteRequest):
+    """
+    Rewrite several scenes at once. Scenes are packed into as few completions
+    as possible; results are returned in input order.
+    """
+    if len(request.texts) > settings.REWRITE_BATCH_MAX_TEXTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.REWRITE_BATCH_MAX_TEXTS} texts can be rewritten per request",
+        )
+    
+    # Apply free tier character limit if no subscription
+    max_length = request.max_length or settings.FREE_TIER_MAX_CHARS
+    
+    rewritten = await rewrite_texts(
+        texts=request.texts,
+        style=request.style,
+        max_length=max_length,
+        force_refresh=request.force_refresh
+    )
+    
+    results = [
+        BatchRewriteItem(
+            index=index,
+            original=original,
+            rewritten=text,
+            character_count=len(text) if text else 0,
+            success=text is not None,
+        )
+        for index, (original, text) in enumerate(zip(request.texts, rewritten))
+    ]
+    succeeded = sum(1 for result in results if result.success)
+    return BatchRewriteResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/rewrite/stream")
+async def rewrite_content_stream(request: TextRewriteRequest, http_request: Request):
+    """
+    Rewrite text like /rewrite, streaming the rewrite as server-sent events.
+    Emits "token" events ({"text": ...}) as text is generated, then one "done"
+    event with the full rewrite and its character_count, or an "error" event.
+    Generation stops when the client disconnects.
+    """
+    if not request.text or not request.text.strip():
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Failed to rewrite the text. Please try again with different content.",
+        )
+    
+    # Apply free tier character limit if no subscription
+    max_length = request.max_length or settings.FREE_TIER_MAX_CHARS
+    
+    async def events():
+        parts = []
+        deltas = stream_rewrite_text(
+            text=request.text,
+            style=request.style,
+            max_length=max_length,
+            force_refresh=request.force_refresh
+        )
+        try:
+            # aclosing stops the upstream completion as soon as we return early
+            async with aclosing(deltas):
+                async for delta in deltas:
+                    if await http_request.is_disconnected():
+                        logger.debug("Client disconnected, cancelling rewrite stream")
+                        return
+                    parts.append(delta)
+                    yield sse_event("token", {"text": delta})
+        except Exception as e:
+            logger.error(f"Error streaming rewrite: {str(e)}")
+            yield sse_event("error", {"detail": "Failed to rewrite the text. Please try again with different content."})
+            return
+        
+        rewritten = trim_to_length("".join(parts), max_length)
+        if not rewritten:
+            logger.error("Rewrite stream produced no text")
+            yield sse_event("error", {"detail": "Failed to rewrite the text. Please try again with different content."})
+            return
+        yield sse_event("done", {
+            "original": request.text,
+            "rewritten": rewritten,
+            "character_count": len(rewritten),
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_rewrite_cache_stats():
+    """
+    Return hit/miss counters for the rewrite cache.
+    """
+    return rewrite_cache.stats()
+
+@router.get("/client/stats", response_model=Dict[str, Any])
+async def get_openai_client_stats():
+    """
+    Return in-flight, queued and retry counters for the shared OpenAI client.
+    """
+    return {
+        **openai_client.stats(),
+        "rewrite_provider": get_rewrite_provider_stats(),
+    }
\ No newline at end of file
@@ -1,7 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import Dict, Any
-from pydantic import HttpUrl
-from app.services.content_retrieval import extract_url_content
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, HttpUrl
+from app.services.content_retrieval import (
+    extract_url_content,
+    extract_urls,
+    iter_extract_urls,
+    iter_reddit_listing,
+    RedditListingError,
+    reddit_listing_request,
+    content_cache_key,
+    get_inflight_stats,
+)
+from app.services.content_cache import content_cache
+from app.services.rate_limiter import rate_limiter
+from app.services.handler_registry import handler_registry
+from app.services.url_preview import preview_service
+from app.core.config import settings
+import httpx
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/content",
@@ -22,27 +42,162 @@ async def extract_content(url: HttpUrl):
         )
     return content
 
+class BatchExtractRequest(BaseModel):
+    urls: List[HttpUrl]
+    concurrency: Optional[int] = None
+    stream: bool = False
+
+class BatchExtractItem(BaseModel):
+    index: int
+    url: str
+    success: bool
+    content: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchExtractResponse(BaseModel):
+    results: List[BatchExtractItem]
+    succeeded: int
+    failed: int
+
+@router.post("/extract/batch", response_model=BatchExtractResponse)
+async def extract_content_batch(request: BatchExtractRequest):
+    """
+    Extract content from several URLs concurrently.
+    Results are returned in input order with a per-URL error for failures.
+    With stream=true, each result is sent as an NDJSON line as soon as it completes.
+    """
+    if not request.urls:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one URL is required",
+        )
+    if len(request.urls) > settings.CONTENT_BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"A batch can contain at most {settings.CONTENT_BATCH_MAX_URLS} URLs",
+        )
+    
+    urls = [str(url) for url in request.urls]
+    concurrency = min(request.concurrency or settings.CONTENT_BATCH_CONCURRENCY, settings.CONTENT_BATCH_CONCURRENCY)
+    
+    if request.stream:
+        async def ndjson_lines():
+            async for result in iter_extract_urls(urls, concurrency):
+                yield json.dumps(result) + "\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    
+    results = await extract_urls(urls, concurrency)
+    succeeded = sum(1 for result in results if result["success"])
+    return BatchExtractResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+    )
+
+@router.get("/listing")
+async def stream_reddit_listing(
+    url: Optional[HttpUrl] = None,
+    subreddit: Optional[str] = None,
+    sort: str = "hot",
+    time: Optional[str] = None,
+    query: Optional[str] = None,
+    limit: int = 25,
+    min_score: Optional[int] = None,
+    media_type: Optional[List[str]] = Query(None),
+    include_nsfw: bool = False,
+):
+    """
+    Stream the posts of a subreddit or Reddit search as NDJSON, one normalized post per line.
+    Pass either a listing URL or a subreddit (with optional sort, time filter and search query).
+    The last line is {"done": true, "count": n} when the listing ended, or
+    {"error": ..., "count": n} when it was cut off.
+    """
+    try:
+        listing_url, params = reddit_listing_request(
+            url=str(url) if url else None,
+            subreddit=subreddit,
+            sort=sort,
+            time_filter=time,
+            query=query,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    posts = iter_reddit_listing(
+        listing_url,
+        params=params,
+        max_posts=max(1, min(limit, settings.REDDIT_LISTING_MAX_POSTS)),
+        min_score=min_score,
+        media_types=media_type,
+        include_nsfw=include_nsfw,
+    )
+    
+    async def ndjson_lines():
+        # The last line says whether the listing ended or was cut off,
+        # since the response status has already been sent
+        count = 0
+        try:
+            async for post in posts:
+                yield json.dumps(post) + "\n"
+                count += 1
+        except (RedditListingError, httpx.HTTPError) as e:
+            yield json.dumps({"error": str(e) or type(e).__name__, "count": count}) + "\n"
+            return
+        except Exception as e:
+            logger.error(f"Error streaming Reddit listing {listing_url}: {str(e)}")
+            yield json.dumps({"error": "Failed to stream the listing", "count": count}) + "\n"
+            return
+        yield json.dumps({"done": True, "count": count}) + "\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @router.get("/preview", response_model=Dict[str, Any])
-async def preview_url(url: HttpUrl):
+async def preview_url(url: HttpUrl, response: Response):
     """
-    Generate a preview for a URL (thumbnail, title, description)
+    Generate a preview card for a URL (title, thumbnail, author, subreddit, platform).
+    Uses Reddit's /api/info.json or oEmbed where possible instead of a full extraction.
     """
-    content = await extract_url_content(str(url))
-    if not content:
+    preview = await preview_service.get_preview(str(url))
+    if not preview:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail="Unable to generate preview for the provided URL",
         )
     
-    # Return a simplified preview format
-    preview = {
-        "title": content.get("title", "No title available"),
-        "description": content.get("selftext", content.get("description", "No description available")),
-        "thumbnail": content.get("thumbnail_url") or content.get("preview_image"),
-        "author": content.get("author"),
-        "subreddit": content.get("subreddit"),
-        "platform": content.get("platform", "unknown"),
-        "url": str(url)
+    response.headers["Cache-Control"] = preview_service.cache_control(preview.pop("fetched_at"))
+    return preview
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def get_cache_stats():
+    """
+    Return hit/miss counters for the extracted content cache and in-flight extractions.
+    """
+    return {
+        **content_cache.stats(),
+        "singleflight": get_inflight_stats(),
+        "preview": preview_service.stats(),
     }
-    
-    return preview 
\ No newline at end of file
+
+@router.delete("/cache", response_model=Dict[str, Any])
+async def invalidate_cached_content(url: HttpUrl):
+    """
+    Remove a URL from the extracted content cache so the next request re-fetches it.
+    """
+    key = content_cache_key(str(url))
+    removed = await content_cache.invalidate(key)
+    return {"url": key, "invalidated": removed}
+
+@router.get("/rate-limits", response_model=Dict[str, Any])
+async def get_rate_limits():
+    """
+    Return the current per-domain rate limiter state (rate, tokens, backoff, 429 counts).
+    """
+    return rate_limiter.stats()
+
+@router.get("/handlers", response_model=Dict[str, Any])
+async def get_content_handlers():
+    """
+    Return the registered content handlers with their settings and counters.
+    """
+    return handler_registry.stats()
\ No newline at end of file
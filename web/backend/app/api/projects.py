@@ -8,6 +8,10 @@ from bson import ObjectId
 import motor.motor_asyncio
 from fastapi.responses import JSONResponse
 from app.services.video_processing import video_processor
+from app.services.media_ingestion import ingest_scene_media, scene_media_urls
+from app.services.scene_refresher import stamp_scene_sources
+from app.core.config import settings
+from pymongo import UpdateOne
 import uuid
 import asyncio
 import logging
@@ -46,6 +50,9 @@ class ProcessProjectResponse(BaseModel):
 # Simple in-memory task storage for project processing
 project_processing_tasks = {}
 
+# Simple in-memory task storage for scene media ingestion
+media_ingestion_tasks = {}
+
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED, response_class=MongoJSONResponse)
 async def create_project(project: ProjectCreate = Body(...)):
     """
@@ -59,6 +66,8 @@ async def create_project(project: ProjectCreate = Body(...)):
         # Add timestamps
         project_dict["created_at"] = datetime.utcnow()
         project_dict["updated_at"] = project_dict["created_at"]
+        # Scenes were just fetched from their sources; schedule their first refresh
+        stamp_scene_sources(project_dict.get("scenes") or [], project_dict["created_at"])
         
         # Insert project document
         if not db.is_mock:
@@ -275,6 +284,7 @@ async def update_project(project_id: str, project_update: ProjectCreate = Body(.
     
     update_data = project_update.model_dump(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
+    stamp_scene_sources(update_data.get("scenes") or [], update_data["updated_at"])
     
     if not db.is_mock:
         result = await db.client[db.db_name].projects.update_one(
@@ -443,6 +453,94 @@ async def get_project_processing_status(project_id: str, task_id: str):
         "error": task_info.get("error")
     }
 
+@router.post("/{project_id}/ingest-media", response_model=ProcessProjectResponse)
+async def ingest_project_media(project_id: str, background_tasks: BackgroundTasks):
+    """
+    Copy every scene's remote media (media_url, gallery_items, preview_images)
+    into storage so renders don't have to fetch it from the source again.
+    """
+    try:
+        obj_id = ObjectId(project_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid project ID format")
+    
+    if db.is_mock:
+        raise HTTPException(status_code=503, detail="Media ingestion requires a database connection")
+    
+    project = await db.client[db.db_name].projects.find_one({"_id": obj_id}, {"_id": 1})
+    if not project:
+        raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
+    
+    task_id = str(uuid.uuid4())
+    media_ingestion_tasks[task_id] = {
+        "status": "queued",
+        "project_id": project_id
+    }
+    background_tasks.add_task(ingest_project_media_background, task_id=task_id, project_id=project_id)
+    
+    return ProcessProjectResponse(
+        task_id=task_id,
+        message="Media ingestion started. Check status with the /ingest-media/{task_id} endpoint."
+    )
+
+@router.get("/{project_id}/ingest-media/{task_id}", response_model=Dict[str, Any])
+async def get_media_ingestion_status(project_id: str, task_id: str):
+    """
+    Get the status of a scene media ingestion task.
+    """
+    task_info = media_ingestion_tasks.get(task_id)
+    if not task_info or task_info["project_id"] != project_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    return {"task_id": task_id, **task_info}
+
+async def ingest_project_media_background(task_id: str, project_id: str):
+    """
+    Background process that ingests scene media and records the stored objects on each scene.
+    """
+    task_info = media_ingestion_tasks[task_id]
+    try:
+        task_info["status"] = "processing"
+        obj_id = ObjectId(project_id)
+        mongo_db = db.get_db()
+        project = await mongo_db.projects.find_one({"_id": obj_id}, {"scenes": 1})
+        scenes = (project or {}).get("scenes", [])
+        
+        # One semaphore for the whole project so large galleries can't flood the network
+        semaphore = asyncio.Semaphore(settings.MEDIA_INGEST_CONCURRENCY)
+        results = await asyncio.gather(*(ingest_scene_media(scene, semaphore) for scene in scenes))
+        
+        # Targeted per-scene $set; matching on the scene URL skips scenes that moved meanwhile
+        updates = []
+        stored = deduplicated = failed = 0
+        for index, (scene, fields) in enumerate(zip(scenes, results)):
+            urls = scene_media_urls(scene)
+            requested = (1 if urls["media_url"] else 0) + len(urls["gallery_items"]) + len(urls["preview_images"])
+            records = [record for record in [fields["stored_media"]] + fields["stored_gallery_items"] + fields["stored_preview_images"] if record]
+            stored += len(records)
+            deduplicated += sum(1 for record in records if record["deduplicated"])
+            failed += requested - len(records)
+            updates.append(UpdateOne(
+                {"_id": obj_id, f"scenes.{index}.url": scene.get("url")},
+                {"$set": {f"scenes.{index}.{field}": value for field, value in fields.items()}}
+            ))
+        if updates:
+            await mongo_db.projects.bulk_write(updates, ordered=False)
+        
+        task_info.update({
+            "status": "completed",
+            "scenes": len(scenes),
+            "stored": stored,
+            "deduplicated": deduplicated,
+            "failed": failed,
+        })
+    except Exception as e:
+        logger.error(f"Error ingesting media for project {project_id}: {str(e)}")
+        task_info["status"] = "failed"
+        task_info["error"] = str(e)
+
 async def process_project_background(task_id: str, project_id: str, mode: str):
     """
     Background process to handle project video creation.
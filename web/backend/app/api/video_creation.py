@@ -3,7 +3,8 @@ from typing import Dict, Any, Optional
 from pydantic import BaseModel, HttpUrl
 from app.services.content_retrieval import extract_url_content
 from app.services.ai_text import rewrite_text
-from app.services.voice_generation import generate_voice
+from app.services.voice_generation import generate_voice_with_timings
+from app.services.tts_cache import tts_cache
 from app.services.video_processing import video_processor
 from app.core.config import settings
 import uuid
@@ -19,6 +20,8 @@ class CreateVideoRequest(BaseModel):
     title: str
     voice_id: Optional[str] = "default"
     text_style: Optional[str] = "engaging"
+    # Synthesize the voice again instead of reusing cached audio
+    force_refresh_voice: bool = False
 
 class CreateVideoResponse(BaseModel):
     task_id: str
@@ -59,7 +62,8 @@ async def create_video(request: CreateVideoRequest, background_tasks: Background
         source_url=str(request.source_url),
         title=request.title,
         voice_id=request.voice_id,
-        text_style=request.text_style
+        text_style=request.text_style,
+        force_refresh_voice=request.force_refresh_voice
     )
     
     return CreateVideoResponse(
@@ -88,12 +92,20 @@ async def get_video_status(task_id: str):
         error=task_info.get("error")
     )
 
+@router.get("/voice-cache/stats", response_model=Dict[str, Any])
+async def get_voice_cache_stats():
+    """
+    Return hit/miss counters and the size of the synthesized voice cache.
+    """
+    return await tts_cache.stats()
+
 async def process_video_creation(
     task_id: str,
     source_url: str,
     title: str,
     voice_id: str,
-    text_style: str
+    text_style: str,
+    force_refresh_voice: bool = False
 ):
     """
     Background process to handle video creation.
@@ -129,16 +141,21 @@ async def process_video_creation(
         video_tasks[task_id]["status"] = "generating_voice"
         
         # 3. Generate voice audio
-        voice_path = await generate_voice(
+        voice = await generate_voice_with_timings(
             text=rewritten_text,
-            voice_id=voice_id
+            voice_id=voice_id,
+            force_refresh=force_refresh_voice
         )
         
-        if not voice_path:
+        if not voice:
             video_tasks[task_id]["status"] = "failed"
             video_tasks[task_id]["error"] = "Failed to generate voice audio"
             return
         
+        voice_path = voice["path"]
+        # Per-scene offsets, used as timing hints when assembling the video
+        video_tasks[task_id]["voice_scenes"] = voice["scenes"]
+        
         # Update status
         video_tasks[task_id]["status"] = "creating_video"
         
@@ -0,0 +1,69 @@
+import time
+import copy
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with a per-entry time-to-live.
+    Values are deep-copied on the way in and out so callers can't mutate cached data.
+    """
+
+    def __init__(self, max_size: int = 1024, default_ttl: float = 600.0):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """
+        Store a value. Expiry comes from expires_at (epoch seconds) if given,
+        otherwise from ttl or the cache default.
+        """
+        if expires_at is None:
+            expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self._entries[key] = (expires_at, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """Remove an entry. Returns True if it existed."""
+        return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,10 +1,31 @@
 import os
+import logging
+from typing import Dict
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+def parse_int_mapping(value: str) -> Dict[str, int]:
+    """
+    Parse a "key=number,key=number" setting into a dictionary.
+    Keys are lower-cased; malformed entries are skipped with a warning.
+    """
+    mapping = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        key, _, number = entry.partition('=')
+        try:
+            mapping[key.strip().lower()] = int(number)
+        except ValueError:
+            logger.warning(f"Ignoring invalid setting entry: {entry}")
+    return mapping
+
 class Settings(BaseModel):
     # API Settings
     API_V1_STR: str = "/api/v1"
@@ -15,9 +36,39 @@ class Settings(BaseModel):
     
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_REWRITE_MODEL: str = os.getenv("OPENAI_REWRITE_MODEL", "gpt-3.5-turbo")
+    # Optional second model used for hedge requests and while the primary's circuit is open
+    OPENAI_FALLBACK_MODEL: str = os.getenv("OPENAI_FALLBACK_MODEL", "")
+    # Hedge requests fire once the primary is slower than this percentile of its recent latency
+    REWRITE_HEDGE_PERCENTILE: float = float(os.getenv("REWRITE_HEDGE_PERCENTILE", "0.95"))
+    REWRITE_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("REWRITE_HEDGE_MIN_DELAY_SECONDS", "2.0"))
+    # Circuit breaker around the rewrite provider
+    REWRITE_BREAKER_WINDOW_SECONDS: float = float(os.getenv("REWRITE_BREAKER_WINDOW_SECONDS", "60"))
+    REWRITE_BREAKER_MIN_REQUESTS: int = int(os.getenv("REWRITE_BREAKER_MIN_REQUESTS", "10"))
+    REWRITE_BREAKER_FAILURE_RATE: float = float(os.getenv("REWRITE_BREAKER_FAILURE_RATE", "0.5"))
+    REWRITE_BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("REWRITE_BREAKER_SLOW_CALL_SECONDS", "20"))
+    REWRITE_BREAKER_OPEN_SECONDS: float = float(os.getenv("REWRITE_BREAKER_OPEN_SECONDS", "30"))
+    REWRITE_BREAKER_HALF_OPEN_PROBES: int = int(os.getenv("REWRITE_BREAKER_HALF_OPEN_PROBES", "1"))
+    # Rewrite inputs are truncated to this many tokens; max_tokens is derived from
+    # max_length and capped at REWRITE_MAX_OUTPUT_TOKENS
+    REWRITE_MAX_INPUT_TOKENS: int = int(os.getenv("REWRITE_MAX_INPUT_TOKENS", "3000"))
+    REWRITE_MAX_OUTPUT_TOKENS: int = int(os.getenv("REWRITE_MAX_OUTPUT_TOKENS", "1000"))
+    # Shared AsyncOpenAI client: per-call timeout, overall deadline including retries,
+    # and a cap on completions in flight at once
+    OPENAI_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+    OPENAI_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+    OPENAI_DEADLINE_SECONDS: float = float(os.getenv("OPENAI_DEADLINE_SECONDS", "60"))
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "16"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+    OPENAI_BACKOFF_BASE_SECONDS: float = float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", "0.5"))
+    OPENAI_BACKOFF_MAX_SECONDS: float = float(os.getenv("OPENAI_BACKOFF_MAX_SECONDS", "20"))
     
     # ElevenLabs
     ELEVENLABS_API_KEY: str = os.getenv("ELEVENLABS_API_KEY", "")
+    ELEVENLABS_BASE_URL: str = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+    ELEVENLABS_MODEL_ID: str = os.getenv("ELEVENLABS_MODEL_ID", "eleven_multilingual_v2")
+    ELEVENLABS_DEFAULT_VOICE_ID: str = os.getenv("ELEVENLABS_DEFAULT_VOICE_ID", "21m00Tcm4TlvDq8N1ALF")
     
     # Cloudflare R2
     R2_ACCOUNT_ID: str = os.getenv("R2_ACCOUNT_ID", "")
@@ -29,6 +80,97 @@ class Settings(BaseModel):
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID", "")
     GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
     
+    # Outbound HTTP client (shared connection pool for content extraction)
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30.0"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10.0"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30.0"))
+    # Comma-separated "host=size" pairs, e.g. "www.reddit.com=20,i.redd.it=10"
+    HTTP_HOST_POOL_SIZES: str = os.getenv("HTTP_HOST_POOL_SIZES", "www.reddit.com=20")
+    HTTP_ENABLE_HTTP2: bool = os.getenv("HTTP_ENABLE_HTTP2", "false").lower() == "true"
+    
+    # Reddit session cookies are re-primed after this many seconds
+    REDDIT_SESSION_TTL_SECONDS: float = float(os.getenv("REDDIT_SESSION_TTL_SECONDS", "3600"))
+    
+    # Extracted content cache (in-process LRU + MongoDB "extracted_content" collection)
+    CONTENT_CACHE_ENABLED: bool = os.getenv("CONTENT_CACHE_ENABLED", "true").lower() == "true"
+    CONTENT_CACHE_MAX_ENTRIES: int = int(os.getenv("CONTENT_CACHE_MAX_ENTRIES", "1000"))
+    CONTENT_CACHE_TTL_SECONDS: int = int(os.getenv("CONTENT_CACHE_TTL_SECONDS", "600"))
+    # Comma-separated "domain=seconds" overrides of the TTLs declared by content handlers
+    CONTENT_CACHE_DOMAIN_TTLS: str = os.getenv("CONTENT_CACHE_DOMAIN_TTLS", "")
+    # How long stale entries are kept for conditional (ETag / Last-Modified) revalidation
+    CONTENT_CACHE_STALE_SECONDS: int = int(os.getenv("CONTENT_CACHE_STALE_SECONDS", "86400"))
+    
+    # Outbound rate limiting (per-domain token buckets, requests per minute)
+    RATE_LIMIT_DEFAULT_RPM: int = int(os.getenv("RATE_LIMIT_DEFAULT_RPM", "300"))
+    # Comma-separated "domain=requests_per_minute" overrides of the limits declared by content handlers
+    RATE_LIMIT_DOMAIN_RPM: str = os.getenv("RATE_LIMIT_DOMAIN_RPM", "")
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "5"))
+    RATE_LIMIT_MAX_RETRIES: int = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+    RATE_LIMIT_BACKOFF_BASE_SECONDS: float = float(os.getenv("RATE_LIMIT_BACKOFF_BASE_SECONDS", "1.0"))
+    RATE_LIMIT_BACKOFF_MAX_SECONDS: float = float(os.getenv("RATE_LIMIT_BACKOFF_MAX_SECONDS", "30.0"))
+    
+    # Generic (non-Reddit) page extraction stops reading after this many bytes
+    GENERIC_EXTRACT_MAX_BYTES: int = int(os.getenv("GENERIC_EXTRACT_MAX_BYTES", "524288"))
+    
+    # Batch extraction (POST /content/extract/batch)
+    CONTENT_BATCH_MAX_URLS: int = int(os.getenv("CONTENT_BATCH_MAX_URLS", "50"))
+    CONTENT_BATCH_CONCURRENCY: int = int(os.getenv("CONTENT_BATCH_CONCURRENCY", "8"))
+    
+    # Upper bound on posts streamed by a single /content/listing request
+    REDDIT_LISTING_MAX_POSTS: int = int(os.getenv("REDDIT_LISTING_MAX_POSTS", "500"))
+    
+    # Video render size, used to pick the smallest sufficient image variant
+    RENDER_TARGET_WIDTH: int = int(os.getenv("RENDER_TARGET_WIDTH", "1080"))
+    RENDER_TARGET_HEIGHT: int = int(os.getenv("RENDER_TARGET_HEIGHT", "1920"))
+    
+    # Link previews (GET /content/preview), cached apart from full extractions
+    PREVIEW_CACHE_MAX_ENTRIES: int = int(os.getenv("PREVIEW_CACHE_MAX_ENTRIES", "2000"))
+    PREVIEW_CACHE_TTL_SECONDS: int = int(os.getenv("PREVIEW_CACHE_TTL_SECONDS", "3600"))
+    PREVIEW_STALE_WHILE_REVALIDATE_SECONDS: int = int(os.getenv("PREVIEW_STALE_WHILE_REVALIDATE_SECONDS", "86400"))
+    PREVIEW_THUMBNAIL_WIDTH: int = int(os.getenv("PREVIEW_THUMBNAIL_WIDTH", "640"))
+    
+    # Background refresh of saved scenes' source data (scores, signed media URLs)
+    SCENE_REFRESH_ENABLED: bool = os.getenv("SCENE_REFRESH_ENABLED", "true").lower() == "true"
+    SCENE_REFRESH_INTERVAL_SECONDS: int = int(os.getenv("SCENE_REFRESH_INTERVAL_SECONDS", "900"))
+    SCENE_REFRESH_MAX_AGE_SECONDS: int = int(os.getenv("SCENE_REFRESH_MAX_AGE_SECONDS", "21600"))
+    # Scenes whose signed media URLs expire within this window are refreshed early
+    SCENE_REFRESH_EXPIRY_MARGIN_SECONDS: int = int(os.getenv("SCENE_REFRESH_EXPIRY_MARGIN_SECONDS", "7200"))
+    SCENE_REFRESH_BATCH_SIZE: int = int(os.getenv("SCENE_REFRESH_BATCH_SIZE", "500"))
+    # Failed refreshes back off exponentially from the retry delay up to the max backoff;
+    # the retry delay is also the shortest gap between two refreshes of a scene
+    SCENE_REFRESH_RETRY_SECONDS: int = int(os.getenv("SCENE_REFRESH_RETRY_SECONDS", "1800"))
+    SCENE_REFRESH_MAX_BACKOFF_SECONDS: int = int(os.getenv("SCENE_REFRESH_MAX_BACKOFF_SECONDS", str(7 * 24 * 3600)))
+    
+    # Text rewrite cache (in-process LRU + MongoDB "rewrite_cache" collection)
+    REWRITE_CACHE_ENABLED: bool = os.getenv("REWRITE_CACHE_ENABLED", "true").lower() == "true"
+    REWRITE_CACHE_MAX_ENTRIES: int = int(os.getenv("REWRITE_CACHE_MAX_ENTRIES", "2000"))
+    REWRITE_CACHE_TTL_SECONDS: int = int(os.getenv("REWRITE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    
+    # Upper bound on scenes per POST /ai/rewrite/batch request
+    REWRITE_BATCH_MAX_TEXTS: int = int(os.getenv("REWRITE_BATCH_MAX_TEXTS", "100"))
+    
+    # Text-to-speech streaming
+    TTS_TIMEOUT_SECONDS: float = float(os.getenv("TTS_TIMEOUT_SECONDS", "60"))
+    TTS_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("TTS_CONNECT_TIMEOUT_SECONDS", "5"))
+    TTS_MAX_CONCURRENCY: int = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+    # Scripts are synthesized in sentence chunks of up to this many characters
+    TTS_CHUNK_MAX_CHARS: int = int(os.getenv("TTS_CHUNK_MAX_CHARS", "400"))
+    
+    # Content-addressed cache of synthesized speech in storage
+    TTS_CACHE_ENABLED: bool = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+    
+    # In-process audio duration/frame index cache
+    AUDIO_PROBE_CACHE_MAX_ENTRIES: int = int(os.getenv("AUDIO_PROBE_CACHE_MAX_ENTRIES", "512"))
+    AUDIO_PROBE_CACHE_TTL_SECONDS: int = int(os.getenv("AUDIO_PROBE_CACHE_TTL_SECONDS", str(24 * 3600)))
+    
+    # Scene media ingestion into storage
+    MEDIA_INGEST_MAX_BYTES: int = int(os.getenv("MEDIA_INGEST_MAX_BYTES", str(200 * 1024 * 1024)))
+    MEDIA_INGEST_CHUNK_SIZE: int = int(os.getenv("MEDIA_INGEST_CHUNK_SIZE", "65536"))
+    MEDIA_INGEST_CONCURRENCY: int = int(os.getenv("MEDIA_INGEST_CONCURRENCY", "4"))
+    
     # Frontend URL (for CORS)
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
     
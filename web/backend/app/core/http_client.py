@@ -0,0 +1,108 @@
+import httpx
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from app.core.config import settings, parse_int_mapping
+
+logger = logging.getLogger(__name__)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+    Returns the delay in seconds, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def http2_available() -> bool:
+    """Return True if the optional 'h2' package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class HTTPClientManager:
+    """
+    Owns the application-lifetime httpx.AsyncClient used for outbound requests.
+    Reusing one client keeps connections alive between extractions so we don't
+    pay DNS, TCP and TLS setup on every URL.
+    """
+    client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        """Create a pooled client from the current settings."""
+        use_http2 = settings.HTTP_ENABLE_HTTP2
+        if use_http2 and not http2_available():
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, falling back to HTTP/1.1")
+            use_http2 = False
+
+        timeout = httpx.Timeout(
+            settings.HTTP_TIMEOUT_SECONDS,
+            connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        )
+        limits = httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
+        # Give busy hosts their own pool so they can't starve other domains
+        mounts = {}
+        for host, size in parse_int_mapping(settings.HTTP_HOST_POOL_SIZES).items():
+            host_limits = httpx.Limits(
+                max_connections=size,
+                max_keepalive_connections=size,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            )
+            mounts[f"all://{host}"] = httpx.AsyncHTTPTransport(limits=host_limits, http2=use_http2)
+
+        logger.debug(f"Creating shared HTTP client (http2={use_http2}, host pools={list(mounts)})")
+        return httpx.AsyncClient(
+            timeout=timeout,
+            limits=limits,
+            http2=use_http2,
+            mounts=mounts,
+        )
+
+    async def start(self):
+        """
+        Create the shared client. Called once on application startup.
+        """
+        if self.client is None or self.client.is_closed:
+            self.client = self._build_client()
+            logger.info("Shared HTTP client started")
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        Returns the shared client, creating it on demand when used outside
+        the application lifecycle (scripts, tests).
+        """
+        if self.client is None or self.client.is_closed:
+            logger.debug("Shared HTTP client not started, creating it on demand")
+            self.client = self._build_client()
+        return self.client
+
+    async def close(self):
+        """
+        Close the shared client and release pooled connections.
+        """
+        if self.client and not self.client.is_closed:
+            await self.client.aclose()
+            logger.info("Shared HTTP client closed")
+        self.client = None
+
+http_client = HTTPClientManager()
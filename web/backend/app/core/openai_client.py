@@ -0,0 +1,255 @@
+import httpx
+import openai
+import asyncio
+import logging
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from openai import AsyncOpenAI
+from app.core.config import settings
+from app.core.http_client import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+DURATION_PART_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse OpenAI's x-ratelimit-reset-* durations ("20ms", "1s", "6m0s") into seconds.
+    """
+    if not value:
+        return None
+    parts = DURATION_PART_PATTERN.findall(value.strip())
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+def retry_delay_from_headers(headers: Optional[httpx.Headers]) -> Optional[float]:
+    """
+    How long the API asked us to wait: retry-after-ms, retry-after, or
+    the longer of the request/token reset windows.
+    """
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+    retry_after = parse_retry_after(headers.get("retry-after"))
+    if retry_after is not None:
+        return retry_after
+    resets = [
+        parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+        parse_reset_duration(headers.get("x-ratelimit-reset-tokens")),
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+class OpenAIClientManager:
+    """
+    Owns the application-lifetime AsyncOpenAI client.
+    The client gets its own pooled httpx client and per-call timeouts; a
+    semaphore caps in-flight completions so bursts queue locally instead of
+    turning into a wave of 429s, and retries use jittered backoff that
+    honors the API's rate-limit headers.
+    """
+    client: Optional[AsyncOpenAI] = None
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def _build_client(self) -> AsyncOpenAI:
+        """Create the client with a pooled transport from the current settings."""
+        timeout = httpx.Timeout(
+            settings.OPENAI_TIMEOUT_SECONDS,
+            connect=settings.OPENAI_CONNECT_TIMEOUT_SECONDS,
+        )
+        limits = httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        return AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=timeout,
+            # Retries are handled here so they share the concurrency cap and deadline
+            max_retries=0,
+            http_client=httpx.AsyncClient(timeout=timeout, limits=limits),
+        )
+
+    async def start(self):
+        """
+        Create the shared client. Called once on application startup.
+        """
+        if self.client is None or self.client.is_closed():
+            self.client = self._build_client()
+            logger.info("OpenAI client started")
+
+    def get_client(self) -> AsyncOpenAI:
+        """
+        Returns the shared client, creating it on demand when used outside
+        the application lifecycle (scripts, tests).
+        """
+        if self.client is None or self.client.is_closed():
+            logger.debug("OpenAI client not started, creating it on demand")
+            self.client = self._build_client()
+        return self.client
+
+    async def close(self):
+        """
+        Close the shared client and release pooled connections.
+        """
+        if self.client and not self.client.is_closed():
+            await self.client.close()
+            logger.info("OpenAI client closed")
+        self.client = None
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """
+        Delay before retrying: what the API's headers ask for if present,
+        otherwise full-jitter exponential backoff.
+        """
+        response = getattr(error, "response", None)
+        delay = retry_delay_from_headers(response.headers if response is not None else None)
+        if delay is not None:
+            # A little jitter so queued callers don't all retry in the same instant
+            return min(settings.OPENAI_BACKOFF_MAX_SECONDS, delay + random.uniform(0, settings.OPENAI_BACKOFF_BASE_SECONDS))
+        return random.uniform(0, min(settings.OPENAI_BACKOFF_MAX_SECONDS, settings.OPENAI_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the OPENAI_MAX_CONCURRENCY in-flight completion slots."""
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.requests += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    async def chat_completion(self, **kwargs) -> Any:
+        """
+        Create a chat completion under the concurrency cap, retrying rate-limit,
+        timeout, connection and 5xx errors until OPENAI_MAX_RETRIES or the
+        overall OPENAI_DEADLINE_SECONDS is reached.
+
+        Args:
+            **kwargs: Arguments for client.chat.completions.create
+
+        Returns:
+            The completion response
+
+        Raises:
+            openai.OpenAIError: The last error once retries are exhausted
+        """
+        client = self.get_client()
+        deadline = time.monotonic() + settings.OPENAI_DEADLINE_SECONDS
+        call_timeout = kwargs.pop("timeout", settings.OPENAI_TIMEOUT_SECONDS)
+        attempt = 0
+        while True:
+            try:
+                async with self.slot():
+                    # Never let one attempt run past the overall deadline
+                    timeout = max(1.0, min(call_timeout, deadline - time.monotonic()))
+                    return await client.chat.completions.create(timeout=timeout, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.rate_limited += 1
+                # The slot is released while backing off so other calls can proceed
+                delay = self.backoff_delay(attempt, e)
+                if attempt >= settings.OPENAI_MAX_RETRIES or time.monotonic() + delay > deadline:
+                    self.failures += 1
+                    raise
+                logger.warning(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.2f}s (attempt {attempt + 1}/{settings.OPENAI_MAX_RETRIES})")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+            except openai.OpenAIError:
+                self.failures += 1
+                raise
+
+    async def stream_chat_completion(self, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a chat completion's content deltas under the concurrency cap.
+        Errors before the first delta are retried like chat_completion; once
+        text has been yielded a failure is raised to the caller. Closing the
+        generator (e.g. when an SSE client disconnects) closes the upstream
+        response so the model stops generating.
+
+        Args:
+            **kwargs: Arguments for client.chat.completions.create (stream is set here)
+
+        Yields:
+            Content deltas as they arrive
+        """
+        client = self.get_client()
+        deadline = time.monotonic() + settings.OPENAI_DEADLINE_SECONDS
+        call_timeout = kwargs.pop("timeout", settings.OPENAI_TIMEOUT_SECONDS)
+        attempt = 0
+        started = False
+        while True:
+            try:
+                async with self.slot():
+                    timeout = max(1.0, min(call_timeout, deadline - time.monotonic()))
+                    stream = await client.chat.completions.create(stream=True, timeout=timeout, **kwargs)
+                    try:
+                        async for chunk in stream:
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                started = True
+                                yield delta
+                    finally:
+                        await stream.close()
+                return
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    self.rate_limited += 1
+                delay = self.backoff_delay(attempt, e)
+                if started or attempt >= settings.OPENAI_MAX_RETRIES or time.monotonic() + delay > deadline:
+                    self.failures += 1
+                    raise
+                logger.warning(f"OpenAI stream failed ({type(e).__name__}), retrying in {delay:.2f}s (attempt {attempt + 1}/{settings.OPENAI_MAX_RETRIES})")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+            except openai.OpenAIError:
+                self.failures += 1
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Return concurrency and retry counters."""
+        return {
+            "max_concurrency": settings.OPENAI_MAX_CONCURRENCY,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+        }
+
+openai_client = OpenAIClientManager()
@@ -3,6 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.core.database import db, MongoJSONEncoder
+from app.core.http_client import http_client
+from app.services.content_cache import content_cache
+from app.services.rewrite_cache import rewrite_cache
+from app.services.tts_cache import tts_cache
+from app.core.openai_client import openai_client
+from app.services.scene_refresher import scene_refresher
 from app.api import users, videos, content, ai, video_creation, projects
 import logging
 import json
@@ -69,6 +75,26 @@ async def startup_db_client():
     await db.connect()
     logger.debug(f"Database connected. Mock mode: {db.is_mock}")
     logger.debug(f"Using database: {db.db_name}")
+    await content_cache.ensure_indexes()
+    await rewrite_cache.ensure_indexes()
+    await tts_cache.ensure_indexes()
+    await scene_refresher.ensure_indexes()
+    scene_refresher.start()
+
+@app.on_event("startup")
+async def startup_http_client():
+    logger.debug("Starting shared HTTP client...")
+    await http_client.start()
+
+@app.on_event("startup")
+async def startup_openai_client():
+    logger.debug("Starting OpenAI client...")
+    await openai_client.start()
+
+@app.on_event("shutdown")
+async def shutdown_scene_refresher():
+    logger.debug("Stopping scene refresher...")
+    await scene_refresher.stop()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
@@ -76,6 +102,16 @@ async def shutdown_db_client():
     await db.close()
     logger.debug("Database connection closed")
 
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    logger.debug("Shutting down shared HTTP client...")
+    await http_client.close()
+
+@app.on_event("shutdown")
+async def shutdown_openai_client():
+    logger.debug("Shutting down OpenAI client...")
+    await openai_client.close()
+
 @app.get("/", response_class=CustomJSONResponse)
 async def root():
     return {"message": "Welcome to Auto Shorts API"}
@@ -1,17 +1,151 @@
-import openai
 from app.core.config import settings
+from app.core.openai_client import openai_client
 import logging
-from typing import Optional
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.services.rewrite_cache import rewrite_cache, rewrite_cache_key
+from app.services.token_budget import count_tokens, truncate_to_tokens, completion_token_budget, trim_to_length
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED
 
 logger = logging.getLogger(__name__)
 
-# Set up OpenAI API key
-openai.api_key = settings.OPENAI_API_KEY
+# Batch rewrites pack several scenes into one completion, up to these limits
+REWRITE_BATCH_MAX_SCENES = 12
+REWRITE_BATCH_MAX_INPUT_TOKENS = 4000
+# Output tokens per scene for the JSON wrapper around each rewrite
+REWRITE_BATCH_JSON_OVERHEAD_TOKENS = 20
+REWRITE_BATCH_MAX_OUTPUT_TOKENS = 4096
+
+# Bump whenever the prompt changes so cached rewrites from the old prompt aren't reused
+REWRITE_PROMPT_VERSION = "1"
+
+# Tracks the primary rewrite model's error rate and latency; while open,
+# rewrites fail fast (or go straight to the fallback model)
+rewrite_breaker = CircuitBreaker(
+    "openai-rewrite",
+    window_seconds=settings.REWRITE_BREAKER_WINDOW_SECONDS,
+    min_requests=settings.REWRITE_BREAKER_MIN_REQUESTS,
+    failure_rate=settings.REWRITE_BREAKER_FAILURE_RATE,
+    slow_call_seconds=settings.REWRITE_BREAKER_SLOW_CALL_SECONDS,
+    open_seconds=settings.REWRITE_BREAKER_OPEN_SECONDS,
+    half_open_probes=settings.REWRITE_BREAKER_HALF_OPEN_PROBES,
+)
+
+_hedge_stats = {"hedged": 0, "fallback_wins": 0, "fallback_only": 0}
+
+async def _primary_completion(hedge_state: Optional[Dict[str, bool]] = None, **kwargs) -> Any:
+    """
+    Call the primary model, recording the outcome on the circuit breaker.
+    hedge_state["lost"] is set by complete_rewrite when the hedge answered
+    first, so the cancelled call is recorded as slow rather than dropped.
+    """
+    start = time.monotonic()
+    try:
+        response = await openai_client.chat_completion(model=settings.OPENAI_REWRITE_MODEL, **kwargs)
+    except asyncio.CancelledError:
+        if hedge_state and hedge_state.get("lost"):
+            rewrite_breaker.record_slow(time.monotonic() - start)
+        else:
+            rewrite_breaker.release()
+        raise
+    except Exception:
+        rewrite_breaker.record_failure()
+        raise
+    rewrite_breaker.record_success(time.monotonic() - start)
+    return response
+
+async def complete_rewrite(**kwargs) -> Tuple[Any, bool]:
+    """
+    Run a rewrite completion against the primary model behind the circuit breaker.
+    When OPENAI_FALLBACK_MODEL is set, a hedge request goes to it once the
+    primary is slower than its recent REWRITE_HEDGE_PERCENTILE latency, and
+    the first successful answer wins. The fallback is also used directly when
+    the primary fails or its circuit is open.
+    
+    Args:
+        **kwargs: Arguments for the completion, without the model
+        
+    Returns:
+        Tuple of (completion response, whether the fallback model produced it)
+        
+    Raises:
+        CircuitOpenError: If the circuit is open and there is no fallback model
+    """
+    fallback_model = settings.OPENAI_FALLBACK_MODEL
+    if not rewrite_breaker.allow():
+        if not fallback_model:
+            raise CircuitOpenError(f"Rewrite provider circuit is {rewrite_breaker.state}")
+        _hedge_stats["fallback_only"] += 1
+        return await openai_client.chat_completion(model=fallback_model, **kwargs), True
+    
+    if not fallback_model:
+        return await _primary_completion(**kwargs), False
+    
+    hedge_state = {"lost": False}
+    primary = asyncio.ensure_future(_primary_completion(hedge_state, **kwargs))
+    hedge_delay = max(
+        settings.REWRITE_HEDGE_MIN_DELAY_SECONDS,
+        rewrite_breaker.latency_percentile(settings.REWRITE_HEDGE_PERCENTILE) or 0.0,
+    )
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done and primary.exception() is None:
+            return primary.result(), False
+        
+        if done:
+            logger.warning(f"Primary rewrite model failed ({primary.exception()}), using fallback model")
+        else:
+            _hedge_stats["hedged"] += 1
+            logger.debug(f"Primary rewrite model slower than {hedge_delay:.2f}s, sending hedge request")
+        fallback = asyncio.ensure_future(openai_client.chat_completion(model=fallback_model, **kwargs))
+        tasks.append(fallback)
+        
+        pending = {task for task in tasks if not task.done()}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is fallback:
+                        _hedge_stats["fallback_wins"] += 1
+                        hedge_state["lost"] = True
+                    return task.result(), task is fallback
+        # Both failed; report the primary's error
+        raise primary.exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+def get_rewrite_provider_stats() -> Dict[str, Any]:
+    """Return circuit breaker state and hedging counters for the rewrite provider."""
+    return {
+        "primary_model": settings.OPENAI_REWRITE_MODEL,
+        "fallback_model": settings.OPENAI_FALLBACK_MODEL or None,
+        "circuit": rewrite_breaker.stats(),
+        **_hedge_stats,
+    }
+
+def build_rewrite_messages(text: str, style: str, max_length: Optional[int]) -> List[Dict[str, str]]:
+    """Build the chat messages for a rewrite request."""
+    # Construct prompt based on style and length constraints
+    prompt = f"Rewrite the following text in an {style} style"
+    if max_length:
+        prompt += f" with a maximum of {max_length} characters"
+    prompt += " for a short-form video. Keep the essential information but make it more engaging:\n\n"
+    return [
+        {"role": "system", "content": "You are a content writer specializing in short-form videos."},
+        {"role": "user", "content": prompt + text}
+    ]
 
 async def rewrite_text(
     text: str, 
     style: str = "engaging",
-    max_length: Optional[int] = None
+    max_length: Optional[int] = None,
+    force_refresh: bool = False
 ) -> Optional[str]:
     """
     Rewrite text using OpenAI's GPT model to make it more engaging for short videos.
@@ -20,35 +154,285 @@ async def rewrite_text(
         text: The original text to rewrite
         style: Style for the rewritten text (e.g., engaging, humorous, professional)
         max_length: Maximum character length for the rewritten text
+        force_refresh: Skip the rewrite cache and generate a new rewrite
         
     Returns:
         The rewritten text or None if rewriting failed
     """
     if not text or not text.strip():
         return None
-        
+    
+    model = settings.OPENAI_REWRITE_MODEL
+    cache_key = rewrite_cache_key(text, style, max_length, model, REWRITE_PROMPT_VERSION)
+    if force_refresh:
+        rewrite_cache.record_bypass()
+    else:
+        cached = await rewrite_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Rewrite cache hit for {cache_key}")
+            return cached
+    return await _rewrite_uncached(text, style, max_length, model, cache_key)
+
+async def _rewrite_uncached(text: str, style: str, max_length: Optional[int], model: str, cache_key: str) -> Optional[str]:
+    """Rewrite one text with a completion and cache the result, without looking in the cache first."""
     try:
-        # Construct prompt based on style and length constraints
-        prompt = f"Rewrite the following text in an {style} style"
-        if max_length:
-            prompt += f" with a maximum of {max_length} characters"
-        prompt += " for a short-form video. Keep the essential information but make it more engaging:\n\n"
-        
-        # Create completion with OpenAI
-        response = await openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a content writer specializing in short-form videos."},
-                {"role": "user", "content": prompt + text}
-            ],
-            max_tokens=1000,
+        # Create completion behind the circuit breaker, with the input and
+        # output sized to what the character limit needs
+        response, used_fallback = await complete_rewrite(
+            messages=build_rewrite_messages(truncate_to_tokens(text, settings.REWRITE_MAX_INPUT_TOKENS, model), style, max_length),
+            max_tokens=completion_token_budget(max_length),
             temperature=0.7,
         )
         
-        # Extract and return the rewritten text
-        rewritten_text = response.choices[0].message.content.strip()
+        # Extract the rewritten text and enforce the character limit locally
+        rewritten_text = trim_to_length(response.choices[0].message.content or "", max_length)
+        # Fallback-model rewrites aren't cached so the primary model gets another chance next time
+        if rewritten_text and not used_fallback:
+            await rewrite_cache.set(cache_key, rewritten_text, model, style, max_length)
         return rewritten_text
         
     except Exception as e:
         logger.error(f"Error rewriting text with OpenAI: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
+
+async def stream_rewrite_text(
+    text: str,
+    style: str = "engaging",
+    max_length: Optional[int] = None,
+    force_refresh: bool = False
+) -> AsyncIterator[str]:
+    """
+    Rewrite text like rewrite_text, yielding the rewrite as it is generated.
+    A cached rewrite is yielded in one piece. Generation stops once the text
+    passes max_length; the complete rewrite, trimmed with trim_to_length, is
+    cached once the stream finishes and an abandoned stream caches nothing.
+    
+    Args:
+        text: The original text to rewrite
+        style: Style for the rewritten text (e.g., engaging, humorous, professional)
+        max_length: Maximum character length for the rewritten text
+        force_refresh: Skip the rewrite cache and generate a new rewrite
+        
+    Yields:
+        Pieces of the rewritten text
+        
+    Raises:
+        openai.OpenAIError: If the completion fails
+    """
+    if not text or not text.strip():
+        return
+    
+    model = settings.OPENAI_REWRITE_MODEL
+    cache_key = rewrite_cache_key(text, style, max_length, model, REWRITE_PROMPT_VERSION)
+    if force_refresh:
+        rewrite_cache.record_bypass()
+    else:
+        cached = await rewrite_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    if not rewrite_breaker.allow():
+        raise CircuitOpenError(f"Rewrite provider circuit is {rewrite_breaker.state}")
+    
+    parts = []
+    length = 0
+    start = time.monotonic()
+    try:
+        deltas = openai_client.stream_chat_completion(
+            model=model,
+            messages=build_rewrite_messages(truncate_to_tokens(text, settings.REWRITE_MAX_INPUT_TOKENS, model), style, max_length),
+            max_tokens=completion_token_budget(max_length),
+            temperature=0.7,
+        )
+        # Closing the inner generator when we stop early (or are closed ourselves)
+        # closes the upstream stream and frees its concurrency slot right away
+        async with aclosing(deltas):
+            async for delta in deltas:
+                # Don't send the model's leading whitespace
+                if not parts:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                    # Time to first token is what matters for a stream
+                    rewrite_breaker.record_success(time.monotonic() - start)
+                parts.append(delta)
+                length += len(delta)
+                yield delta
+                if max_length and length > max_length:
+                    # Anything further would be trimmed anyway
+                    break
+    except (asyncio.CancelledError, GeneratorExit):
+        if not parts:
+            rewrite_breaker.release()
+        raise
+    except Exception:
+        if not parts:
+            rewrite_breaker.record_failure()
+        raise
+    if not parts:
+        rewrite_breaker.record_failure()
+    
+    rewritten_text = trim_to_length("".join(parts), max_length)
+    if rewritten_text:
+        await rewrite_cache.set(cache_key, rewritten_text, model, style, max_length)
+
+def build_batch_rewrite_messages(texts: List[str], style: str, max_length: Optional[int]) -> List[Dict[str, str]]:
+    """Build the chat messages for rewriting several scenes in one completion."""
+    prompt = f"Rewrite each of the following scenes in an {style} style"
+    if max_length:
+        prompt += f", each with a maximum of {max_length} characters"
+    prompt += (
+        " for a short-form video. Keep the essential information but make it more engaging.\n"
+        'Reply with a JSON object of the form {"rewrites": [{"id": <scene id>, "text": "<rewritten scene>"}]} '
+        "containing one entry per scene.\n\n"
+    )
+    scenes = json.dumps([{"id": i, "text": text} for i, text in enumerate(texts)], ensure_ascii=False)
+    return [
+        {"role": "system", "content": "You are a content writer specializing in short-form videos."},
+        {"role": "user", "content": prompt + scenes}
+    ]
+
+def parse_batch_rewrites(content: str, count: int, max_length: Optional[int]) -> List[Optional[str]]:
+    """
+    Parse a batch completion back into per-scene rewrites, trimming each to max_length.
+    Entries that are missing or empty come back as None.
+    """
+    results: List[Optional[str]] = [None] * count
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        logger.warning("Batch rewrite returned invalid JSON")
+        return results
+    
+    entries = data.get("rewrites") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return results
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index, text = entry.get("id"), entry.get("text")
+        # Models sometimes echo ids back as strings ("3")
+        if isinstance(index, str) and index.strip().isdigit():
+            index = int(index)
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < count or not isinstance(text, str):
+            continue
+        text = trim_to_length(text, max_length)
+        if text:
+            results[index] = text
+    return results
+
+def batch_output_tokens(max_length: Optional[int]) -> int:
+    """Output tokens one scene needs in a batch completion: its rewrite plus the JSON around it."""
+    return completion_token_budget(max_length) + REWRITE_BATCH_JSON_OVERHEAD_TOKENS
+
+def _pack_batches(indexes: List[int], texts: List[str], model: str, max_length: Optional[int] = None) -> List[List[int]]:
+    """
+    Group scene indexes into batches bounded by scene count, input tokens
+    and output tokens. A batch whose rewrites can't fit in
+    REWRITE_BATCH_MAX_OUTPUT_TOKENS would come back as truncated JSON and
+    lose every scene in it.
+    """
+    output_tokens = batch_output_tokens(max_length)
+    batches, current, size = [], [], 0
+    for index in indexes:
+        length = count_tokens(texts[index], model)
+        if current and (
+            len(current) >= REWRITE_BATCH_MAX_SCENES
+            or size + length > REWRITE_BATCH_MAX_INPUT_TOKENS
+            or (len(current) + 1) * output_tokens > REWRITE_BATCH_MAX_OUTPUT_TOKENS
+        ):
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += length
+    if current:
+        batches.append(current)
+    return batches
+
+async def _rewrite_batch(texts: List[str], style: str, max_length: Optional[int], model: str) -> Tuple[List[Optional[str]], bool]:
+    """
+    Rewrite several scenes in one completion.
+    Returns the per-scene rewrites (None where missing) and whether the fallback model produced them.
+    """
+    try:
+        response, used_fallback = await complete_rewrite(
+            messages=build_batch_rewrite_messages(texts, style, max_length),
+            max_tokens=min(REWRITE_BATCH_MAX_OUTPUT_TOKENS, batch_output_tokens(max_length) * len(texts)),
+            temperature=0.7,
+            response_format={"type": "json_object"},
+        )
+    except Exception as e:
+        logger.error(f"Error batch rewriting {len(texts)} scenes with OpenAI: {str(e)}")
+        return [None] * len(texts), False
+    return parse_batch_rewrites(response.choices[0].message.content, len(texts), max_length), used_fallback
+
+async def rewrite_texts(
+    texts: List[str],
+    style: str = "engaging",
+    max_length: Optional[int] = None,
+    force_refresh: bool = False
+) -> List[Optional[str]]:
+    """
+    Rewrite several scenes, packing them into as few completions as possible.
+    Cached rewrites are reused; scenes missing from the batch output are
+    retried one by one with rewrite_text.
+    
+    Args:
+        texts: The original scene texts
+        style: Style for the rewritten text (e.g., engaging, humorous, professional)
+        max_length: Maximum character length for each rewritten scene
+        force_refresh: Skip the rewrite cache and generate new rewrites
+        
+    Returns:
+        Rewritten texts in input order, None where rewriting failed
+    """
+    model = settings.OPENAI_REWRITE_MODEL
+    results: List[Optional[str]] = [None] * len(texts)
+    keys = [rewrite_cache_key(text, style, max_length, model, REWRITE_PROMPT_VERSION) for text in texts]
+    
+    pending = []
+    for index, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        if force_refresh:
+            rewrite_cache.record_bypass()
+        else:
+            results[index] = await rewrite_cache.get(keys[index])
+            if results[index] is not None:
+                continue
+        pending.append(index)
+    
+    # Oversized scenes are cut down before they're packed
+    inputs = {index: truncate_to_tokens(texts[index], REWRITE_BATCH_MAX_INPUT_TOKENS, model) for index in pending}
+    batches = _pack_batches(pending, [inputs.get(index, "") for index in range(len(texts))], model, max_length)
+    outputs = await asyncio.gather(*(
+        _rewrite_batch([inputs[index] for index in batch], style, max_length, model) for batch in batches
+    ))
+    
+    failed = []
+    for batch, (rewritten, used_fallback) in zip(batches, outputs):
+        for index, text in zip(batch, rewritten):
+            if text is None:
+                failed.append(index)
+                continue
+            results[index] = text
+            if not used_fallback:
+                await rewrite_cache.set(keys[index], text, model, style, max_length)
+    
+    if failed and rewrite_breaker.state != CLOSED and not settings.OPENAI_FALLBACK_MODEL:
+        # The provider is failing; don't follow a failed batch with one call per scene
+        logger.warning(f"Batch rewrite: skipping per-scene fallback for {len(failed)} scenes, rewrite circuit is {rewrite_breaker.state}")
+        return results
+    
+    if failed:
+        logger.info(f"Batch rewrite: {len(failed)} of {len(pending)} scenes missing from batch output, rewriting individually")
+        fallbacks = await asyncio.gather(*(
+            # The cache was already checked (or the bypass counted) above
+            _rewrite_uncached(texts[index], style, max_length, model, keys[index]) for index in failed
+        ))
+        for index, text in zip(failed, fallbacks):
+            results[index] = text
+    
+    logger.debug(f"Batch rewrite: {len(texts)} scenes, {len(batches)} batch completions, {len(failed)} fallbacks")
+    return results
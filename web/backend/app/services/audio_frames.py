@@ -0,0 +1,212 @@
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Bitrates in kbps by (MPEG-1?, layer), indexed by the header's bitrate index
+MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates by the header's version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+ID3V1_SIZE = 128
+
+def parse_mp3_frame_header(header: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    Parse a 4-byte MPEG audio frame header.
+
+    Returns:
+        Tuple of (frame length in bytes, samples per frame, sample rate),
+        or None if the bytes are not a valid header
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    # Reserved version/layer, free-format or bad bitrate, reserved sample rate
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+def id3v2_size(data: bytes) -> int:
+    """Size of a leading ID3v2 tag (0 if there is none)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # The tag size is a 28-bit "syncsafe" integer
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _is_vbr_info_frame(data: bytes, offset: int) -> bool:
+    """
+    Whether the frame at offset is a Xing/Info or VBRI header frame. Encoders
+    put one before the audio; it decodes as silence and must not be counted
+    or repeated mid-stream when files are joined.
+    """
+    mpeg1 = (data[offset + 1] >> 3) & 0x03 == 3
+    mono = data[offset + 3] >> 6 == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = offset + 4 + side_info
+    return data[xing:xing + 4] in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI"
+
+def _resync(data: bytes, start: int, end: int) -> Optional[int]:
+    """
+    Find the next frame header at or after start, confirmed by a second
+    header right after it so stray 0xFF bytes in tags aren't mistaken for audio.
+    """
+    pos = data.find(b"\xff", start, end)
+    while pos != -1 and pos + 4 <= end:
+        header = parse_mp3_frame_header(data[pos:pos + 4])
+        if header is not None:
+            next_pos = pos + header[0]
+            if next_pos == end or (next_pos + 4 <= end and parse_mp3_frame_header(data[next_pos:next_pos + 4])):
+                return pos
+        pos = data.find(b"\xff", pos + 1, end)
+    return None
+
+def iter_mp3_frames(data: bytes) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Walk the audio frames of an MP3 by their headers, without decoding.
+    ID3 tags and the Xing/Info header frame are skipped.
+
+    Yields:
+        Tuples of (byte offset, frame length, samples, sample rate)
+    """
+    pos = id3v2_size(data)
+    end = len(data)
+    if end - ID3V1_SIZE >= pos and data[end - ID3V1_SIZE:end - ID3V1_SIZE + 3] == b"TAG":
+        end -= ID3V1_SIZE
+
+    first = True
+    while pos + 4 <= end:
+        header = parse_mp3_frame_header(data[pos:pos + 4])
+        if header is None or pos + header[0] > end:
+            pos = _resync(data, pos + 1, end)
+            if pos is None:
+                return
+            continue
+        length, samples, sample_rate = header
+        if not (first and _is_vbr_info_frame(data, pos)):
+            yield pos, length, samples, sample_rate
+        first = False
+        pos += length
+
+def concat_mp3(parts: List[bytes]) -> Tuple[bytes, List[float]]:
+    """
+    Join MP3 files frame by frame, without re-encoding. Tags and per-file
+    Xing/Info frames are dropped so players see one continuous stream.
+
+    Returns:
+        Tuple of (joined audio, duration in seconds of each part)
+    """
+    joined = bytearray()
+    durations = []
+    for part in parts:
+        duration = 0.0
+        for offset, length, samples, sample_rate in iter_mp3_frames(part):
+            joined += part[offset:offset + length]
+            duration += samples / sample_rate
+        durations.append(duration)
+    return bytes(joined), durations
+
+def wav_header(data_size: int, sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    """Build a 44-byte PCM WAV header for data_size bytes of samples."""
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    return (
+        b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+def parse_wav(data: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Read the format and the location of the samples from a WAV file's chunks.
+
+    Returns:
+        Dictionary with sample_rate, channels, bits_per_sample, byte_rate,
+        data_offset and data_size, or None if this isn't a WAV file
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+
+    info: Dict[str, Any] = {}
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        body = pos + 8
+        if chunk_id == b"fmt " and body + 16 <= len(data):
+            _, channels, sample_rate, byte_rate, _, bits_per_sample = struct.unpack("<HHIIHH", data[body:body + 16])
+            info.update(sample_rate=sample_rate, channels=channels, bits_per_sample=bits_per_sample, byte_rate=byte_rate)
+        elif chunk_id == b"data":
+            # Streaming writers may leave the size at 0 or 0xFFFFFFFF
+            if size == 0 or body + size > len(data):
+                size = len(data) - body
+            if "byte_rate" not in info:
+                return None
+            info.update(data_offset=body, data_size=size)
+            return info
+        # Chunks are padded to an even size
+        pos = body + size + (size & 1)
+    return None
+
+def concat_wav(parts: List[bytes]) -> Tuple[bytes, List[float]]:
+    """
+    Join WAV files with the same format by concatenating their samples
+    under a single header.
+
+    Returns:
+        Tuple of (joined audio, duration in seconds of each part)
+
+    Raises:
+        ValueError: If a part isn't a WAV file or the formats differ
+    """
+    samples = bytearray()
+    durations = []
+    audio_format = None
+    for part in parts:
+        info = parse_wav(part)
+        if info is None:
+            raise ValueError("Not a WAV file")
+        part_format = (info["sample_rate"], info["channels"], info["bits_per_sample"])
+        if audio_format is not None and part_format != audio_format:
+            raise ValueError(f"Cannot join WAV parts with different formats: {audio_format} and {part_format}")
+        audio_format = part_format
+        samples += part[info["data_offset"]:info["data_offset"] + info["data_size"]]
+        durations.append(info["data_size"] / info["byte_rate"])
+    if audio_format is None:
+        return b"", []
+    sample_rate, channels, bits_per_sample = audio_format
+    return wav_header(len(samples), sample_rate, channels, bits_per_sample) + bytes(samples), durations
+
+def concat_pcm(parts: List[bytes], sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> Tuple[bytes, List[float]]:
+    """
+    Join raw PCM parts.
+
+    Returns:
+        Tuple of (joined audio, duration in seconds of each part)
+    """
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    return b"".join(parts), [len(part) / byte_rate for part in parts]
@@ -0,0 +1,143 @@
+import aiofiles
+import logging
+import os
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.audio_frames import iter_mp3_frames, parse_wav
+
+logger = logging.getLogger(__name__)
+
+def mp3_metadata(data: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Exact duration and frame index of an MP3, from its frame headers alone.
+    Works for CBR and VBR streams since every frame is counted.
+
+    Returns:
+        Dictionary with duration_seconds, sample_rate, bitrate, frame_count and
+        the frame_offsets/frame_times index, or None if no frames were found
+    """
+    # Arrays keep the index compact and cheap to copy in and out of the cache
+    frame_offsets = array('Q')
+    frame_times = array('d')
+    elapsed = 0.0
+    audio_bytes = 0
+    sample_rate = None
+    for offset, length, samples, frame_rate in iter_mp3_frames(data):
+        frame_offsets.append(offset)
+        frame_times.append(elapsed)
+        elapsed += samples / frame_rate
+        audio_bytes += length
+        sample_rate = frame_rate
+
+    if not frame_offsets:
+        return None
+    return {
+        "format": "mp3",
+        "duration_seconds": elapsed,
+        "sample_rate": sample_rate,
+        "bitrate": round(audio_bytes * 8 / elapsed),
+        "frame_count": len(frame_offsets),
+        "frame_offsets": frame_offsets,
+        "frame_times": frame_times,
+    }
+
+def wav_metadata(data: bytes) -> Optional[Dict[str, Any]]:
+    """
+    Exact duration of a PCM WAV file from its header. Samples are fixed-size,
+    so seeking needs no index.
+
+    Returns:
+        Dictionary with duration_seconds, the format fields and the location
+        of the samples, or None if this isn't a WAV file
+    """
+    info = parse_wav(data)
+    if info is None or not info["byte_rate"]:
+        return None
+    return {
+        "format": "wav",
+        "duration_seconds": info["data_size"] / info["byte_rate"],
+        "sample_rate": info["sample_rate"],
+        "channels": info["channels"],
+        "bits_per_sample": info["bits_per_sample"],
+        "byte_rate": info["byte_rate"],
+        "data_offset": info["data_offset"],
+        "data_size": info["data_size"],
+    }
+
+def audio_metadata(data: bytes) -> Optional[Dict[str, Any]]:
+    """Read duration and seek information from WAV or MP3 audio."""
+    if data[:4] == b"RIFF":
+        return wav_metadata(data)
+    return mp3_metadata(data)
+
+def seek_offset(metadata: Dict[str, Any], seconds: float) -> int:
+    """
+    Byte offset to start reading from to play audio from the given time:
+    the start of the MP3 frame containing it, or the WAV sample block.
+    """
+    if metadata["format"] == "wav":
+        block_align = metadata["channels"] * metadata["bits_per_sample"] // 8
+        blocks = min(int(max(0.0, seconds) * metadata["sample_rate"]), metadata["data_size"] // block_align)
+        return metadata["data_offset"] + blocks * block_align
+    index = max(0, bisect_right(metadata["frame_times"], seconds) - 1)
+    return metadata["frame_offsets"][index]
+
+class AudioProbe:
+    """
+    Reads audio metadata in-process instead of spawning ffprobe.
+    Results are cached per audio object: by storage key when the caller has
+    one (stored objects are content-addressed and never change), otherwise
+    by path, size and modification time.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            max_size=settings.AUDIO_PROBE_CACHE_MAX_ENTRIES,
+            default_ttl=settings.AUDIO_PROBE_CACHE_TTL_SECONDS,
+        )
+
+    async def probe(self, path: str, object_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the duration and seek index of an audio file.
+
+        Args:
+            path: Local audio file (MP3 or WAV)
+            object_key: Storage key of the object the file holds, if any
+
+        Returns:
+            Metadata dictionary (see mp3_metadata and wav_metadata), or None if
+            the file is missing or not recognizable audio
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            logger.warning(f"Cannot probe missing audio file {path}")
+            return None
+
+        key = object_key or f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        metadata = self.cache.get(key)
+        if metadata is not None:
+            return metadata
+
+        async with aiofiles.open(path, 'rb') as f:
+            data = await f.read()
+        metadata = audio_metadata(data)
+        if metadata is None:
+            logger.warning(f"Could not read audio metadata from {path}")
+            return None
+
+        self.cache.set(key, metadata)
+        return metadata
+
+    async def duration(self, path: str, object_key: Optional[str] = None) -> Optional[float]:
+        """Return the exact duration of an audio file in seconds, or None if unreadable."""
+        metadata = await self.probe(path, object_key)
+        return metadata["duration_seconds"] if metadata else None
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+audio_probe = AudioProbe()
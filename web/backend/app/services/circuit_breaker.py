@@ -0,0 +1,166 @@
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+class CircuitBreaker:
+    """
+    Tracks the recent error rate and latency of calls to a provider.
+
+    The circuit opens when, over the last window_seconds, at least min_requests
+    calls were made and the share of failed or slow calls reaches
+    failure_rate. While open, calls fail fast. After open_seconds the circuit
+    goes half-open and lets up to half_open_probes calls through: a successful
+    probe closes it again, a failed one re-opens it.
+
+    Args:
+        name: Name used in logs and stats
+        window_seconds: How far back outcomes are considered
+        min_requests: Minimum calls in the window before the circuit can open
+        failure_rate: Share of bad calls (0-1) that opens the circuit
+        slow_call_seconds: Calls slower than this count as bad
+        open_seconds: How long the circuit stays open before probing
+        half_open_probes: Concurrent probe calls allowed while half-open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_requests: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        # (timestamp, succeeded, latency) for calls in the window
+        self.outcomes: Deque[Tuple[float, bool, Optional[float]]] = deque()
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _prune(self, now: float):
+        while self.outcomes and self.outcomes[0][0] < now - self.window_seconds:
+            self.outcomes.popleft()
+
+    def allow(self) -> bool:
+        """Return True if a call may go ahead. Callers must then record its outcome."""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            logger.info(f"Circuit {self.name} half-open, probing provider")
+            self.state = HALF_OPEN
+            self.probes_in_flight = 0
+
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def _open(self, now: float):
+        if self.state != OPEN:
+            self.times_opened += 1
+            logger.warning(f"Circuit {self.name} opened")
+        self.state = OPEN
+        self.opened_at = now
+
+    def record_success(self, latency: float):
+        """Record a completed call and its latency in seconds."""
+        now = time.monotonic()
+        slow = latency > self.slow_call_seconds
+        self.outcomes.append((now, not slow, latency))
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            if slow:
+                self._open(now)
+            else:
+                logger.info(f"Circuit {self.name} closed")
+                self.state = CLOSED
+                self.outcomes.clear()
+            return
+        self._evaluate(now)
+
+    def record_failure(self):
+        """Record a failed call."""
+        now = time.monotonic()
+        self.outcomes.append((now, False, None))
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            self._open(now)
+            return
+        self._evaluate(now)
+
+    def record_slow(self, latency: float):
+        """
+        Record a call that was abandoned for being too slow (e.g. a hedge
+        answered first). It counts as a bad call, and its elapsed time, a lower
+        bound on its latency, still feeds the latency percentiles.
+        """
+        now = time.monotonic()
+        self.outcomes.append((now, False, latency))
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            self._open(now)
+            return
+        self._evaluate(now)
+
+    def release(self):
+        """Record a call that was abandoned (e.g. cancelled) without an outcome."""
+        if self.state == HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def _evaluate(self, now: float):
+        self._prune(now)
+        if self.state != CLOSED or len(self.outcomes) < self.min_requests:
+            return
+        bad = sum(1 for _, succeeded, _ in self.outcomes if not succeeded)
+        if bad / len(self.outcomes) >= self.failure_rate:
+            self._open(now)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """
+        Return the given latency percentile (0-1) of recent completed calls,
+        or None until min_requests latencies have been seen.
+        """
+        self._prune(time.monotonic())
+        latencies = sorted(latency for _, _, latency in self.outcomes if latency is not None)
+        if len(latencies) < self.min_requests:
+            return None
+        return latencies[min(len(latencies) - 1, math.ceil(percentile * len(latencies)) - 1)]
+
+    def stats(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        total = len(self.outcomes)
+        bad = sum(1 for _, succeeded, _ in self.outcomes if not succeeded)
+        return {
+            "state": self.state,
+            "window_requests": total,
+            "window_failure_rate": round(bad / total, 4) if total else 0.0,
+            "p50_latency": self.latency_percentile(0.5),
+            "p95_latency": self.latency_percentile(0.95),
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
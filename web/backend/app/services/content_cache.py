@@ -0,0 +1,236 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings, parse_int_mapping
+from app.core.database import db
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "extracted_content"
+
+class CachedContent:
+    """
+    A cached extraction result together with its HTTP validators.
+    Entries stay in the cache past their freshness window so they can be
+    revalidated with If-None-Match / If-Modified-Since instead of re-downloaded.
+    """
+
+    def __init__(self, content: Dict[str, Any], validators: Optional[Dict[str, str]], fresh_until: float):
+        self.content = content
+        self.validators = validators or {}
+        self.fresh_until = fresh_until
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.fresh_until > time.time()
+
+class ContentCache:
+    """
+    Two-tier cache for extracted URL content.
+    The first tier is a bounded in-process LRU; the second is the MongoDB
+    "extracted_content" collection with a TTL index, shared by all workers.
+    """
+
+    def __init__(self):
+        self.enabled = settings.CONTENT_CACHE_ENABLED
+        self.default_ttl = settings.CONTENT_CACHE_TTL_SECONDS
+        self.stale_ttl = settings.CONTENT_CACHE_STALE_SECONDS
+        self.domain_ttls = parse_int_mapping(settings.CONTENT_CACHE_DOMAIN_TTLS)
+        self.memory = TTLCache(max_size=settings.CONTENT_CACHE_MAX_ENTRIES, default_ttl=self.default_ttl)
+        self.db_hits = 0
+        self.db_misses = 0
+        self.db_errors = 0
+        self.stale_hits = 0
+        self.not_modified = 0
+        self.served_stale = 0
+
+    def _collection(self):
+        """Return the MongoDB collection, or None when running on the mock database."""
+        if db.is_mock:
+            return None
+        mongo_db = db.get_db()
+        return mongo_db[COLLECTION_NAME] if mongo_db is not None else None
+
+    def ttl_for_domain(self, domain: str) -> int:
+        """
+        Return the TTL for a domain, matching overrides on the domain suffix
+        (e.g. "reddit.com" applies to "www.reddit.com").
+        """
+        labels = domain.lower().split('.')
+        for i in range(len(labels)):
+            ttl = self.domain_ttls.get('.'.join(labels[i:]))
+            if ttl is not None:
+                return ttl
+        return self.default_ttl
+
+    async def ensure_indexes(self):
+        """
+        Create the TTL index that lets MongoDB purge expired entries.
+        Called once on application startup.
+        """
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            logger.debug(f"Ensured TTL index on {COLLECTION_NAME}.expires_at")
+        except Exception as e:
+            logger.warning(f"Could not create TTL index on {COLLECTION_NAME}: {str(e)}")
+
+    def _remember(self, key: str, entry: CachedContent):
+        """Keep an entry in memory until its stale window ends."""
+        self.memory.set(
+            key,
+            {"content": entry.content, "validators": entry.validators, "fresh_until": entry.fresh_until},
+            expires_at=entry.fresh_until + self.stale_ttl,
+        )
+
+    async def lookup(self, key: str) -> Optional[CachedContent]:
+        """
+        Look up a cached entry, fresh or stale, checking memory first and MongoDB second.
+        MongoDB hits are promoted into the memory tier.
+        """
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is not None:
+            entry = CachedContent(value["content"], value["validators"], value["fresh_until"])
+        else:
+            entry = await self._lookup_db(key)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+
+        if not entry.is_fresh:
+            self.stale_hits += 1
+        return entry
+
+    async def _lookup_db(self, key: str) -> Optional[CachedContent]:
+        collection = self._collection()
+        if collection is None:
+            return None
+
+        try:
+            # The TTL monitor only runs periodically, so filter out expired documents ourselves
+            doc = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        except Exception as e:
+            self.db_errors += 1
+            logger.warning(f"Content cache lookup failed for {key}: {str(e)}")
+            return None
+
+        if not doc:
+            self.db_misses += 1
+            return None
+
+        self.db_hits += 1
+        fresh_until = doc.get("fresh_until", doc["expires_at"])
+        remaining = (fresh_until - datetime.utcnow()).total_seconds()
+        return CachedContent(doc["content"], doc.get("validators"), time.time() + remaining)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached content only if it is still fresh."""
+        entry = await self.lookup(key)
+        if entry is None or not entry.is_fresh:
+            return None
+        return entry.content
+
+    async def set(self, key: str, domain: str, content: Dict[str, Any], validators: Optional[Dict[str, str]] = None):
+        """Store extracted content and its validators in both tiers using the domain's TTL."""
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_for_domain(domain)
+        self._remember(key, CachedContent(content, validators, time.time() + ttl))
+
+        collection = self._collection()
+        if collection is None:
+            return
+
+        now = datetime.utcnow()
+        try:
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "domain": domain,
+                    "content": content,
+                    "validators": validators or {},
+                    "created_at": now,
+                    "fresh_until": now + timedelta(seconds=ttl),
+                    "expires_at": now + timedelta(seconds=ttl + self.stale_ttl),
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            self.db_errors += 1
+            logger.warning(f"Content cache write failed for {key}: {str(e)}")
+
+    async def touch(self, key: str, domain: str, entry: CachedContent):
+        """
+        Mark a stale entry fresh again after the origin answered 304 Not Modified.
+        Keeps the cached payload and extends its TTL in both tiers.
+        """
+        if not self.enabled:
+            return
+
+        self.not_modified += 1
+        ttl = self.ttl_for_domain(domain)
+        entry.fresh_until = time.time() + ttl
+        self._remember(key, entry)
+
+        collection = self._collection()
+        if collection is None:
+            return
+
+        now = datetime.utcnow()
+        try:
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "fresh_until": now + timedelta(seconds=ttl),
+                    "expires_at": now + timedelta(seconds=ttl + self.stale_ttl),
+                }}
+            )
+        except Exception as e:
+            self.db_errors += 1
+            logger.warning(f"Content cache TTL extension failed for {key}: {str(e)}")
+
+    async def invalidate(self, key: str) -> bool:
+        """
+        Remove a URL from both tiers.
+        Returns True if it was cached in either tier.
+        """
+        removed = self.memory.delete(key)
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                result = await collection.delete_one({"_id": key})
+                removed = removed or result.deleted_count > 0
+            except Exception as e:
+                self.db_errors += 1
+                logger.warning(f"Content cache invalidation failed for {key}: {str(e)}")
+
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for both tiers and revalidation counters."""
+        return {
+            "enabled": self.enabled,
+            "memory": self.memory.stats(),
+            "database": {
+                "available": self._collection() is not None,
+                "hits": self.db_hits,
+                "misses": self.db_misses,
+                "errors": self.db_errors,
+            },
+            "revalidation": {
+                "stale_hits": self.stale_hits,
+                "not_modified": self.not_modified,
+                "served_stale_on_error": self.served_stale,
+            },
+        }
+
+content_cache = ContentCache()
@@ -1,12 +1,20 @@
 import httpx
-from typing import Dict, Any, Optional, List, Tuple
-from urllib.parse import urlparse, urljoin
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
+from urllib.parse import urlparse, urljoin, urlencode, parse_qsl
 import logging
 import json
 import re
 import time
 import random
 import asyncio
+import copy
+from app.core.http_client import http_client
+from app.services.reddit_session import reddit_session
+from app.services.rate_limiter import rate_limiter
+from app.services.html_metadata import StreamingMetadataExtractor, sniff_content_kind
+from app.services.handler_registry import handler_registry, DomainHandler, ExtractionContext
+from app.core.config import settings
+from app.services.content_cache import content_cache, CachedContent
 
 logger = logging.getLogger(__name__)
 
@@ -14,16 +22,136 @@ logger = logging.getLogger(__name__)
 DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
 REDDIT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36 Edg/123.0.0.0"
 
-async def extract_media_from_reddit_post(post_data: Dict[str, Any]) -> Dict[str, Any]:
+# Reddit returns at most 100 posts per listing page
+REDDIT_LISTING_PAGE_SIZE = 100
+
+# Looks up posts by fullname ("t3_<id>"), much cheaper than a post's comment page
+REDDIT_INFO_URL = "https://www.reddit.com/api/info.json"
+# Maximum fullnames /api/info.json accepts in one request
+REDDIT_INFO_BATCH_SIZE = 100
+
+# Comprehensive headers to mimic a real browser on Reddit
+REDDIT_HEADERS = {
+    "User-Agent": REDDIT_USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Upgrade-Insecure-Requests": "1",
+    "Cache-Control": "max-age=0",
+    "Sec-Ch-Ua": "\"Chromium\";v=\"123\", \"Microsoft Edge\";v=\"123\", \"Not:A-Brand\";v=\"99\"",
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": "\"Windows\"",
+}
+
+def _reddit_variant(url: Optional[str], width: Optional[int], height: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Build a {url, width, height} variant, unescaping Reddit's HTML-escaped URL."""
+    if not url:
+        return None
+    return {"url": url.replace('&amp;', '&'), "width": width, "height": height}
+
+def select_image_variant(
+    variants: List[Dict[str, Any]],
+    target_width: int,
+    target_height: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Choose the smallest variant that still covers the target render size.
+    The image is assumed to be fitted inside the target frame, so a variant is
+    large enough when its width reaches the width the image is displayed at.
+    Falls back to the largest variant when none is large enough.
+    
+    Args:
+        variants: Variants of one image as {url, width, height} dictionaries
+        target_width: Render width in pixels
+        target_height: Render height in pixels
+        
+    Returns:
+        The selected variant, or None if there are no variants
+    """
+    sized = [v for v in variants if v and v.get('width') and v.get('height')]
+    if not sized:
+        return next((v for v in variants if v), None)
+    
+    sized.sort(key=lambda v: v['width'])
+    largest = sized[-1]
+    aspect = largest['width'] / largest['height']
+    display_width = min(target_width, target_height * aspect)
+    for variant in sized:
+        if variant['width'] >= display_width:
+            return variant
+    return largest
+
+def reddit_preview_variants(image: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Collect the downscaled resolutions and source of a preview image, smallest first."""
+    variants = [
+        _reddit_variant(resolution.get('url'), resolution.get('width'), resolution.get('height'))
+        for resolution in image.get('resolutions', [])
+    ]
+    source = image.get('source', {})
+    variants.append(_reddit_variant(source.get('url'), source.get('width'), source.get('height')))
+    return [v for v in variants if v]
+
+def reddit_gallery_item(media_id: str, metadata: Dict[str, Any], target_width: int, target_height: int) -> Optional[Dict[str, Any]]:
+    """
+    Describe one gallery item from media_metadata with all of its variants.
+    Static images use the smallest covering variant; animated items keep
+    their mp4/gif renditions and prefer the mp4.
+    """
+    source = metadata.get('s', {})
+    variants = [_reddit_variant(p.get('u'), p.get('x'), p.get('y')) for p in metadata.get('p', [])]
+    variants.append(_reddit_variant(source.get('u'), source.get('x'), source.get('y')))
+    variants = [v for v in variants if v]
+    
+    mp4_url = source.get('mp4', '').replace('&amp;', '&') or None
+    gif_url = source.get('gif', '').replace('&amp;', '&') or None
+    selected = select_image_variant(variants, target_width, target_height)
+    
+    if mp4_url or gif_url:
+        selected_url = mp4_url or gif_url
+    elif selected:
+        selected_url = selected['url']
+    else:
+        return None
+    
+    return {
+        "media_id": media_id,
+        "type": metadata.get('e', 'Image'),
+        "mime_type": metadata.get('m'),
+        "width": source.get('x'),
+        "height": source.get('y'),
+        "url": selected_url,
+        "source_url": variants[-1]['url'] if variants and source.get('u') else selected_url,
+        "variants": variants,
+        "mp4_url": mp4_url,
+        "gif_url": gif_url,
+    }
+
+async def extract_media_from_reddit_post(
+    post_data: Dict[str, Any],
+    target_width: Optional[int] = None,
+    target_height: Optional[int] = None
+) -> Dict[str, Any]:
     """
     Extract media content (images, videos) from a Reddit post data structure.
+    Every downscaled variant Reddit returns is kept, and the smallest one that
+    covers the target render size is selected for preview and gallery images.
     
     Args:
         post_data: The post data dictionary from Reddit's JSON API
+        target_width: Render width to select variants for (default RENDER_TARGET_WIDTH)
+        target_height: Render height to select variants for (default RENDER_TARGET_HEIGHT)
         
     Returns:
         Dictionary containing media data (type, url, preview, etc.)
     """
+    target_width = target_width or settings.RENDER_TARGET_WIDTH
+    target_height = target_height or settings.RENDER_TARGET_HEIGHT
+    
     media_data = {
         "has_media": False,
         "media_type": None,
@@ -40,13 +168,28 @@ async def extract_media_from_reddit_post(post_data: Dict[str, Any]) -> Dict[str,
     if 'preview' in post_data and 'images' in post_data['preview']:
         for image in post_data['preview']['images']:
             if 'source' in image and 'url' in image['source']:
-                # Unescape URLs (Reddit escapes them in JSON)
-                image_url = image['source']['url'].replace('&amp;', '&')
-                media_data['preview_images'].append({
-                    'url': image_url,
-                    'width': image['source'].get('width'),
-                    'height': image['source'].get('height')
-                })
+                variants = reddit_preview_variants(image)
+                selected = select_image_variant(variants, target_width, target_height)
+                preview = {
+                    'url': selected['url'],
+                    'width': selected.get('width'),
+                    'height': selected.get('height'),
+                    'source_url': variants[-1]['url'],
+                    'source_width': image['source'].get('width'),
+                    'source_height': image['source'].get('height'),
+                    'variants': variants,
+                }
+                
+                # Keep the animated renditions of GIF previews
+                for animated_format in ('mp4', 'gif'):
+                    animated = image.get('variants', {}).get(animated_format)
+                    if animated:
+                        animated_variants = reddit_preview_variants(animated)
+                        animated_selected = select_image_variant(animated_variants, target_width, target_height)
+                        preview[f'{animated_format}_url'] = animated_selected['url'] if animated_selected else None
+                        preview[f'{animated_format}_variants'] = animated_variants
+                
+                media_data['preview_images'].append(preview)
                 
                 # Set first preview as thumbnail if none exists
                 if not media_data['thumbnail_url'] and media_data['preview_images']:
@@ -57,22 +200,29 @@ async def extract_media_from_reddit_post(post_data: Dict[str, Any]) -> Dict[str,
         media_data['has_media'] = True
         media_data['media_type'] = 'image'
         media_data['media_url'] = post_data.get('url')
+        # Downscaled copy of the image that is still sharp at render size
+        if media_data['preview_images']:
+            media_data['render_media_url'] = media_data['preview_images'][0]['url']
     
     # Check for gallery posts
     elif 'gallery_data' in post_data and 'media_metadata' in post_data:
         media_data['has_media'] = True
         media_data['media_type'] = 'gallery'
         gallery_items = []
+        gallery_variants = []
         
         for item_id in post_data.get('gallery_data', {}).get('items', []):
             item_id = item_id.get('media_id')
             if item_id in post_data.get('media_metadata', {}):
                 metadata = post_data['media_metadata'][item_id]
                 if metadata.get('status') == 'valid' and 's' in metadata:
-                    image_url = metadata['s']['u'].replace('&amp;', '&')
-                    gallery_items.append(image_url)
+                    item = reddit_gallery_item(item_id, metadata, target_width, target_height)
+                    if item:
+                        gallery_items.append(item['url'])
+                        gallery_variants.append(item)
         
         media_data['gallery_items'] = gallery_items
+        media_data['gallery_variants'] = gallery_variants
     
     # Check for video posts
     elif post_data.get('is_video') == True and post_data.get('media'):
@@ -107,46 +257,101 @@ async def extract_media_from_reddit_post(post_data: Dict[str, Any]) -> Dict[str,
     
     return media_data
 
+# Returned by handlers when a conditional request comes back 304 Not Modified
+NOT_MODIFIED = object()
+
+def conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Build If-None-Match / If-Modified-Since headers from cached validators."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+def response_validators(response: httpx.Response) -> Optional[Dict[str, str]]:
+    """Collect the ETag / Last-Modified validators from a response, if any."""
+    validators = {}
+    if response.headers.get("etag"):
+        validators["etag"] = response.headers["etag"]
+    if response.headers.get("last-modified"):
+        validators["last_modified"] = response.headers["last-modified"]
+    return validators or None
+
+async def build_reddit_post_result(post_data: Dict[str, Any], url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build the normalized extraction result for a Reddit post.
+    
+    Args:
+        post_data: The post data dictionary from Reddit's JSON API
+        url: The post URL; defaults to the post's permalink
+        
+    Returns:
+        Dictionary with the post's text, author, votes and media data
+    """
+    title = post_data.get('title', '')
+    selftext = post_data.get('selftext', '')
+    author = post_data.get('author', 'unknown')
+    subreddit = post_data.get('subreddit', '')
+    created_utc = post_data.get('created_utc', 0)
+    
+    if url is None:
+        url = f"https://www.reddit.com{post_data.get('permalink', '')}"
+    
+    # Extract media content
+    media_data = await extract_media_from_reddit_post(post_data)
+    
+    # Combine all extracted data
+    return {
+        "url": url,
+        "domain": "reddit.com",
+        "status_code": 200,
+        "content_type": "application/json",
+        "title": title,
+        "text": selftext or f"Post by u/{author}: {title}",
+        "author": author,
+        "subreddit": subreddit,
+        "created_utc": created_utc,
+        "up_votes": post_data.get('ups', 0),
+        "down_votes": post_data.get('downs', 0),
+        "score": post_data.get('score', 0),
+        **media_data  # Include all media data
+    }
+
 # Domain-specific handlers
-async def handle_reddit_url(url: str, client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+async def handle_reddit_url(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    validators: Optional[Dict[str, str]] = None,
+    context: Optional[ExtractionContext] = None
+) -> Optional[Dict[str, Any]]:
     """
     Handle Reddit URLs specifically to deal with their redirect issues and extract content.
+    Uses the shared HTTP client unless one is passed in explicitly.
+    When validators from a cached result are given, the request is conditional
+    and NOT_MODIFIED is returned on a 304.
     """
+    if client is None:
+        client = http_client.get_client()
+    
     # Normalize Reddit URL formats
     url = normalize_reddit_url(url)
     
     try:
-        # Define comprehensive headers to mimic a real browser
-        headers = {
-            "User-Agent": REDDIT_USER_AGENT,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1",
-            "Upgrade-Insecure-Requests": "1",
-            "Cache-Control": "max-age=0",
-            "Sec-Ch-Ua": "\"Chromium\";v=\"123\", \"Microsoft Edge\";v=\"123\", \"Not:A-Brand\";v=\"99\"",
-            "Sec-Ch-Ua-Mobile": "?0",
-            "Sec-Ch-Ua-Platform": "\"Windows\"",
-        }
-        
         # Add .json to the URL to get JSON data
         json_url = url
         if not json_url.endswith('.json'):
             json_url = url + '.json'
         
-        # First, try to get the HTML page to establish cookies
-        await client.get(url, headers=headers, follow_redirects=True)
+        headers = {**REDDIT_HEADERS, **conditional_headers(validators)}
         
-        # Small delay to avoid rate limiting
-        await asyncio.sleep(0.5)
+        # Go straight to the JSON endpoint; the shared session supplies cookies
+        # and only re-primes them when they expire or Reddit rejects them
+        json_response = await reddit_session.get(client, json_url, headers)
         
-        # Now attempt to get the JSON data
-        json_response = await client.get(json_url, headers=headers, follow_redirects=True)
+        if json_response.status_code == 304:
+            return NOT_MODIFIED
         
         if json_response.status_code == 200:
             data = json_response.json()
@@ -162,35 +367,15 @@ async def handle_reddit_url(url: str, client: httpx.AsyncClient) -> Optional[Dic
                     post_data = data['data']['children'][0]['data']
             
             if post_data:
-                title = post_data.get('title', '')
-                selftext = post_data.get('selftext', '')
-                author = post_data.get('author', 'unknown')
-                subreddit = post_data.get('subreddit', '')
-                created_utc = post_data.get('created_utc', 0)
-                
-                # Extract media content
-                media_data = await extract_media_from_reddit_post(post_data)
-                
-                # Combine all extracted data
-                return {
-                    "url": url,
-                    "domain": "reddit.com",
-                    "status_code": 200,
-                    "content_type": "application/json",
-                    "title": title,
-                    "text": selftext or f"Post by u/{author}: {title}",
-                    "author": author,
-                    "subreddit": subreddit,
-                    "created_utc": created_utc,
-                    "up_votes": post_data.get('ups', 0),
-                    "down_votes": post_data.get('downs', 0),
-                    "score": post_data.get('score', 0),
-                    **media_data  # Include all media data
-                }
+                result = await build_reddit_post_result(post_data, url)
+                result["cache_validators"] = response_validators(json_response)
+                return result
         
         # If JSON approach fails, try HTML approach
         logger.warning(f"Failed to extract content from Reddit JSON API for {url}, falling back to HTML")
-        html_response = await client.get(url, headers=headers, follow_redirects=True)
+        html_response = await reddit_session.get(client, url, headers)
+        if html_response.status_code == 304:
+            return NOT_MODIFIED
         html_response.raise_for_status()
         
         # For now, just return basic info
@@ -203,11 +388,106 @@ async def handle_reddit_url(url: str, client: httpx.AsyncClient) -> Optional[Dic
             "title": "Content from Reddit",
             "text": "Reddit content extracted from HTML (placeholder). This would be replaced with actual content in production.",
             "has_media": False,
+            "cache_validators": response_validators(html_response),
         }
     except Exception as e:
         logger.error(f"Error handling Reddit URL {url}: {str(e)}")
         return None
 
+async def handle_generic_url(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    validators: Optional[Dict[str, str]] = None,
+    context: Optional[ExtractionContext] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Extract page metadata from any non-Reddit URL.
+    The body is streamed and parsed incrementally until the <head> is complete
+    (title, OpenGraph/Twitter card tags, meta description, oEmbed link) or
+    GENERIC_EXTRACT_MAX_BYTES is reached. Direct media and other binaries are
+    identified from the Content-Type header and first bytes and never downloaded.
+    
+    Raises httpx.HTTPStatusError / httpx.RequestError on HTTP failures.
+    """
+    if client is None:
+        client = http_client.get_client()
+    
+    domain = urlparse(url).netloc.lower()
+    headers = {
+        "User-Agent": DEFAULT_USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+        **conditional_headers(validators),
+    }
+    
+    async with rate_limiter.stream(client, "GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return NOT_MODIFIED
+        response.raise_for_status()
+        
+        content_type = response.headers.get("content-type", "")
+        result = {
+            "url": url,
+            "domain": domain,
+            "status_code": response.status_code,
+            "content_type": content_type,
+            "title": f"Content from {domain}",
+            "text": "",
+            "has_media": False,
+            "cache_validators": response_validators(response),
+        }
+        if context:
+            context.publish(result)
+        
+        # Trust an explicit media Content-Type; otherwise peek at the first chunk
+        chunks = response.aiter_bytes()
+        head = b""
+        kind = sniff_content_kind(content_type, head)
+        if kind not in ("image", "video", "audio"):
+            head = await anext(chunks, b"")
+            kind = sniff_content_kind(content_type, head)
+        
+        if kind in ("image", "video", "audio"):
+            filename = urlparse(str(response.url)).path.rsplit('/', 1)[-1]
+            result.update({
+                "title": filename or result["title"],
+                "has_media": True,
+                "media_type": kind,
+                "media_url": str(response.url),
+            })
+            return result
+        
+        if kind != "html":
+            logger.debug(f"Not parsing {url}: unsupported content type '{content_type}'")
+            return result
+        
+        extractor = StreamingMetadataExtractor(content_type, settings.GENERIC_EXTRACT_MAX_BYTES)
+        if not extractor.feed(head):
+            async for chunk in chunks:
+                if extractor.feed(chunk):
+                    break
+            else:
+                extractor.finish()
+        metadata = extractor.parser.metadata(str(response.url))
+    
+    media_url = metadata["video_url"] or metadata["thumbnail_url"]
+    result.update({
+        "title": metadata["title"] or result["title"],
+        "text": metadata["description"] or metadata["title"] or "",
+        "description": metadata["description"],
+        "author": metadata["author"],
+        "site_name": metadata["site_name"],
+        "thumbnail_url": metadata["thumbnail_url"],
+        "oembed_url": metadata["oembed_url"],
+        "canonical_url": metadata["canonical_url"],
+        "has_media": media_url is not None,
+        "media_type": ("video" if metadata["video_url"] else "image") if media_url else None,
+        "media_url": media_url,
+        "preview_images": [{"url": metadata["thumbnail_url"]}] if metadata["thumbnail_url"] else [],
+        "bytes_read": extractor.bytes_read,
+        "truncated": extractor.truncated,
+    })
+    return result
+
 def normalize_reddit_url(url: str) -> str:
     """Normalize different Reddit URL formats to a standard form."""
     # Convert mobile URLs to desktop
@@ -221,10 +501,308 @@ def normalize_reddit_url(url: str) -> str:
     
     return url
 
+# Post IDs in permalinks (/r/sub/comments/<id>/...) and redd.it short links
+REDDIT_POST_ID_PATTERN = re.compile(r"/comments/([a-z0-9]+)", re.IGNORECASE)
+REDDIT_SHORT_LINK_PATTERN = re.compile(r"^/([a-z0-9]+)/?$", re.IGNORECASE)
+REDDIT_SUBREDDIT_PATTERN = re.compile(r"^[A-Za-z0-9_]{2,21}$")
+# Listing sorts become part of the URL path; search sorts go in the query string
+REDDIT_LISTING_SORTS = {"hot", "new", "top", "rising", "controversial"}
+REDDIT_SEARCH_SORTS = {"relevance", "hot", "top", "new", "comments"}
+
+def parse_reddit_post_id(url: str) -> Optional[str]:
+    """
+    Return the base-36 post ID from a Reddit post URL, or None if the URL
+    is not a post (e.g. a subreddit or user page).
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower()
+    if host == "redd.it":
+        match = REDDIT_SHORT_LINK_PATTERN.match(parsed.path)
+    elif host == "reddit.com" or host.endswith(".reddit.com"):
+        match = REDDIT_POST_ID_PATTERN.search(parsed.path)
+    else:
+        return None
+    return match.group(1).lower() if match else None
+
+def reddit_listing_request(
+    url: Optional[str] = None,
+    subreddit: Optional[str] = None,
+    sort: str = "hot",
+    time_filter: Optional[str] = None,
+    query: Optional[str] = None
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Build the JSON endpoint and query parameters for a Reddit listing.
+    Either pass a listing URL (subreddit, subreddit sort or search page) or a
+    subreddit name with an optional sort, time filter and search query.
+    
+    Returns:
+        Tuple of (listing JSON URL, query parameters)
+        
+    Raises:
+        ValueError: If neither is given, or the subreddit name or sort is invalid
+    """
+    if url:
+        parsed = urlparse(normalize_reddit_url(url))
+        params = dict(parse_qsl(urlparse(url).query))
+        path = parsed.path.rstrip('/')
+        if not path.endswith('.json'):
+            path += '.json'
+        return f"https://www.reddit.com{path}", params
+    
+    if not subreddit:
+        raise ValueError("Either a listing URL or a subreddit is required")
+    
+    subreddit = subreddit.strip().strip('/')
+    if subreddit.lower().startswith('r/'):
+        subreddit = subreddit[2:]
+    if not REDDIT_SUBREDDIT_PATTERN.match(subreddit):
+        raise ValueError(f"Invalid subreddit name: {subreddit!r}")
+    
+    sorts = REDDIT_SEARCH_SORTS if query else REDDIT_LISTING_SORTS
+    if sort not in sorts:
+        raise ValueError(f"Invalid sort {sort!r}, expected one of: {', '.join(sorted(sorts))}")
+    
+    params = {}
+    if query:
+        params.update({"q": query, "restrict_sr": "1", "sort": sort})
+        path = f"/r/{subreddit}/search.json"
+    else:
+        path = f"/r/{subreddit}/{sort}.json"
+    if time_filter:
+        params["t"] = time_filter
+    return f"https://www.reddit.com{path}", params
+
+class RedditListingError(Exception):
+    """Raised when a page of a Reddit listing can't be fetched or parsed."""
+
+async def iter_reddit_listing(
+    listing_url: str,
+    params: Optional[Dict[str, str]] = None,
+    max_posts: int = 100,
+    min_score: Optional[int] = None,
+    media_types: Optional[List[str]] = None,
+    include_nsfw: bool = False,
+    client: Optional[httpx.AsyncClient] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Page through a Reddit listing and yield normalized post results.
+    Uses "after" cursors with limit=100, so one request replaces up to 100 post fetches.
+    Every yielded post is also stored in the content cache, so extracting it
+    later (e.g. when it is added as a scene) is a cache hit.
+    
+    Args:
+        listing_url: Listing JSON URL from reddit_listing_request
+        params: Listing query parameters (sort, time filter, search query)
+        max_posts: Stop after yielding this many posts
+        min_score: Skip posts scoring below this
+        media_types: Only yield posts with these media types ("text" for posts without media)
+        include_nsfw: Include posts marked over_18
+        
+    Raises:
+        RedditListingError: If a page can't be fetched, so callers can tell a
+            cut-off listing from its end
+        httpx.HTTPError: If the request fails
+    """
+    if client is None:
+        client = http_client.get_client()
+    
+    yielded = 0
+    after = None
+    while yielded < max_posts:
+        page_params = {**(params or {}), "limit": str(REDDIT_LISTING_PAGE_SIZE), "raw_json": "1"}
+        if after:
+            page_params["after"] = after
+        page_url = f"{listing_url}?{urlencode(page_params)}"
+        
+        response = await reddit_session.get(client, page_url, REDDIT_HEADERS)
+        if response.status_code != 200:
+            logger.warning(f"Reddit listing {page_url} returned {response.status_code}, stopping")
+            raise RedditListingError(f"Reddit listing returned {response.status_code}")
+        
+        try:
+            listing = response.json()
+        except ValueError:
+            logger.warning(f"Reddit listing {page_url} returned a non-JSON response, stopping")
+            raise RedditListingError("Reddit listing returned a non-JSON response")
+        data = listing.get('data', {}) if isinstance(listing, dict) else {}
+        for child in data.get('children', []):
+            if child.get('kind') != 't3':
+                continue
+            post_data = child.get('data', {})
+            if post_data.get('over_18') and not include_nsfw:
+                continue
+            if min_score is not None and post_data.get('score', 0) < min_score:
+                continue
+            
+            result = await build_reddit_post_result(post_data)
+            if media_types and (result.get('media_type') or 'text') not in media_types:
+                continue
+            
+            await content_cache.set(content_cache_key(result['url']), "www.reddit.com", result)
+            yield result
+            yielded += 1
+            if yielded >= max_posts:
+                return
+        
+        after = data.get('after')
+        if not after:
+            return
+
+async def _fetch_reddit_info_batch(post_ids: List[str], client: httpx.AsyncClient) -> Dict[str, Dict[str, Any]]:
+    """Look up to REDDIT_INFO_BATCH_SIZE posts in one /api/info.json request, keyed by post ID."""
+    params = {"id": ",".join(f"t3_{post_id}" for post_id in post_ids), "raw_json": "1"}
+    response = await reddit_session.get(client, f"{REDDIT_INFO_URL}?{urlencode(params)}", REDDIT_HEADERS)
+    if response.status_code != 200:
+        logger.warning(f"Reddit info lookup for {len(post_ids)} posts returned {response.status_code}")
+        return {}
+    
+    try:
+        listing = response.json()
+    except ValueError:
+        # A block or maintenance page instead of JSON; callers fall back to per-post extraction
+        logger.warning(f"Reddit info lookup for {len(post_ids)} posts returned a non-JSON response")
+        return {}
+    children = listing.get('data', {}).get('children', []) if isinstance(listing, dict) else []
+    return {
+        child['data']['id']: child['data']
+        for child in children
+        if child.get('kind') == 't3' and child.get('data', {}).get('id')
+    }
+
+async def fetch_reddit_posts(
+    urls: List[str],
+    client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch many Reddit posts through /api/info.json, 100 posts per request,
+    instead of one JSON request per post. Every post found is stored in the
+    content cache.
+    
+    Args:
+        urls: Reddit post URLs (URLs that aren't posts map to None)
+        client: HTTP client to use (defaults to the shared client)
+        
+    Returns:
+        Dictionary mapping each input URL to its post result, or None if it wasn't found
+    """
+    if client is None:
+        client = http_client.get_client()
+    
+    urls_by_id: Dict[str, List[str]] = {}
+    for url in urls:
+        post_id = parse_reddit_post_id(url)
+        if post_id:
+            urls_by_id.setdefault(post_id, []).append(url)
+    
+    post_ids = list(urls_by_id)
+    batches = [post_ids[i:i + REDDIT_INFO_BATCH_SIZE] for i in range(0, len(post_ids), REDDIT_INFO_BATCH_SIZE)]
+    posts: Dict[str, Dict[str, Any]] = {}
+    for batch_posts in await asyncio.gather(*(_fetch_reddit_info_batch(batch, client) for batch in batches)):
+        posts.update(batch_posts)
+    
+    results: Dict[str, Optional[Dict[str, Any]]] = {url: None for url in urls}
+    for post_id, post_urls in urls_by_id.items():
+        post_data = posts.get(post_id)
+        if post_data is None:
+            continue
+        for url in post_urls:
+            key = content_cache_key(url)
+            result = await build_reddit_post_result(post_data, key)
+            await content_cache.set(key, "www.reddit.com", result)
+            results[url] = result
+    return results
+
+async def prefetch_reddit_posts(urls: List[str]) -> int:
+    """
+    Warm the content cache for the Reddit posts among the given URLs that
+    aren't cached yet, using bulk /api/info.json lookups.
+    
+    Returns:
+        Number of posts fetched
+    """
+    missing = []
+    for url in urls:
+        if parse_reddit_post_id(url) and await content_cache.get(content_cache_key(url)) is None:
+            missing.append(url)
+    if len(missing) < 2:
+        # A single post is fetched just as cheaply by the normal extraction path
+        return 0
+    
+    try:
+        fetched = await fetch_reddit_posts(missing)
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"Bulk Reddit prefetch failed, falling back to per-post extraction: {str(e)}")
+        return 0
+    return sum(1 for result in fetched.values() if result)
+
+def content_cache_key(url: str) -> str:
+    """
+    Build the cache key for a URL.
+    Reddit URLs are normalized so mobile/tracking variants share one entry.
+    """
+    handler = handler_registry.resolve(urlparse(url).netloc)
+    if handler and handler.normalize_url:
+        return handler.normalize_url(url)
+    return url.split('#')[0]
+
+# Extractions currently in progress, keyed by cache key, so concurrent
+# requests for the same URL share a single fetch
+_inflight_extractions: Dict[str, asyncio.Task] = {}
+_coalesced_requests = 0
+
+def _finish_inflight(key: str, task: asyncio.Task):
+    """Drop a finished extraction from the in-flight map."""
+    if _inflight_extractions.get(key) is task:
+        del _inflight_extractions[key]
+    # Mark any exception as retrieved so it isn't reported when no caller is left waiting
+    if not task.cancelled():
+        task.exception()
+
+async def _extract_and_cache(url: str, key: str, stale: Optional[CachedContent] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a URL and store the result in the content cache.
+    A stale cache entry is revalidated with a conditional request; on 304 its
+    payload is kept and its TTL extended. If the refresh fails outright, the
+    stale payload is served rather than nothing.
+    """
+    domain = urlparse(key).netloc.lower()
+    content = await fetch_url_content(url, validators=stale.validators if stale else None)
+    
+    if content is NOT_MODIFIED:
+        logger.debug(f"Cached content for {key} not modified, extending TTL")
+        await content_cache.touch(key, domain, stale)
+        return stale.content
+    
+    if content and content.get("partial"):
+        # Handler ran out of time; don't cache an incomplete result
+        content.pop("cache_validators", None)
+        return content
+    
+    if content:
+        validators = content.pop("cache_validators", None)
+        await content_cache.set(key, domain, content, validators)
+        return content
+    
+    if stale is not None:
+        logger.warning(f"Refreshing {key} failed, serving stale cached content")
+        content_cache.served_stale += 1
+        return stale.content
+    
+    return None
+
+def get_inflight_stats() -> Dict[str, int]:
+    """Return the number of in-flight extractions and how many requests joined one."""
+    return {
+        "in_flight": len(_inflight_extractions),
+        "coalesced": _coalesced_requests,
+    }
+
 async def extract_url_content(url: str) -> Optional[Dict[str, Any]]:
     """
-    Extract content from a URL.
-    Supports different content sources with domain-specific handlers.
+    Extract content from a URL, serving repeat requests from the content cache.
+    Concurrent calls for the same URL are coalesced: the first caller fetches
+    and the others await the same task, getting the same result or error.
     
     Args:
         url: The URL to extract content from
@@ -232,46 +810,129 @@ async def extract_url_content(url: str) -> Optional[Dict[str, Any]]:
     Returns:
         A dictionary containing the extracted content or None if extraction failed
     """
+    global _coalesced_requests
+    
+    key = content_cache_key(url)
+    cached = await content_cache.lookup(key)
+    if cached is not None and cached.is_fresh:
+        logger.debug(f"Content cache hit for {key}")
+        return cached.content
+    
+    task = _inflight_extractions.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_extract_and_cache(url, key, stale=cached))
+        _inflight_extractions[key] = task
+        task.add_done_callback(lambda t: _finish_inflight(key, t))
+    else:
+        _coalesced_requests += 1
+        logger.debug(f"Joining in-flight extraction for {key}")
+    
+    # Shield the shared task so one cancelled caller doesn't cancel it for everyone else
+    content = await asyncio.shield(task)
+    return copy.deepcopy(content)
+
+async def _extract_batch_item(index: int, url: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """Extract one URL of a batch under the shared concurrency limit."""
+    async with semaphore:
+        try:
+            content = await extract_url_content(url)
+            error = None if content else "Unable to extract content from the provided URL"
+        except Exception as e:
+            logger.error(f"Error extracting batch URL {url}: {str(e)}")
+            content, error = None, str(e)
+    return {
+        "index": index,
+        "url": url,
+        "success": content is not None,
+        "content": content,
+        "error": error,
+    }
+
+async def iter_extract_urls(urls: List[str], concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Extract several URLs concurrently and yield each result as soon as it completes.
+    Each result carries its input index; failures are reported per URL.
+    Pending extractions are cancelled if the consumer stops early.
+    """
+    # Fetch all uncached Reddit posts up front in bulk so their extractions are cache hits
+    await prefetch_reddit_posts(urls)
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [
+        asyncio.ensure_future(_extract_batch_item(index, url, semaphore))
+        for index, url in enumerate(urls)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+async def extract_urls(urls: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """
+    Extract several URLs concurrently and return the results in input order.
+    Total time is bounded by the slowest fetch rather than the sum of all of them.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+    async for result in iter_extract_urls(urls, concurrency):
+        results[result["index"]] = result
+    return results
+
+async def fetch_url_content(url: str, validators: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Extract content from a URL without consulting the cache.
+    Supports different content sources with domain-specific handlers.
+    
+    Args:
+        url: The URL to extract content from
+        validators: ETag / Last-Modified of a cached result, to make the request conditional
+        
+    Returns:
+        A dictionary containing the extracted content (with its "cache_validators"),
+        NOT_MODIFIED if the cached result is still current, or None if extraction failed
+    """
     try:
         # Parse the URL to determine the source
         parsed_url = urlparse(url)
         domain = parsed_url.netloc.lower()
         
-        # Set up common headers
-        headers = {
-            "User-Agent": DEFAULT_USER_AGENT,
-        }
+        # Reuse the shared, pooled client so connections stay warm between extractions
+        client = http_client.get_client()
         
-        # Increase timeout to handle slow responses
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Use domain-specific handlers
-            if 'reddit.com' in domain:
-                return await handle_reddit_url(url, client)
-            
-            # Generic handler for other URLs
-            try:
-                response = await client.get(url, headers=headers, follow_redirects=True)
-                response.raise_for_status()
-                
-                # For now, just return basic info
-                # This will be expanded to extract actual content based on the source
-                return {
-                    "url": url,
-                    "domain": domain,
-                    "status_code": response.status_code,
-                    "content_type": response.headers.get("content-type", ""),
-                    # Placeholder for actual content extraction
-                    "title": f"Content from {domain}",
-                    "text": "Placeholder text content. This will be replaced with actual content extraction.",
-                    "has_media": False,
-                }
-            except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP error: {e.response.status_code} for URL {url}")
-                return None
-            except httpx.RequestError as e:
-                logger.error(f"Request error for URL {url}: {str(e)}")
-                return None
+        # Dispatch to the handler registered for the domain (generic handler otherwise)
+        handler = handler_registry.resolve(domain)
+        try:
+            return await handler_registry.run(handler, url, client, validators)
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error: {e.response.status_code} for URL {url}")
+            return None
+        except httpx.RequestError as e:
+            logger.error(f"Request error for URL {url}: {str(e)}")
+            return None
             
     except Exception as e:
         logger.error(f"Error extracting content from {url}: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
+
+# Content source handlers, each with its own performance settings
+handler_registry.register(DomainHandler(
+    name="reddit",
+    domains=["reddit.com"],
+    handle=handle_reddit_url,
+    timeout=20.0,
+    concurrency=8,
+    cache_ttl=900,
+    requests_per_minute=60,
+    burst=5,
+    normalize_url=normalize_reddit_url,
+))
+handler_registry.register(DomainHandler(
+    name="generic",
+    domains=[],
+    handle=handle_generic_url,
+    timeout=15.0,
+    concurrency=16,
+    cache_ttl=settings.CONTENT_CACHE_TTL_SECONDS,
+), default=True)
@@ -0,0 +1,155 @@
+import httpx
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.services.content_cache import content_cache
+from app.services.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+class ExtractionContext:
+    """
+    Passed to a handler for one extraction.
+    Handlers publish partial results as they learn more, so something useful
+    can be returned if the handler runs out of time.
+    """
+
+    def __init__(self):
+        self.partial: Optional[Dict[str, Any]] = None
+
+    def publish(self, result: Dict[str, Any]):
+        """Record the best result known so far."""
+        self.partial = dict(result)
+
+HandlerFunc = Callable[
+    [str, Optional[httpx.AsyncClient], Optional[Dict[str, str]], Optional[ExtractionContext]],
+    Awaitable[Any]
+]
+
+class DomainHandler:
+    """
+    A content source handler and the performance settings it needs.
+
+    Args:
+        name: Handler name used in logs and stats
+        domains: Registrable domains the handler serves; subdomains match too
+        handle: async (url, client, validators, context) -> result, NOT_MODIFIED or None
+        timeout: Overall deadline for one extraction in seconds
+        concurrency: Maximum extractions running at once for this handler
+        cache_ttl: Content cache TTL in seconds for these domains
+        requests_per_minute: Rate limit for these domains (None keeps the limiter default)
+        burst: Rate limiter burst size
+        normalize_url: Optional function mapping URL variants to one cache key
+    """
+
+    def __init__(
+        self,
+        name: str,
+        domains: List[str],
+        handle: HandlerFunc,
+        timeout: float = 30.0,
+        concurrency: int = 10,
+        cache_ttl: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        burst: Optional[int] = None,
+        normalize_url: Optional[Callable[[str], str]] = None,
+    ):
+        self.name = name
+        self.domains = [domain.lower() for domain in domains]
+        self.handle = handle
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.cache_ttl = cache_ttl
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.normalize_url = normalize_url
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.calls = 0
+        self.in_flight = 0
+        self.timeouts = 0
+        self.partial_results = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "domains": self.domains,
+            "timeout": self.timeout,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "cache_ttl": self.cache_ttl,
+            "requests_per_minute": self.requests_per_minute,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "partial_results": self.partial_results,
+        }
+
+class HandlerRegistry:
+    """
+    Maps hosts to content handlers by registrable domain.
+    Lookups walk the host's label suffixes ("www.old.reddit.com", "old.reddit.com",
+    "reddit.com", "com"), one dictionary lookup each, instead of an if-chain of
+    substring checks.
+    """
+
+    def __init__(self):
+        self._by_domain: Dict[str, DomainHandler] = {}
+        self._handlers: Dict[str, DomainHandler] = {}
+        self.default: Optional[DomainHandler] = None
+
+    def register(self, handler: DomainHandler, default: bool = False):
+        """
+        Register a handler and apply its cache TTL and rate limit to its domains.
+        Explicit CONTENT_CACHE_DOMAIN_TTLS / RATE_LIMIT_DOMAIN_RPM settings take precedence.
+        """
+        self._handlers[handler.name] = handler
+        for domain in handler.domains:
+            self._by_domain[domain] = handler
+            if handler.cache_ttl is not None:
+                content_cache.domain_ttls.setdefault(domain, handler.cache_ttl)
+            if handler.requests_per_minute is not None and domain not in rate_limiter.domain_rpm:
+                rate_limiter.configure(domain, handler.requests_per_minute, handler.burst)
+        if default:
+            self.default = handler
+
+    def resolve(self, host: str) -> Optional[DomainHandler]:
+        """Return the handler for a host, falling back to the default handler."""
+        labels = host.lower().split(':')[0].split('.')
+        for i in range(len(labels)):
+            handler = self._by_domain.get('.'.join(labels[i:]))
+            if handler is not None:
+                return handler
+        return self.default
+
+    async def run(
+        self,
+        handler: DomainHandler,
+        url: str,
+        client: httpx.AsyncClient,
+        validators: Optional[Dict[str, str]] = None
+    ) -> Any:
+        """
+        Run a handler under its concurrency limit and deadline.
+        If the deadline passes, the last published partial result is returned
+        with "partial": True, or None if nothing was published.
+        """
+        context = ExtractionContext()
+        async with handler.semaphore:
+            handler.calls += 1
+            handler.in_flight += 1
+            try:
+                return await asyncio.wait_for(handler.handle(url, client, validators, context), handler.timeout)
+            except asyncio.TimeoutError:
+                handler.timeouts += 1
+                if context.partial is not None:
+                    handler.partial_results += 1
+                    logger.warning(f"{handler.name} handler timed out after {handler.timeout}s for {url}, returning partial result")
+                    return {**context.partial, "partial": True}
+                logger.error(f"{handler.name} handler timed out after {handler.timeout}s for {url}")
+                return None
+            finally:
+                handler.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return settings and counters for every registered handler."""
+        return {name: handler.stats() for name, handler in self._handlers.items()}
+
+handler_registry = HandlerRegistry()
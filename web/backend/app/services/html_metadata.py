@@ -0,0 +1,216 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, Optional
+from urllib.parse import urljoin
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Leading bytes of common binary formats, used when the Content-Type header is missing or wrong
+MAGIC_NUMBERS = [
+    (b"\xff\xd8\xff", "image"),          # JPEG
+    (b"\x89PNG\r\n\x1a\n", "image"),     # PNG
+    (b"GIF87a", "image"),
+    (b"GIF89a", "image"),
+    (b"\x1aE\xdf\xa3", "video"),         # WebM / Matroska
+    (b"ID3", "audio"),                   # MP3 with ID3 tag
+    (b"OggS", "audio"),
+    (b"%PDF", "binary"),
+    (b"PK\x03\x04", "binary"),           # ZIP and friends
+]
+
+def sniff_content_kind(content_type: str, head: bytes) -> str:
+    """
+    Classify a response as "html", "image", "video", "audio", "binary" or
+    "other" from its Content-Type header and first bytes.
+    """
+    for magic, kind in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image"
+    if head[4:8] == b"ftyp":
+        return "video"
+
+    content_type = (content_type or "").split(';')[0].strip().lower()
+    if content_type in HTML_CONTENT_TYPES:
+        return "html"
+    for kind in ("image", "video", "audio"):
+        if content_type.startswith(kind + "/"):
+            return kind
+    # Untyped responses that look like markup are still worth parsing
+    if not content_type or content_type == "text/plain":
+        sample = head.lstrip()[:64].lower()
+        if sample.startswith((b"<!doctype html", b"<html", b"<head")):
+            return "html"
+    return "other"
+
+# How much of the body to scan for a <meta charset> when the header declares none
+CHARSET_PRESCAN_BYTES = 1024
+
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+def _known_charset(charset: Optional[str]) -> Optional[str]:
+    if not charset:
+        return None
+    try:
+        codecs.lookup(charset)
+        return charset
+    except LookupError:
+        return None
+
+def charset_from_content_type(content_type: str) -> Optional[str]:
+    """Return the charset declared in a Content-Type header, or None if there is no usable one."""
+    for part in (content_type or "").split(';')[1:]:
+        key, _, value = part.strip().partition('=')
+        if key.lower() == "charset" and value:
+            return _known_charset(value.strip('"\' '))
+    return None
+
+def charset_from_body(head: bytes) -> Optional[str]:
+    """
+    Find the charset a page declares in its first bytes: a byte order mark,
+    <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">.
+    """
+    for bom, charset in BOMS:
+        if head.startswith(bom):
+            return charset
+    match = META_CHARSET_PATTERN.search(head[:CHARSET_PRESCAN_BYTES])
+    return _known_charset(match.group(1).decode("ascii")) if match else None
+
+class MetadataParser(HTMLParser):
+    """
+    Incremental parser that collects <title>, <meta> description, OpenGraph and
+    Twitter card tags and oEmbed links from a page's <head>.
+    Sets `done` once the head is over so the caller can stop reading.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.meta: Dict[str, str] = {}
+        self.oembed_url: Optional[str] = None
+        self.canonical_url: Optional[str] = None
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = {key.lower(): value for key, value in attrs if value is not None}
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or "").strip().lower()
+            content = attrs.get("content")
+            if key and content and key not in self.meta:
+                self.meta[key] = content.strip()
+        elif tag == "link":
+            rel = attrs.get("rel", "").lower()
+            link_type = attrs.get("type", "").lower()
+            href = attrs.get("href")
+            if not href:
+                return
+            if "alternate" in rel and link_type == "application/json+oembed" and not self.oembed_url:
+                self.oembed_url = href
+            elif rel == "canonical" and not self.canonical_url:
+                self.canonical_url = href
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            if self.title is None:
+                self.title = " ".join("".join(self._title_parts).split())
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def metadata(self, base_url: str) -> Dict[str, Any]:
+        """Return the collected metadata, with relative URLs resolved against base_url."""
+        def first(*keys):
+            for key in keys:
+                if self.meta.get(key):
+                    return self.meta[key]
+            return None
+
+        def absolute(value):
+            return urljoin(base_url, value) if value else None
+
+        return {
+            "title": first("og:title", "twitter:title") or self.title,
+            "description": first("og:description", "twitter:description", "description"),
+            "site_name": first("og:site_name", "application-name"),
+            "author": first("author", "article:author", "twitter:creator"),
+            "thumbnail_url": absolute(first("og:image", "og:image:url", "og:image:secure_url", "twitter:image", "twitter:image:src")),
+            "video_url": absolute(first("og:video", "og:video:url", "og:video:secure_url", "twitter:player:stream")),
+            "oembed_url": absolute(self.oembed_url),
+            "canonical_url": absolute(first("og:url") or self.canonical_url),
+        }
+
+class StreamingMetadataExtractor:
+    """
+    Feeds a response body to MetadataParser chunk by chunk and reports when
+    enough has been read. The body is decoded with the charset from the
+    Content-Type header; without one, the first CHARSET_PRESCAN_BYTES are
+    held back and scanned for a BOM or <meta charset>, falling back to UTF-8.
+    """
+
+    def __init__(self, content_type: str, max_bytes: int):
+        self.parser = MetadataParser()
+        self.charset = charset_from_content_type(content_type)
+        self.decoder = self._decoder(self.charset) if self.charset else None
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self._pending = b""
+
+    @staticmethod
+    def _decoder(charset: str):
+        return codecs.getincrementaldecoder(charset)(errors="replace")
+
+    @property
+    def done(self) -> bool:
+        return self.parser.done
+
+    @property
+    def truncated(self) -> bool:
+        return self.bytes_read >= self.max_bytes and not self.parser.done
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Parse another chunk. Returns True when the caller should stop reading,
+        either because the head has been parsed or the byte cap was reached.
+        """
+        remaining = self.max_bytes - self.bytes_read
+        chunk = chunk[:remaining]
+        self.bytes_read += len(chunk)
+        if self.decoder is None:
+            self._pending += chunk
+            if len(self._pending) < CHARSET_PRESCAN_BYTES and self.bytes_read < self.max_bytes:
+                return False
+            self._start_decoding()
+            chunk, self._pending = self._pending, b""
+        self.parser.feed(self.decoder.decode(chunk))
+        return self.parser.done or self.bytes_read >= self.max_bytes
+
+    def _start_decoding(self):
+        self.charset = charset_from_body(self._pending) or "utf-8"
+        self.decoder = self._decoder(self.charset)
+
+    def finish(self):
+        """Parse whatever is still held back once the body has ended."""
+        if self.decoder is None:
+            self._start_decoding()
+        self.parser.feed(self.decoder.decode(self._pending, final=True))
+        self._pending = b""
@@ -0,0 +1,229 @@
+import httpx
+import aiofiles
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from app.core.config import settings
+from app.core.database import db
+from app.core.http_client import http_client
+from app.services.rate_limiter import rate_limiter
+from app.services.content_retrieval import DEFAULT_USER_AGENT
+from app.services.mock_storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Objects are stored under their SHA-256, so identical media shared by many projects is stored once
+MEDIA_KEY_PREFIX = "media"
+
+class MediaTooLargeError(Exception):
+    """Raised when a media download exceeds MEDIA_INGEST_MAX_BYTES."""
+
+# Maps source URLs to the object they were stored as, so known media isn't downloaded again
+MEDIA_SOURCES_COLLECTION = "media_sources"
+
+def media_object_key(sha256: str) -> str:
+    """
+    Build the content-addressed storage key for a media object.
+    The key is the hash alone: the same bytes served with different
+    Content-Types (or URL extensions) must map to the same object.
+    """
+    return f"{MEDIA_KEY_PREFIX}/{sha256[:2]}/{sha256}"
+
+class MediaSourceIndex:
+    """
+    Index of source URL -> stored media record.
+    Backed by the MongoDB "media_sources" collection, or an in-process dict
+    on the mock database.
+    """
+
+    def __init__(self):
+        self.local_index: Dict[str, Dict[str, Any]] = {}
+
+    def _collection(self):
+        """Return the MongoDB collection, or None when running on the mock database."""
+        if db.is_mock:
+            return None
+        mongo_db = db.get_db()
+        return mongo_db[MEDIA_SOURCES_COLLECTION] if mongo_db is not None else None
+
+    async def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the record stored for a source URL, or None if it was never ingested."""
+        collection = self._collection()
+        try:
+            if collection is None:
+                return self.local_index.get(url)
+            entry = await collection.find_one({"_id": url})
+        except Exception as e:
+            logger.warning(f"Media source lookup failed for {url}: {str(e)}")
+            return None
+        if entry:
+            entry.pop("_id", None)
+        return entry
+
+    async def set(self, record: Dict[str, Any]):
+        """Record where a source URL's media is stored."""
+        url = record["source_url"]
+        collection = self._collection()
+        try:
+            if collection is None:
+                self.local_index[url] = dict(record)
+            else:
+                await collection.replace_one({"_id": url}, {"_id": url, **record}, upsert=True)
+        except Exception as e:
+            logger.warning(f"Media source index write failed for {url}: {str(e)}")
+
+media_sources = MediaSourceIndex()
+
+async def _stored_record(url: str, known: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Return a previous ingestion record for url whose object is still in storage."""
+    for record in (known, await media_sources.get(url)):
+        if record and record.get("source_url") == url and record.get("key") and await storage.object_exists(record["key"]):
+            return record
+    return None
+
+async def ingest_media_url(
+    url: str,
+    client: Optional[httpx.AsyncClient] = None,
+    known: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Stream a remote media file into storage.
+    URLs that were ingested before (per the scene's own record or the source
+    index) are not downloaded again as long as their object is still stored.
+    Otherwise the body is written to a temporary file chunk by chunk while
+    being hashed, so whole files are never held in memory, and the upload is
+    skipped when an object with the same content hash already exists.
+
+    Args:
+        url: Remote media URL
+        client: HTTP client to use (defaults to the shared client)
+        known: A previous ingestion record for this URL, e.g. from the scene
+
+    Returns:
+        Dictionary with the stored key, size, MIME type and hash, or None if ingestion failed
+    """
+    stored = await _stored_record(url, known)
+    if stored:
+        logger.debug(f"Media from {url} already stored as {stored['key']}, skipping download")
+        return {**stored, "deduplicated": True}
+
+    if client is None:
+        client = http_client.get_client()
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    temp_file.close()
+    try:
+        hasher = hashlib.sha256()
+        size = 0
+        async with rate_limiter.stream(client, "GET", url, headers={"User-Agent": DEFAULT_USER_AGENT}) as response:
+            response.raise_for_status()
+            mime_type = response.headers.get("content-type", "").split(';')[0].strip().lower()
+            if mime_type.startswith("text/"):
+                logger.warning(f"Not ingesting {url}: it is a {mime_type} page, not media")
+                return None
+            declared_size = response.headers.get("content-length")
+            if declared_size and declared_size.isdigit() and int(declared_size) > settings.MEDIA_INGEST_MAX_BYTES:
+                raise MediaTooLargeError(f"{url} is {declared_size} bytes")
+
+            async with aiofiles.open(temp_file.name, 'wb') as f:
+                async for chunk in response.aiter_bytes(settings.MEDIA_INGEST_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > settings.MEDIA_INGEST_MAX_BYTES:
+                        raise MediaTooLargeError(f"{url} exceeds {settings.MEDIA_INGEST_MAX_BYTES} bytes")
+                    hasher.update(chunk)
+                    await f.write(chunk)
+
+        if not mime_type or mime_type == "application/octet-stream":
+            mime_type = mimetypes.guess_type(urlparse(url).path)[0] or "application/octet-stream"
+
+        sha256 = hasher.hexdigest()
+        key = media_object_key(sha256)
+
+        deduplicated = await storage.object_exists(key)
+        if deduplicated:
+            logger.debug(f"Media from {url} already stored as {key}, skipping upload")
+        else:
+            success, result = await storage.upload_file(temp_file.name, key, content_type=mime_type)
+            if not success:
+                logger.error(f"Failed to upload media from {url}: {result}")
+                return None
+
+        record = {
+            "key": key,
+            "sha256": sha256,
+            "size": size,
+            "mime_type": mime_type,
+            "source_url": url,
+        }
+        await media_sources.set(record)
+        return {**record, "deduplicated": deduplicated}
+    except (httpx.HTTPError, MediaTooLargeError) as e:
+        logger.error(f"Error ingesting media from {url}: {str(e)}")
+        return None
+    finally:
+        if os.path.exists(temp_file.name):
+            os.remove(temp_file.name)
+
+def scene_media_urls(scene: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect the remote media URLs referenced by a scene."""
+    preview_urls = []
+    for image in scene.get("preview_images") or []:
+        image_url = image.get("url") if isinstance(image, dict) else image
+        if image_url:
+            preview_urls.append(image_url)
+    # Prefer the downscaled render-size copy over the full-size original
+    media_url = scene.get("render_media_url") or scene.get("media_url")
+    # External videos (YouTube etc.) point at a player page, not a media file
+    if scene.get("media_type") == "external_video":
+        media_url = None
+    return {
+        "media_url": media_url,
+        "gallery_items": [item for item in scene.get("gallery_items") or [] if item],
+        "preview_images": preview_urls,
+    }
+
+async def ingest_scene_media(scene: Dict[str, Any], semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """
+    Ingest all media referenced by a scene (media_url, gallery_items, preview_images).
+
+    Args:
+        scene: Scene dictionary as stored on the project
+        semaphore: Optional limit on concurrent downloads, shared across scenes
+
+    Returns:
+        Dictionary of scene fields to set: "stored_media", "stored_gallery_items"
+        and "stored_preview_images", each holding ingestion records
+    """
+    semaphore = semaphore or asyncio.Semaphore(settings.MEDIA_INGEST_CONCURRENCY)
+    urls = scene_media_urls(scene)
+    # Records from an earlier ingestion of this scene, by source URL
+    known = {
+        record["source_url"]: record
+        for record in [scene.get("stored_media")] + (scene.get("stored_gallery_items") or []) + (scene.get("stored_preview_images") or [])
+        if isinstance(record, dict) and record.get("source_url")
+    }
+
+    async def ingest(url: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not url:
+            return None
+        async with semaphore:
+            return await ingest_media_url(url, known=known.get(url))
+
+    async def ingest_all(url_list: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(ingest(url) for url in url_list)))
+
+    media, gallery, previews = await asyncio.gather(
+        ingest(urls["media_url"]),
+        ingest_all(urls["gallery_items"]),
+        ingest_all(urls["preview_images"]),
+    )
+    return {
+        "stored_media": media,
+        "stored_gallery_items": gallery,
+        "stored_preview_images": previews,
+    }
@@ -16,7 +16,12 @@ class MockStorage:
         self.storage_dir = os.path.join(os.path.dirname(__file__), "../..", "temp_storage")
         os.makedirs(self.storage_dir, exist_ok=True)
     
-    async def upload_file(self, file_path: str, object_name: Optional[str] = None) -> Tuple[bool, str]:
+    async def upload_file(
+        self,
+        file_path: str,
+        object_name: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Tuple[bool, str]:
         """Mock file upload that copies to local directory."""
         if not os.path.exists(file_path):
             return False, f"File {file_path} does not exist"
@@ -26,12 +31,17 @@ class MockStorage:
             
         try:
             dest_path = os.path.join(self.storage_dir, object_name)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
             shutil.copy2(file_path, dest_path)
             return True, f"file://{dest_path}"
         except Exception as e:
             logger.error(f"Error in mock upload: {str(e)}")
             return False, str(e)
     
+    async def object_exists(self, object_name: str) -> bool:
+        """Mock existence check against the local directory."""
+        return os.path.exists(os.path.join(self.storage_dir, object_name))
+    
     async def download_file(self, object_name: str, file_path: str) -> Tuple[bool, str]:
         """Mock file download that copies from local directory."""
         try:
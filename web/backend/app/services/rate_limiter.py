@@ -0,0 +1,228 @@
+import httpx
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+from app.core.config import settings, parse_int_mapping
+from app.core.http_client import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean "slow down and try again"
+RETRYABLE_STATUS_CODES = {429, 503}
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+class DomainBucket:
+    """
+    Token bucket for a single domain whose refill rate adapts to the server.
+    The rate follows x-ratelimit-remaining / x-ratelimit-reset when the server
+    reports them, is halved on every 429, and creeps back up on success.
+    """
+
+    def __init__(self, domain: str, requests_per_minute: float, burst: int):
+        self.domain = domain
+        self.max_rate = requests_per_minute / 60.0
+        self.min_rate = self.max_rate / 20.0
+        self.rate = self.max_rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.server_remaining: Optional[float] = None
+        self.server_reset: Optional[float] = None
+        self.requests = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.total_wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how long the caller must wait before sending.
+        Tokens may go negative, which queues callers fairly without holding a lock.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = 0.0
+        if self.tokens < 0:
+            wait = -self.tokens / self.rate
+        wait = max(wait, self.blocked_until - now)
+        self.requests += 1
+        if wait > 0:
+            self.throttled += 1
+            self.total_wait_seconds += wait
+        return wait
+
+    def block_for(self, seconds: float):
+        """Hold all requests to this domain for the given number of seconds."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def record_response(self, response: httpx.Response):
+        """Adapt the rate to a response's status and rate-limit headers."""
+        remaining = _parse_float(response.headers.get("x-ratelimit-remaining"))
+        reset = _parse_float(response.headers.get("x-ratelimit-reset"))
+        if remaining is not None and reset is not None:
+            self.server_remaining = remaining
+            self.server_reset = reset
+            if remaining < 1:
+                self.block_for(reset)
+            else:
+                # Spread what's left of the window evenly over the time until it resets
+                self.rate = min(self.max_rate, max(self.min_rate, remaining / max(reset, 1.0)))
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            self.rate_limited += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            if retry_after is not None:
+                self.block_for(retry_after)
+        elif remaining is None:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "rate_per_minute": round(self.rate * 60, 2),
+            "max_rate_per_minute": round(self.max_rate * 60, 2),
+            "tokens": round(min(self.capacity, self.tokens + (now - self.updated) * self.rate), 2),
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 2),
+            "server_remaining": self.server_remaining,
+            "server_reset_seconds": self.server_reset,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "rate_limited": self.rate_limited,
+            "total_wait_seconds": round(self.total_wait_seconds, 2),
+        }
+
+class RateLimiter:
+    """
+    Per-domain adaptive rate limiter that all outbound fetches go through.
+    Honors Retry-After and x-ratelimit-* headers and retries 429/503 responses
+    with jittered exponential backoff.
+    """
+
+    def __init__(self):
+        self.default_rpm = settings.RATE_LIMIT_DEFAULT_RPM
+        self.domain_rpm = parse_int_mapping(settings.RATE_LIMIT_DOMAIN_RPM)
+        self.burst = settings.RATE_LIMIT_BURST
+        self.max_retries = settings.RATE_LIMIT_MAX_RETRIES
+        self.backoff_base = settings.RATE_LIMIT_BACKOFF_BASE_SECONDS
+        self.backoff_max = settings.RATE_LIMIT_BACKOFF_MAX_SECONDS
+        self.buckets: Dict[str, DomainBucket] = {}
+
+    def domain_key(self, url: str) -> str:
+        """
+        Map a URL to its bucket: the longest configured domain suffix of the
+        host, or otherwise the full host. Guessing the registrable domain from
+        the last labels would put every *.co.uk site in one bucket.
+        """
+        host = (urlparse(url).hostname or "").lower()
+        labels = host.split('.')
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            if candidate in self.domain_rpm:
+                return candidate
+        return host
+
+    def configure(self, domain: str, requests_per_minute: float, burst: Optional[int] = None):
+        """Set the request rate for a domain, replacing any existing bucket."""
+        domain = domain.lower()
+        self.domain_rpm[domain] = requests_per_minute
+        self.buckets[domain] = DomainBucket(domain, requests_per_minute, burst or self.burst)
+
+    def bucket_for(self, url: str) -> DomainBucket:
+        domain = self.domain_key(url)
+        bucket = self.buckets.get(domain)
+        if bucket is None:
+            rpm = self.domain_rpm.get(domain, self.default_rpm)
+            bucket = self.buckets[domain] = DomainBucket(domain, rpm, self.burst)
+        return bucket
+
+    async def acquire(self, url: str):
+        """Wait until a request to the URL's domain is allowed."""
+        wait = self.bucket_for(url).reserve()
+        if wait > 0:
+            logger.debug(f"Rate limiting {self.domain_key(url)}: waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def record_response(self, url: str, response: httpx.Response):
+        """Feed a response back into the domain's bucket."""
+        self.bucket_for(url).record_response(response)
+
+    def backoff_delay(self, attempt: int, response: httpx.Response) -> float:
+        """
+        Delay before retrying: the server's Retry-After if given,
+        otherwise full-jitter exponential backoff.
+        """
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request through the limiter, retrying 429/503 responses.
+        Returns the last response, which may still be a 429 once retries run out.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(url)
+            response = await client.request(method, url, **kwargs)
+            self.record_response(url, response)
+
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            delay = self.backoff_delay(attempt, response)
+            logger.warning(f"{response.status_code} from {url}, retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @asynccontextmanager
+    async def stream(self, client: httpx.AsyncClient, method: str, url: str, follow_redirects: bool = True, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        Stream a response through the limiter, retrying 429/503 responses
+        before any of the body is read. The response is closed on exit.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(url)
+            request = client.build_request(method, url, **kwargs)
+            response = await client.send(request, stream=True, follow_redirects=follow_redirects)
+            self.record_response(url, response)
+
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                break
+
+            await response.aclose()
+            delay = self.backoff_delay(attempt, response)
+            logger.warning(f"{response.status_code} from {url}, retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def get(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """GET a URL through the limiter."""
+        return await self.request(client, "GET", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current state of every domain bucket."""
+        return {domain: bucket.stats() for domain, bucket in self.buckets.items()}
+
+rate_limiter = RateLimiter()
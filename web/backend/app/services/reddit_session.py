@@ -0,0 +1,130 @@
+import httpx
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from app.core.config import settings
+from app.services.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+REDDIT_HOME_URL = "https://www.reddit.com/"
+
+# Status codes that mean Reddit no longer accepts our session cookies.
+# 429s are left to the rate limiter, which already retries them with backoff.
+SESSION_REFRESH_STATUS_CODES = {403}
+
+class RedditSessionManager:
+    """
+    Keeps a primed Reddit cookie jar shared by all extractions.
+    Cookies are fetched once from the Reddit homepage and reused until they
+    expire, pass the configured TTL, or Reddit answers with 403.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600.0):
+        self.ttl_seconds = ttl_seconds
+        self.cookies = httpx.Cookies()
+        self.primed_at: Optional[float] = None
+        self.generation = 0
+        self._lock = asyncio.Lock()
+
+    def is_valid(self) -> bool:
+        """Return True if the session is primed, within its TTL and no cookie has expired."""
+        if self.primed_at is None:
+            return False
+        if time.monotonic() - self.primed_at > self.ttl_seconds:
+            return False
+        return not any(cookie.is_expired() for cookie in self.cookies.jar)
+
+    def apply(self, headers: Dict[str, str]) -> Dict[str, str]:
+        """
+        Return a copy of headers with the session cookies attached.
+        An explicit Cookie header takes precedence over the client's own jar.
+        """
+        request_headers = dict(headers)
+        cookie_header = "; ".join(f"{cookie.name}={cookie.value}" for cookie in self.cookies.jar)
+        if cookie_header:
+            request_headers["Cookie"] = cookie_header
+        return request_headers
+
+    def update_from_response(self, response: httpx.Response):
+        """Store any cookies Reddit sets on a response."""
+        self.cookies.extract_cookies(response)
+
+    async def _prime(self, client: httpx.AsyncClient, headers: Dict[str, str]):
+        """
+        Fetch the Reddit homepage once to obtain fresh session cookies.
+        The session is only replaced when Reddit answers with a 2xx; otherwise
+        it stays unprimed and the next request tries again.
+        """
+        logger.debug("Priming Reddit session cookies")
+        response = await rate_limiter.get(client, REDDIT_HOME_URL, headers=headers, follow_redirects=True)
+        if not response.is_success:
+            logger.warning(f"Could not prime Reddit session: homepage returned {response.status_code}")
+            return
+        cookies = httpx.Cookies()
+        cookies.extract_cookies(response)
+        self.cookies = cookies
+        self.primed_at = time.monotonic()
+        self.generation += 1
+        logger.debug(f"Reddit session primed with {len(self.cookies.jar)} cookies")
+
+    async def ensure_session(self, client: httpx.AsyncClient, headers: Dict[str, str]):
+        """
+        Prime the session if it is missing or expired.
+        Concurrent callers wait on a single priming request.
+        """
+        if self.is_valid():
+            return
+        async with self._lock:
+            if self.is_valid():
+                return
+            await self._prime(client, headers)
+
+    async def refresh(self, client: httpx.AsyncClient, headers: Dict[str, str], seen_generation: int):
+        """
+        Re-prime the session after Reddit rejected it.
+        Skipped if another caller already refreshed since seen_generation.
+        """
+        async with self._lock:
+            if self.generation != seen_generation:
+                return
+            await self._prime(client, headers)
+
+    async def get(self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> httpx.Response:
+        """
+        GET a Reddit URL with the shared session cookies, through the rate limiter.
+        On 403 the session is refreshed once and the request retried; if the
+        refresh fails the original response is returned.
+        """
+        try:
+            await self.ensure_session(client, headers)
+        except httpx.RequestError as e:
+            # Reddit usually still answers without cookies, so don't fail the request here
+            logger.warning(f"Could not prime Reddit session: {str(e)}")
+
+        generation = self.generation
+        response = await rate_limiter.get(client, url, headers=self.apply(headers), follow_redirects=True)
+        self.update_from_response(response)
+
+        if response.status_code in SESSION_REFRESH_STATUS_CODES:
+            logger.warning(f"Reddit returned {response.status_code} for {url}, refreshing session")
+            try:
+                await self.refresh(client, headers, generation)
+            except httpx.RequestError as e:
+                logger.warning(f"Could not refresh Reddit session: {str(e)}")
+                return response
+            if self.generation == generation:
+                # Nothing new to retry with
+                return response
+            response = await rate_limiter.get(client, url, headers=self.apply(headers), follow_redirects=True)
+            self.update_from_response(response)
+
+        return response
+
+    def reset(self):
+        """Drop the current session so the next request primes a new one."""
+        self.cookies = httpx.Cookies()
+        self.primed_at = None
+
+reddit_session = RedditSessionManager(ttl_seconds=settings.REDDIT_SESSION_TTL_SECONDS)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import db
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "rewrite_cache"
+
+def normalize_rewrite_text(text: str) -> str:
+    """Collapse whitespace so inputs that differ only in spacing share a cache entry."""
+    return " ".join(text.split())
+
+def rewrite_cache_key(text: str, style: str, max_length: Optional[int], model: str, prompt_version: str) -> str:
+    """
+    Hash everything that determines a rewrite: the normalized text, style,
+    length limit, model and prompt version. Changing the prompt or model
+    therefore never serves rewrites produced by the old one.
+    """
+    payload = json.dumps(
+        [normalize_rewrite_text(text), (style or "").strip().lower(), max_length, model, prompt_version],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class RewriteCache:
+    """
+    Two-tier cache for text rewrites.
+    The first tier is a bounded in-process LRU; the second is the MongoDB
+    "rewrite_cache" collection with a TTL index, shared by all workers.
+    """
+
+    def __init__(self):
+        self.enabled = settings.REWRITE_CACHE_ENABLED
+        self.ttl = settings.REWRITE_CACHE_TTL_SECONDS
+        self.memory = TTLCache(max_size=settings.REWRITE_CACHE_MAX_ENTRIES, default_ttl=self.ttl)
+        self.db_hits = 0
+        self.db_misses = 0
+        self.db_errors = 0
+        self.bypassed = 0
+
+    def _collection(self):
+        """Return the MongoDB collection, or None when running on the mock database."""
+        if db.is_mock:
+            return None
+        mongo_db = db.get_db()
+        return mongo_db[COLLECTION_NAME] if mongo_db is not None else None
+
+    async def ensure_indexes(self):
+        """
+        Create the TTL index that lets MongoDB purge expired rewrites.
+        Called once on application startup.
+        """
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            logger.debug(f"Ensured TTL index on {COLLECTION_NAME}.expires_at")
+        except Exception as e:
+            logger.warning(f"Could not create TTL index on {COLLECTION_NAME}: {str(e)}")
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached rewrite, checking memory first and MongoDB second."""
+        if not self.enabled:
+            return None
+
+        rewritten = self.memory.get(key)
+        if rewritten is not None:
+            return rewritten
+
+        collection = self._collection()
+        if collection is None:
+            return None
+
+        try:
+            doc = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        except Exception as e:
+            self.db_errors += 1
+            logger.warning(f"Rewrite cache lookup failed for {key}: {str(e)}")
+            return None
+
+        if not doc:
+            self.db_misses += 1
+            return None
+
+        self.db_hits += 1
+        remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        self.memory.set(key, doc["rewritten"], ttl=remaining)
+        return doc["rewritten"]
+
+    async def set(self, key: str, rewritten: str, model: str, style: str, max_length: Optional[int]):
+        """Store a rewrite in both tiers."""
+        if not self.enabled:
+            return
+
+        self.memory.set(key, rewritten)
+
+        collection = self._collection()
+        if collection is None:
+            return
+
+        now = datetime.utcnow()
+        try:
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "rewritten": rewritten,
+                    "model": model,
+                    "style": style,
+                    "max_length": max_length,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            self.db_errors += 1
+            logger.warning(f"Rewrite cache write failed for {key}: {str(e)}")
+
+    def record_bypass(self):
+        """Count a request that skipped the cache (force_refresh)."""
+        self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for both tiers."""
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.db_hits
+        return {
+            "enabled": self.enabled,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory": memory,
+            "database": {
+                "available": self._collection() is not None,
+                "hits": self.db_hits,
+                "misses": self.db_misses,
+                "errors": self.db_errors,
+            },
+            "bypassed": self.bypassed,
+        }
+
+rewrite_cache = RewriteCache()
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.core.database import db
+from app.services.content_retrieval import fetch_reddit_posts, fetch_url_content, parse_reddit_post_id
+
+logger = logging.getLogger(__name__)
+
+# Scene fields that come from the source post and are safe to overwrite;
+# user-edited fields (title, text_content, ...) are left alone
+SCENE_REFRESH_FIELDS = (
+    "up_votes",
+    "down_votes",
+    "score",
+    "media_url",
+    "render_media_url",
+    "thumbnail_url",
+    "preview_images",
+    "gallery_items",
+    "gallery_variants",
+)
+
+# Only the fields needed to refetch and reschedule a due scene
+SCENE_SCAN_FIELDS = (
+    "url",
+    "source_refresh_attempts",
+    "source_refresh_due_at",
+    "media_url",
+    "render_media_url",
+    "preview_images",
+)
+
+def signed_url_expiry(url: Optional[str]) -> Optional[float]:
+    """
+    Return the epoch time a signed media URL expires at, or None if the URL
+    carries no expiry. Understands "expires"/"exp" epoch parameters,
+    S3-style X-Amz-Date + X-Amz-Expires and hex "oe" parameters.
+    """
+    if not url or '?' not in url:
+        return None
+    params = {key.lower(): value for key, value in parse_qsl(urlparse(url).query)}
+    try:
+        for key in ("expires", "exp"):
+            if params.get(key, "").isdigit():
+                return float(params[key])
+        if "x-amz-date" in params and "x-amz-expires" in params:
+            signed_at = datetime.strptime(params["x-amz-date"], "%Y%m%dT%H%M%SZ")
+            return (signed_at - datetime(1970, 1, 1)).total_seconds() + float(params["x-amz-expires"])
+        if "oe" in params:
+            return float(int(params["oe"], 16))
+    except ValueError:
+        return None
+    return None
+
+def _scene_media_urls(scene: Dict[str, Any]) -> List[Optional[str]]:
+    media_urls = [scene.get("media_url"), scene.get("render_media_url")]
+    media_urls += [image.get("url") if isinstance(image, dict) else image for image in scene.get("preview_images") or []]
+    return media_urls
+
+def scene_refresh_due_at(scene: Dict[str, Any], fetched_at: datetime, now: datetime) -> datetime:
+    """
+    When a scene fetched at fetched_at is next due for a refresh: once its data
+    reaches SCENE_REFRESH_MAX_AGE_SECONDS, or earlier when a signed media URL
+    expires within the margin before that. Never sooner than
+    SCENE_REFRESH_RETRY_SECONDS from now, so sources that only hand out
+    short-lived URLs aren't refetched on every run.
+    """
+    due_at = fetched_at + timedelta(seconds=settings.SCENE_REFRESH_MAX_AGE_SECONDS)
+    for media_url in _scene_media_urls(scene):
+        expires_at = signed_url_expiry(media_url)
+        if expires_at is not None:
+            due_at = min(due_at, datetime.utcfromtimestamp(expires_at - settings.SCENE_REFRESH_EXPIRY_MARGIN_SECONDS))
+    return max(due_at, now + timedelta(seconds=settings.SCENE_REFRESH_RETRY_SECONDS))
+
+def scene_retry_at(attempts: int, now: datetime) -> datetime:
+    """When to retry a scene after attempts consecutive failed refreshes (exponential backoff)."""
+    delay = settings.SCENE_REFRESH_RETRY_SECONDS * 2 ** max(0, attempts - 1)
+    return now + timedelta(seconds=min(delay, settings.SCENE_REFRESH_MAX_BACKOFF_SECONDS))
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return None
+
+def stamp_scene_sources(scenes: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Record when each scene's source data was fetched and schedule its next
+    refresh. Called when scenes are saved, so new scenes aren't refetched
+    straight away; scenes that already carry a fetch time (round-tripped
+    through the API as ISO strings) keep it.
+    """
+    now = now or datetime.utcnow()
+    for scene in scenes:
+        if not scene.get("url"):
+            continue
+        fetched_at = _parse_datetime(scene.get("source_fetched_at")) or now
+        scene["source_fetched_at"] = fetched_at
+        attempted_at = _parse_datetime(scene.get("source_refresh_attempted_at"))
+        if attempted_at:
+            scene["source_refresh_attempted_at"] = attempted_at
+        due_at = _parse_datetime(scene.get("source_refresh_due_at"))
+        scene["source_refresh_due_at"] = due_at or scene_refresh_due_at(scene, fetched_at, now)
+    return scenes
+
+class SceneRefresher:
+    """
+    Periodically re-fetches the source data of saved scenes whose data is old
+    or whose signed media URLs are about to expire, so renders never run into
+    expired media. Reddit posts are fetched in bulk through /api/info.json and
+    each scene is updated with a targeted $set.
+
+    Every scene carries source_refresh_due_at, so due scenes are selected by
+    an indexed query. Each attempt is recorded in source_refresh_attempted_at;
+    failed ones (deleted posts, unsupported URLs) are retried with exponential
+    backoff instead of being picked up again on every run.
+    """
+
+    def __init__(self):
+        self.enabled = settings.SCENE_REFRESH_ENABLED
+        self.interval = settings.SCENE_REFRESH_INTERVAL_SECONDS
+        self.batch_size = settings.SCENE_REFRESH_BATCH_SIZE
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        """Start the refresh loop. Called once on application startup."""
+        if not self.enabled or self._task is not None:
+            return
+        if db.is_mock:
+            logger.info("Scene refresher disabled: running on the mock database")
+            return
+        self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the refresh loop. Called on application shutdown."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def ensure_indexes(self):
+        """
+        Create the index used to select due scenes.
+        Called once on application startup.
+        """
+        if db.is_mock or db.get_db() is None:
+            return
+        try:
+            await db.get_db().projects.create_index("scenes.source_refresh_due_at")
+            logger.debug("Ensured index on projects.scenes.source_refresh_due_at")
+        except Exception as e:
+            logger.warning(f"Could not create index on projects.scenes.source_refresh_due_at: {str(e)}")
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Scene refresh run failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def find_due_scenes(self) -> List[Tuple[Any, int, Dict[str, Any]]]:
+        """
+        Select the most overdue scenes, up to batch_size, with an aggregation
+        over the due-time index. Scenes saved before due times existed have
+        none and count as due.
+        Returns (project_id, scene_index, scene) tuples.
+        """
+        due_condition = {
+            "url": {"$nin": [None, ""]},
+            "$or": [
+                {"source_refresh_due_at": {"$lte": datetime.utcnow()}},
+                {"source_refresh_due_at": None},
+            ],
+        }
+        pipeline = [
+            {"$match": {"scenes": {"$elemMatch": due_condition}}},
+            {"$project": {f"scenes.{field}": 1 for field in SCENE_SCAN_FIELDS}},
+            {"$unwind": {"path": "$scenes", "includeArrayIndex": "scene_index"}},
+            {"$match": {
+                "scenes.url": due_condition["url"],
+                "$or": [{f"scenes.{key}": value for key, value in branch.items()} for branch in due_condition["$or"]],
+            }},
+            {"$sort": {"scenes.source_refresh_due_at": 1}},
+            {"$limit": self.batch_size},
+        ]
+        cursor = db.get_db().projects.aggregate(pipeline)
+        return [(doc["_id"], doc["scene_index"], doc["scenes"]) async for doc in cursor]
+
+    async def _fetch_sources(self, urls: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Re-fetch source data: Reddit posts in bulk, anything else one by one."""
+        reddit_urls = [url for url in urls if parse_reddit_post_id(url)]
+        other_urls = [url for url in urls if not parse_reddit_post_id(url)]
+
+        results = await fetch_reddit_posts(reddit_urls) if reddit_urls else {}
+
+        semaphore = asyncio.Semaphore(settings.CONTENT_BATCH_CONCURRENCY)
+
+        async def fetch_one(url: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await fetch_url_content(url)
+
+        for url, content in zip(other_urls, await asyncio.gather(*(fetch_one(url) for url in other_urls))):
+            results[url] = content
+        return results
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        Refresh one batch of due scenes.
+
+        Returns:
+            Dictionary with the number of scenes found due, refreshed and failed
+        """
+        due = await self.find_due_scenes()
+        self.runs += 1
+        self.last_run_at = datetime.utcnow()
+        if not due:
+            return {"due": 0, "refreshed": 0, "failed": 0}
+
+        urls = list(dict.fromkeys(scene["url"] for _, _, scene in due))
+        sources = await self._fetch_sources(urls)
+
+        now = datetime.utcnow()
+        updates = []
+        refreshed = 0
+        failed = 0
+        for project_id, index, scene in due:
+            content = sources.get(scene["url"])
+            if content:
+                fields = {field: content[field] for field in SCENE_REFRESH_FIELDS if field in content}
+                fields["source_fetched_at"] = now
+                fields["source_refresh_attempts"] = 0
+                fields["source_refresh_due_at"] = scene_refresh_due_at({**scene, **fields}, now, now)
+                refreshed += 1
+            else:
+                attempts = (scene.get("source_refresh_attempts") or 0) + 1
+                fields = {
+                    "source_refresh_attempts": attempts,
+                    "source_refresh_due_at": scene_retry_at(attempts, now),
+                }
+                failed += 1
+            fields["source_refresh_attempted_at"] = now
+            # Matching on the scene URL skips scenes that were moved or removed meanwhile
+            updates.append(UpdateOne(
+                {"_id": project_id, f"scenes.{index}.url": scene["url"]},
+                {"$set": {f"scenes.{index}.{field}": value for field, value in fields.items()}}
+            ))
+        if updates:
+            await db.get_db().projects.bulk_write(updates, ordered=False)
+
+        self.refreshed += refreshed
+        self.failed += failed
+        logger.info(f"Scene refresh: {len(due)} due, {refreshed} refreshed, {failed} failed")
+        return {"due": len(due), "refreshed": refreshed, "failed": failed}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_error": self.last_error,
+        }
+
+scene_refresher = SceneRefresher()
@@ -25,13 +25,19 @@ class R2Storage:
             aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY,
         )
     
-    async def upload_file(self, file_path: str, object_name: Optional[str] = None) -> Tuple[bool, str]:
+    async def upload_file(
+        self,
+        file_path: str,
+        object_name: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Tuple[bool, str]:
         """
         Upload a file to R2 storage.
         
         Args:
             file_path: Path to the file to upload
             object_name: S3 object name (if not specified, file_path's basename is used)
+            content_type: MIME type to store with the object
             
         Returns:
             Tuple of (success, url or error message)
@@ -43,13 +49,30 @@ class R2Storage:
             object_name = os.path.basename(file_path)
         
         try:
-            self.s3.upload_file(file_path, self.bucket_name, object_name)
+            extra_args = {"ContentType": content_type} if content_type else None
+            self.s3.upload_file(file_path, self.bucket_name, object_name, ExtraArgs=extra_args)
             url = f"{self.endpoint_url}/{self.bucket_name}/{object_name}"
             return True, url
         except Exception as e:
             logger.error(f"Error uploading file to R2: {str(e)}")
             return False, str(e)
     
+    async def object_exists(self, object_name: str) -> bool:
+        """
+        Check whether an object already exists in R2 storage.
+        
+        Args:
+            object_name: The S3 object name to check
+            
+        Returns:
+            True if the object exists
+        """
+        try:
+            self.s3.head_object(Bucket=self.bucket_name, Key=object_name)
+            return True
+        except Exception:
+            return False
+    
     async def download_file(self, object_name: str, file_path: str) -> Tuple[bool, str]:
         """
         Download a file from R2 storage.
@@ -0,0 +1,41 @@
+import re
+from typing import List
+
+# A sentence ends at ., !, ? or an ellipsis, plus any closing quotes or brackets,
+# followed by whitespace or the end of the text
+SENTENCE_END_PATTERN = re.compile(r"[.!?…](?:[\"')\]]*)(?=\s|$)")
+
+def sentence_ends(text: str) -> List[int]:
+    """Offsets just past each sentence end in text."""
+    return [match.end() for match in SENTENCE_END_PATTERN.finditer(text)]
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences. Trailing text without a sentence end
+    is returned as a final sentence.
+    """
+    ends = sentence_ends(text)
+    if not ends or ends[-1] < len(text):
+        ends.append(len(text))
+    sentences = []
+    start = 0
+    for end in ends:
+        sentence = text[start:end].strip()
+        start = end
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+def split_at_words(text: str, max_chars: int) -> List[str]:
+    """Split text into pieces of up to max_chars at word boundaries (longer words are kept whole)."""
+    pieces = []
+    current = ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
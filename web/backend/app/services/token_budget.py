@@ -0,0 +1,91 @@
+import logging
+import math
+from functools import lru_cache
+from typing import Any, Optional
+from app.core.config import settings
+from app.services.text_utils import sentence_ends
+
+logger = logging.getLogger(__name__)
+
+# Heuristic used when tiktoken isn't installed or its encoding can't be loaded:
+# English averages ~4 characters per token, so 3 keeps counts on the safe (high) side
+HEURISTIC_CHARS_PER_TOKEN = 3.0
+
+# Output budget: characters per token assumed when converting max_length to
+# max_tokens, and the safety margin on top
+OUTPUT_CHARS_PER_TOKEN = 3.0
+OUTPUT_TOKEN_MARGIN = 1.2
+OUTPUT_TOKEN_OVERHEAD = 16
+
+@lru_cache(maxsize=8)
+def _encoding_for(model: str) -> Optional[Any]:
+    """Return the tiktoken encoding for a model, or None if tiktoken isn't available."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken not installed, using the character heuristic for token counts")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use unless TIKTOKEN_CACHE_DIR has them
+        logger.warning(f"Could not load the tiktoken encoding for {model}, using the character heuristic: {str(e)}")
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    """Count the tokens in text for a model, estimating when tiktoken isn't available."""
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / HEURISTIC_CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """
+    Shorten text to at most max_tokens, ending on a sentence boundary when one
+    is reasonably close to the cut.
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        truncated = encoding.decode(encoding.encode(text)[:max_tokens])
+    else:
+        truncated = text[:int(max_tokens * HEURISTIC_CHARS_PER_TOKEN)]
+    return _cut_at_boundary(truncated, min_keep=0.8)
+
+def completion_token_budget(max_length: Optional[int]) -> int:
+    """
+    Derive max_tokens for a completion from the requested character limit,
+    with a safety margin, capped at REWRITE_MAX_OUTPUT_TOKENS.
+    """
+    if not max_length:
+        return settings.REWRITE_MAX_OUTPUT_TOKENS
+    budget = math.ceil(max_length / OUTPUT_CHARS_PER_TOKEN * OUTPUT_TOKEN_MARGIN) + OUTPUT_TOKEN_OVERHEAD
+    return min(budget, settings.REWRITE_MAX_OUTPUT_TOKENS)
+
+def _cut_at_boundary(text: str, min_keep: float) -> str:
+    """
+    Cut text back to its last sentence end, or failing that its last word
+    boundary, as long as at least min_keep of the text survives.
+    """
+    ends = sentence_ends(text)
+    if ends and ends[-1] >= len(text) * min_keep:
+        return text[:ends[-1]].strip()
+    space = text.rfind(' ')
+    if space >= len(text) * min_keep:
+        return text[:space].rstrip(" ,;:-")
+    return text.strip()
+
+def trim_to_length(text: str, max_length: Optional[int]) -> str:
+    """
+    Enforce a character limit on model output without another model call,
+    preferring to end on a complete sentence.
+    """
+    text = text.strip()
+    if not max_length or len(text) <= max_length:
+        return text
+    return _cut_at_boundary(text[:max_length], min_keep=0.6)
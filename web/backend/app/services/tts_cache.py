@@ -0,0 +1,300 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.core.database import db
+from app.services.audio_metadata import audio_probe
+from app.services.mock_storage import storage
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "tts_cache"
+
+# Audio is stored under the hash of everything that determines it, so the same
+# scene text in the same voice is synthesized once no matter how many renders use it
+TTS_KEY_PREFIX = "tts"
+
+AUDIO_CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+}
+
+def normalize_tts_text(text: str) -> str:
+    """Collapse whitespace so scripts that differ only in spacing share a cache entry."""
+    return " ".join(text.split())
+
+def tts_cache_key(
+    text: str,
+    voice_id: str,
+    output_format: str,
+    provider_format: str,
+    voice_settings: Optional[Dict[str, Any]]
+) -> str:
+    """
+    Hash everything that determines the synthesized audio: the normalized
+    text, voice, output format (ours and the provider's) and voice settings.
+    """
+    payload = json.dumps(
+        [normalize_tts_text(text), voice_id, output_format, provider_format, voice_settings or {}],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def tts_object_key(key: str, output_format: str) -> str:
+    """Build the storage key for a cached audio object."""
+    return f"{TTS_KEY_PREFIX}/{key[:2]}/{key}.{output_format}"
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized speech.
+    Audio lives in the storage service; a metadata index (the MongoDB
+    "tts_cache" collection, or an in-process dict on the mock database)
+    records each object's size, duration and last access. When the total
+    size passes TTS_CACHE_MAX_BYTES the least recently used objects are
+    evicted from both.
+    """
+
+    def __init__(self):
+        self.enabled = settings.TTS_CACHE_ENABLED
+        self.max_bytes = settings.TTS_CACHE_MAX_BYTES
+        self.local_index: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+        self.bypassed = 0
+
+    def _collection(self):
+        """Return the MongoDB collection, or None when running on the mock database."""
+        if db.is_mock:
+            return None
+        mongo_db = db.get_db()
+        return mongo_db[COLLECTION_NAME] if mongo_db is not None else None
+
+    async def ensure_indexes(self):
+        """
+        Create the last-access index used for LRU eviction.
+        Called once on application startup.
+        """
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.create_index("last_accessed_at")
+            logger.debug(f"Ensured index on {COLLECTION_NAME}.last_accessed_at")
+        except Exception as e:
+            logger.warning(f"Could not create index on {COLLECTION_NAME}: {str(e)}")
+
+    async def _find(self, key: str) -> Optional[Dict[str, Any]]:
+        collection = self._collection()
+        if collection is None:
+            return self.local_index.get(key)
+        return await collection.find_one({"_id": key})
+
+    async def _touch(self, key: str):
+        now = datetime.utcnow()
+        collection = self._collection()
+        if collection is None:
+            if key in self.local_index:
+                self.local_index[key]["last_accessed_at"] = now
+            return
+        await collection.update_one({"_id": key}, {"$set": {"last_accessed_at": now}})
+
+    async def _delete(self, key: str):
+        collection = self._collection()
+        if collection is None:
+            self.local_index.pop(key, None)
+            return
+        await collection.delete_one({"_id": key})
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Download cached audio to a temporary file.
+
+        Args:
+            key: Cache key from tts_cache_key
+
+        Returns:
+            Path to the temporary audio file (owned by the caller) or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            entry = await self._find(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"TTS cache lookup failed for {key}: {str(e)}")
+            return None
+
+        if not entry:
+            self.misses += 1
+            return None
+
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{entry['output_format']}")
+        temp_file.close()
+        success, message = await storage.download_file(entry["object_key"], temp_file.name)
+        if not success:
+            # The object is gone (evicted by another worker or deleted); drop the stale entry
+            logger.warning(f"TTS cache object {entry['object_key']} unavailable: {message}")
+            os.remove(temp_file.name)
+            self.misses += 1
+            try:
+                await self._delete(key)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Could not remove stale TTS cache entry {key}: {str(e)}")
+            return None
+
+        self.hits += 1
+        try:
+            await self._touch(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Could not update TTS cache access time for {key}: {str(e)}")
+        return temp_file.name
+
+    async def set(
+        self,
+        key: str,
+        path: str,
+        voice_id: str,
+        output_format: str,
+        provider_format: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Upload an audio file to storage and index it, evicting old entries if needed.
+
+        Args:
+            key: Cache key from tts_cache_key
+            path: Local audio file to store
+            voice_id: Voice the audio was synthesized with
+            output_format: Our output format (mp3, wav, pcm)
+            provider_format: The provider's output_format value
+
+        Returns:
+            The index entry, or None if the audio could not be stored
+        """
+        if not self.enabled:
+            return None
+
+        size = os.path.getsize(path)
+        object_key = tts_object_key(key, output_format)
+        success, result = await storage.upload_file(
+            path, object_key, content_type=AUDIO_CONTENT_TYPES.get(output_format, "application/octet-stream")
+        )
+        if not success:
+            self.errors += 1
+            logger.warning(f"Could not store TTS audio {object_key}: {result}")
+            return None
+
+        if output_format == "pcm":
+            # Raw 16-bit mono samples have no header; the size gives the duration
+            duration = size / (int(provider_format.split('_')[1]) * 2)
+        else:
+            duration = await audio_probe.duration(path, object_key)
+
+        now = datetime.utcnow()
+        entry = {
+            "_id": key,
+            "object_key": object_key,
+            "voice_id": voice_id,
+            "output_format": output_format,
+            "provider_format": provider_format,
+            "size": size,
+            "duration_seconds": round(duration, 3) if duration is not None else None,
+            "created_at": now,
+            "last_accessed_at": now,
+        }
+
+        collection = self._collection()
+        try:
+            if collection is None:
+                self.local_index[key] = entry
+            else:
+                await collection.replace_one({"_id": key}, entry, upsert=True)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"TTS cache index write failed for {key}: {str(e)}")
+            return None
+
+        self.stores += 1
+        await self.evict()
+        return entry
+
+    async def _entries_by_last_access(self) -> List[Dict[str, Any]]:
+        collection = self._collection()
+        if collection is None:
+            return sorted(self.local_index.values(), key=lambda entry: entry["last_accessed_at"])
+        cursor = collection.find({}, {"object_key": 1, "size": 1}).sort("last_accessed_at", 1)
+        return await cursor.to_list(length=None)
+
+    async def total_size(self) -> int:
+        """Total size in bytes of all indexed audio."""
+        collection = self._collection()
+        if collection is None:
+            return sum(entry["size"] for entry in self.local_index.values())
+        result = await collection.aggregate([{"$group": {"_id": None, "total": {"$sum": "$size"}}}]).to_list(length=1)
+        return result[0]["total"] if result else 0
+
+    async def evict(self) -> int:
+        """
+        Delete least recently used audio until the cache fits in TTS_CACHE_MAX_BYTES.
+
+        Returns:
+            Number of evicted entries
+        """
+        try:
+            total = await self.total_size()
+            if total <= self.max_bytes:
+                return 0
+
+            evicted = 0
+            for entry in await self._entries_by_last_access():
+                if total <= self.max_bytes:
+                    break
+                await storage.delete_file(entry["object_key"])
+                await self._delete(entry["_id"])
+                total -= entry["size"]
+                evicted += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"TTS cache eviction failed: {str(e)}")
+            return 0
+
+        self.evictions += evicted
+        logger.info(f"Evicted {evicted} TTS cache entries, {total} bytes remain")
+        return evicted
+
+    def record_bypass(self):
+        """Count a request that skipped the cache (force_refresh)."""
+        self.bypassed += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current cache size."""
+        lookups = self.hits + self.misses
+        try:
+            total = await self.total_size()
+        except Exception:
+            total = None
+        return {
+            "enabled": self.enabled,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "bypassed": self.bypassed,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+tts_cache = TTSCache()
@@ -0,0 +1,250 @@
+import httpx
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse, urlencode
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http_client import http_client
+from app.services.content_cache import content_cache
+from app.services.rate_limiter import rate_limiter
+from app.services.reddit_session import reddit_session
+from app.services.content_retrieval import (
+    DEFAULT_USER_AGENT,
+    REDDIT_HEADERS,
+    REDDIT_INFO_URL,
+    content_cache_key,
+    handle_generic_url,
+    parse_reddit_post_id,
+    reddit_gallery_item,
+    reddit_preview_variants,
+    select_image_variant,
+)
+
+logger = logging.getLogger(__name__)
+
+# Providers whose oEmbed endpoint answers with everything a card needs,
+# so the page itself never has to be fetched
+OEMBED_ENDPOINTS = {
+    "youtube.com": "https://www.youtube.com/oembed",
+    "youtu.be": "https://www.youtube.com/oembed",
+    "vimeo.com": "https://vimeo.com/api/oembed.json",
+}
+
+PREVIEW_DESCRIPTION_LENGTH = 300
+
+def _truncate(text: Optional[str], length: int = PREVIEW_DESCRIPTION_LENGTH) -> Optional[str]:
+    if not text or len(text) <= length:
+        return text or None
+    return text[:length].rsplit(' ', 1)[0] + "…"
+
+def _oembed_endpoint(host: str) -> Optional[str]:
+    labels = host.lower().split('.')
+    for i in range(len(labels)):
+        endpoint = OEMBED_ENDPOINTS.get('.'.join(labels[i:]))
+        if endpoint:
+            return endpoint
+    return None
+
+def reddit_preview_from_post(post_data: Dict[str, Any], url: str) -> Dict[str, Any]:
+    """Build a preview card from a Reddit post's data."""
+    width = settings.PREVIEW_THUMBNAIL_WIDTH
+    thumbnail = None
+
+    images = post_data.get('preview', {}).get('images', [])
+    if images:
+        thumbnail = select_image_variant(reddit_preview_variants(images[0]), width, width)
+    elif post_data.get('gallery_data') and post_data.get('media_metadata'):
+        # media_metadata is keyed by id in no particular order; gallery_data holds the display order
+        media_metadata = post_data['media_metadata']
+        for gallery_item in post_data['gallery_data'].get('items', []):
+            media_id = gallery_item.get('media_id')
+            item = reddit_gallery_item(media_id, media_metadata[media_id], width, width) if media_id in media_metadata else None
+            if item:
+                thumbnail = select_image_variant(item['variants'], width, width)
+                break
+
+    thumbnail_url = thumbnail['url'] if thumbnail else None
+    # "self", "default", "nsfw" etc. are placeholders rather than URLs
+    if not thumbnail_url and str(post_data.get('thumbnail', '')).startswith('http'):
+        thumbnail_url = post_data['thumbnail']
+
+    return {
+        "title": post_data.get('title') or "No title available",
+        "description": _truncate(post_data.get('selftext')),
+        "thumbnail": thumbnail_url,
+        "author": post_data.get('author'),
+        "subreddit": post_data.get('subreddit'),
+        "platform": "reddit",
+        "url": url,
+    }
+
+def preview_from_content(content: Dict[str, Any], url: str) -> Dict[str, Any]:
+    """Build a preview card from an already extracted (cached) result."""
+    is_reddit = content.get('domain') == "reddit.com"
+    thumbnail = content.get('thumbnail_url')
+    if not thumbnail and content.get('preview_images'):
+        first = content['preview_images'][0]
+        thumbnail = first.get('url') if isinstance(first, dict) else first
+    if not thumbnail and content.get('media_type') == "image":
+        thumbnail = content.get('render_media_url') or content.get('media_url')
+
+    return {
+        "title": content.get('title') or "No title available",
+        "description": _truncate(content.get('description') or (content.get('text') if is_reddit else None)),
+        "thumbnail": thumbnail,
+        "author": content.get('author'),
+        "subreddit": content.get('subreddit'),
+        "platform": "reddit" if is_reddit else (content.get('site_name') or content.get('domain') or "unknown"),
+        "url": url,
+    }
+
+async def fetch_reddit_preview(url: str, post_id: str, client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+    """Fetch a single post through /api/info.json instead of its full comment page."""
+    info_url = f"{REDDIT_INFO_URL}?{urlencode({'id': f't3_{post_id}', 'raw_json': '1'})}"
+    response = await reddit_session.get(client, info_url, REDDIT_HEADERS)
+    if response.status_code != 200:
+        logger.warning(f"Reddit info lookup for {post_id} returned {response.status_code}")
+        return None
+
+    try:
+        children = response.json().get('data', {}).get('children', [])
+    except (ValueError, AttributeError):
+        # A block or maintenance page instead of JSON
+        logger.warning(f"Reddit info lookup for {post_id} returned a non-JSON response")
+        return None
+    if not children:
+        return None
+    return reddit_preview_from_post(children[0].get('data', {}), url)
+
+async def fetch_oembed(endpoint: str, url: str, client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+    """Fetch an oEmbed document, returning None if the provider has nothing for the URL."""
+    if '?' not in endpoint:
+        endpoint = f"{endpoint}?{urlencode({'url': url, 'format': 'json'})}"
+    response = await rate_limiter.get(client, endpoint, headers={"User-Agent": DEFAULT_USER_AGENT})
+    if response.status_code != 200:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+def _apply_oembed(preview: Dict[str, Any], oembed: Dict[str, Any]):
+    """Fill in preview fields the page metadata didn't provide."""
+    preview["title"] = preview.get("title") or oembed.get("title")
+    preview["thumbnail"] = preview.get("thumbnail") or oembed.get("thumbnail_url")
+    preview["author"] = preview.get("author") or oembed.get("author_name")
+    if oembed.get("provider_name"):
+        preview["platform"] = oembed["provider_name"]
+
+async def fetch_generic_preview(url: str, client: httpx.AsyncClient) -> Optional[Dict[str, Any]]:
+    """
+    Build a preview from a known oEmbed provider, or else from the page's
+    <head> metadata, falling back to the page's own oEmbed link for missing fields.
+    """
+    host = urlparse(url).netloc.lower()
+    preview = {
+        "title": None,
+        "description": None,
+        "thumbnail": None,
+        "author": None,
+        "subreddit": None,
+        "platform": host,
+        "url": url,
+    }
+
+    endpoint = _oembed_endpoint(host)
+    if endpoint:
+        oembed = await fetch_oembed(endpoint, url, client)
+        if oembed:
+            _apply_oembed(preview, oembed)
+            return preview
+
+    content = await handle_generic_url(url, client)
+    if not content:
+        return None
+    preview.update({key: value for key, value in preview_from_content(content, url).items() if value})
+
+    if content.get("oembed_url") and not (preview["thumbnail"] and preview["author"]):
+        oembed = await fetch_oembed(content["oembed_url"], url, client)
+        if oembed:
+            _apply_oembed(preview, oembed)
+    return preview
+
+class PreviewService:
+    """
+    Builds link preview cards (title, thumbnail, author, subreddit, platform)
+    without running the full extraction pipeline.
+    Previews are cached separately from extracted content; an expired preview is
+    still served during the stale-while-revalidate window while it is refreshed
+    in the background.
+    """
+
+    def __init__(self):
+        self.ttl = settings.PREVIEW_CACHE_TTL_SECONDS
+        self.stale_ttl = settings.PREVIEW_STALE_WHILE_REVALIDATE_SECONDS
+        self.cache = TTLCache(max_size=settings.PREVIEW_CACHE_MAX_ENTRIES, default_ttl=self.ttl + self.stale_ttl)
+        # Background refreshes in progress, keyed by cache key
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.from_extraction = 0
+        self.fetched = 0
+        self.stale_served = 0
+
+    def cache_control(self, fetched_at: float) -> str:
+        """Cache-Control header value for a preview fetched at the given time."""
+        max_age = max(0, int(self.ttl - (time.time() - fetched_at)))
+        return f"public, max-age={max_age}, stale-while-revalidate={self.stale_ttl}"
+
+    async def _fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        # A full extraction that is already cached has everything a card needs
+        content = await content_cache.get(content_cache_key(url))
+        if content:
+            self.from_extraction += 1
+            return preview_from_content(content, url)
+
+        client = http_client.get_client()
+        self.fetched += 1
+        post_id = parse_reddit_post_id(url)
+        if post_id:
+            return await fetch_reddit_preview(url, post_id, client)
+        return await fetch_generic_preview(url, client)
+
+    async def _refresh(self, key: str, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            preview = await self._fetch(url)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"Error fetching preview for {url}: {str(e)}")
+            return None
+        finally:
+            self._refreshing.pop(key, None)
+
+        if preview:
+            preview["fetched_at"] = time.time()
+            self.cache.set(key, preview)
+        return preview
+
+    async def get_preview(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the preview card for a URL, or None if nothing could be fetched.
+        The result includes "fetched_at" (epoch seconds) for Cache-Control.
+        """
+        key = content_cache_key(url)
+        preview = self.cache.get(key)
+        if preview is not None:
+            if time.time() - preview["fetched_at"] > self.ttl and key not in self._refreshing:
+                self.stale_served += 1
+                self._refreshing[key] = asyncio.create_task(self._refresh(key, url))
+            return preview
+
+        return await self._refresh(key, url)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache.stats(),
+            "from_extraction": self.from_extraction,
+            "fetched": self.fetched,
+            "stale_served": self.stale_served,
+        }
+
+preview_service = PreviewService()
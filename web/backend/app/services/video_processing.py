@@ -5,6 +5,7 @@ import tempfile
 from typing import Optional, Dict, Any, List, Tuple
 from app.core.config import settings
 from app.services.mock_storage import storage
+from app.services.audio_metadata import audio_probe
 import uuid
 import asyncio
 
@@ -42,6 +43,11 @@ class VideoProcessor:
             # Generate a unique ID for the video
             video_id = str(uuid.uuid4())
             
+            # The video runs as long as its narration
+            duration_seconds = await audio_probe.duration(voice_path)
+            if duration_seconds is None:
+                logger.warning(f"Could not determine the duration of voice audio {voice_path}")
+            
             # In a real implementation, we would:
             # 1. Create image/video frames from the text
             # 2. Add the audio track
@@ -73,7 +79,7 @@ class VideoProcessor:
                 "video_id": video_id,
                 "title": title,
                 "storage_url": url,
-                "duration_seconds": 30.0,  # Mock duration
+                "duration_seconds": round(duration_seconds, 3) if duration_seconds is not None else None,
                 "character_count": len(text),
             }
             
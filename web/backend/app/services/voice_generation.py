@@ -1,46 +1,341 @@
 import httpx
+import asyncio
 import logging
 import os
+import re
 import tempfile
 import aiofiles
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from app.core.config import settings
+from app.core.http_client import http_client
+from app.services.audio_frames import concat_mp3, concat_pcm, concat_wav, wav_header
+from app.services.rate_limiter import rate_limiter
+from app.services.text_utils import split_at_words, split_sentences
+from app.services.tts_cache import tts_cache, tts_cache_key
 
 logger = logging.getLogger(__name__)
 
-async def generate_voice(
+# Our output formats mapped to ElevenLabs output_format values.
+# "wav" is requested as raw PCM and wrapped in a WAV header locally.
+OUTPUT_FORMATS = {
+    "mp3": "mp3_44100_128",
+    "pcm": "pcm_24000",
+    "wav": "pcm_24000",
+}
+
+DEFAULT_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.75}
+
+# Caps concurrent synthesis requests to the TTS provider
+tts_semaphore = asyncio.Semaphore(settings.TTS_MAX_CONCURRENCY)
+
+# Scenes are joined with blank lines when a project's script is assembled
+SCENE_BREAK_PATTERN = re.compile(r"\n\s*\n")
+
+class VoiceGenerationError(Exception):
+    """Raised when the TTS provider rejects a request or the stream fails."""
+
+def provider_output_format(output_format: str) -> str:
+    """Map an output format to the provider's output_format (provider values pass through)."""
+    return OUTPUT_FORMATS.get(output_format, output_format)
+
+def pcm_sample_rate(provider_format: str) -> int:
+    """Sample rate of a provider PCM format such as "pcm_24000"."""
+    return int(provider_format.split('_')[1])
+
+def _resolve_voice_id(voice_id: Optional[str]) -> str:
+    if not voice_id or voice_id == "default":
+        return settings.ELEVENLABS_DEFAULT_VOICE_ID
+    return voice_id
+
+def split_script(text: str, max_chars: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Split a script into synthesis chunks at scene and sentence boundaries.
+    Consecutive sentences of a scene are packed into chunks of up to
+    max_chars; a chunk never spans two scenes, so editing one scene leaves
+    the other scenes' chunks (and their cached audio) unchanged.
+
+    Args:
+        text: Script text, with scenes separated by blank lines
+        max_chars: Chunk size limit (defaults to TTS_CHUNK_MAX_CHARS)
+
+    Returns:
+        List of chunks with their index, scene_index and text
+    """
+    max_chars = max_chars or settings.TTS_CHUNK_MAX_CHARS
+    chunks = []
+    scenes = [scene for scene in SCENE_BREAK_PATTERN.split(text) if scene.strip()]
+    for scene_index, scene in enumerate(scenes):
+        current = ""
+        for sentence in split_sentences(" ".join(scene.split())):
+            for piece in split_at_words(sentence, max_chars) if len(sentence) > max_chars else [sentence]:
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append({"index": len(chunks), "scene_index": scene_index, "text": current})
+                    current = piece
+                else:
+                    current = f"{current} {piece}" if current else piece
+        if current:
+            chunks.append({"index": len(chunks), "scene_index": scene_index, "text": current})
+    return chunks
+
+async def iter_voice_chunks(
+    text: str,
+    voice_id: str = "default",
+    output_format: str = "mp3",
+    voice_settings: Optional[Dict[str, Any]] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream synthesized speech from the ElevenLabs streaming endpoint.
+    Chunks are yielded as they arrive, so callers can start writing or muxing
+    before synthesis has finished. "wav" yields raw PCM; see generate_voice.
+
+    Args:
+        text: Text to convert to speech
+        voice_id: ID of the voice to use ("default" for ELEVENLABS_DEFAULT_VOICE_ID)
+        output_format: "mp3", "pcm", "wav" or a provider output_format value
+        voice_settings: Provider voice settings (stability, similarity_boost, ...)
+        client: HTTP client to use (defaults to the shared client)
+
+    Yields:
+        Audio bytes
+
+    Raises:
+        VoiceGenerationError: If the provider rejects the request or the stream fails
+    """
+    if client is None:
+        client = http_client.get_client()
+
+    url = f"{settings.ELEVENLABS_BASE_URL.rstrip('/')}/v1/text-to-speech/{_resolve_voice_id(voice_id)}/stream"
+    timeout = httpx.Timeout(settings.TTS_TIMEOUT_SECONDS, connect=settings.TTS_CONNECT_TIMEOUT_SECONDS)
+    request = {
+        "params": {"output_format": provider_output_format(output_format)},
+        "headers": {"xi-api-key": settings.ELEVENLABS_API_KEY, "Accept": "audio/*"},
+        "json": {
+            "text": text,
+            "model_id": settings.ELEVENLABS_MODEL_ID,
+            "voice_settings": voice_settings or DEFAULT_VOICE_SETTINGS,
+        },
+        "timeout": timeout,
+    }
+
+    try:
+        async with tts_semaphore:
+            async with rate_limiter.stream(client, "POST", url, **request) as response:
+                if response.status_code != 200:
+                    detail = (await response.aread())[:500].decode("utf-8", "replace")
+                    raise VoiceGenerationError(f"TTS provider returned {response.status_code}: {detail}")
+                # Pass network chunks through unbuffered so the first audio isn't held back
+                async for chunk in response.aiter_bytes():
+                    yield chunk
+    except httpx.HTTPError as e:
+        raise VoiceGenerationError(f"TTS request failed: {str(e)}") from e
+
+async def iter_voice_to_file(
+    text: str,
+    path: str,
+    voice_id: str = "default",
+    output_format: str = "mp3",
+    voice_settings: Optional[Dict[str, Any]] = None,
+    client: Optional[httpx.AsyncClient] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream synthesized speech into a file while passing each chunk through,
+    so a downstream stage can consume the audio as the file is written.
+    For "wav" the header is written first and its sizes patched at the end.
+    """
+    provider_format = provider_output_format(output_format)
+    data_size = 0
+    async with aiofiles.open(path, 'wb') as f:
+        if output_format == "wav":
+            await f.write(wav_header(0, pcm_sample_rate(provider_format)))
+        async for chunk in iter_voice_chunks(text, voice_id, output_format, voice_settings, client):
+            await f.write(chunk)
+            data_size += len(chunk)
+            yield chunk
+        if output_format == "wav":
+            await f.seek(0)
+            await f.write(wav_header(data_size, pcm_sample_rate(provider_format)))
+
+async def synthesize_speech(
     text: str,
-    voice_id: str = "default", 
-    output_format: str = "mp3"
+    voice_id: str = "default",
+    output_format: str = "mp3",
+    voice_settings: Optional[Dict[str, Any]] = None,
+    force_refresh: bool = False
 ) -> Optional[str]:
     """
-    Generate voice audio from text using ElevenLabs API.
-    This is a placeholder implementation that will be expanded later.
-    
+    Synthesize text in a single ElevenLabs streaming request.
+    Audio is written to a temporary file chunk by chunk as it arrives.
+    Results are cached in storage by content, so unchanged text in the same
+    voice is only synthesized once.
+
     Args:
         text: Text to convert to speech
         voice_id: ID of the voice to use
-        output_format: Audio format (mp3, wav, etc.)
-        
+        output_format: Audio format (mp3, wav, pcm)
+        voice_settings: Provider voice settings (stability, similarity_boost, ...)
+        force_refresh: Skip the cache and synthesize again
+
     Returns:
         Path to the temporary audio file or None if generation failed
     """
-    # For now, we'll just simulate voice generation
-    # In a real implementation, we would call the ElevenLabs API
-    
+    if not text or not text.strip():
+        return None
+
+    resolved_voice_id = _resolve_voice_id(voice_id)
+    provider_format = provider_output_format(output_format)
+    cache_key = tts_cache_key(text, resolved_voice_id, output_format, provider_format, voice_settings or DEFAULT_VOICE_SETTINGS)
+    if force_refresh:
+        tts_cache.record_bypass()
+    else:
+        cached_path = await tts_cache.get(cache_key)
+        if cached_path:
+            logger.info(f"Using cached voice audio {cache_key} for text of length {len(text)}")
+            return cached_path
+
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{output_format}")
+    temp_file.close()
+
     try:
-        logger.info(f"Mock generating voice for text of length {len(text)} with voice {voice_id}")
-        
-        # Create a temporary file for the audio
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{output_format}")
-        temp_file.close()
-        
-        # In the actual implementation, we would call the ElevenLabs API
-        # and save the audio data to the temporary file
-        
-        # For now, we'll just return the path to the empty file
-        return temp_file.name
-    
+        logger.info(f"Synthesizing text of length {len(text)} with voice {voice_id}")
+        size = 0
+        async for chunk in iter_voice_to_file(text, temp_file.name, voice_id, output_format, voice_settings):
+            size += len(chunk)
+        if not size:
+            raise VoiceGenerationError("TTS provider returned no audio")
+        logger.debug(f"Wrote {size} bytes of audio to {temp_file.name}")
+
     except Exception as e:
         logger.error(f"Error generating voice: {str(e)}")
-        return None 
\ No newline at end of file
+        if os.path.exists(temp_file.name):
+            os.remove(temp_file.name)
+        return None
+
+    try:
+        await tts_cache.set(cache_key, temp_file.name, resolved_voice_id, output_format, provider_format)
+    except Exception as e:
+        # The audio is fine; failing to cache it only costs a resynthesis later
+        logger.warning(f"Could not cache voice audio {cache_key}: {str(e)}")
+    return temp_file.name
+
+def join_audio(parts: List[bytes], output_format: str) -> Tuple[bytes, List[float]]:
+    """
+    Join synthesized parts at the frame or sample level, without re-encoding.
+
+    Returns:
+        Tuple of (joined audio, duration in seconds of each part)
+
+    Raises:
+        ValueError: If the format can't be joined
+    """
+    provider_format = provider_output_format(output_format)
+    if provider_format.startswith("mp3_"):
+        return concat_mp3(parts)
+    if output_format == "wav":
+        return concat_wav(parts)
+    if provider_format.startswith("pcm_"):
+        return concat_pcm(parts, pcm_sample_rate(provider_format))
+    raise ValueError(f"Cannot join audio in format {output_format}")
+
+async def generate_voice_with_timings(
+    text: str,
+    voice_id: str = "default",
+    output_format: str = "mp3",
+    voice_settings: Optional[Dict[str, Any]] = None,
+    force_refresh: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Generate voice audio for a script by synthesizing its sentence and scene
+    chunks concurrently (capped by TTS_MAX_CONCURRENCY) and joining them in
+    order. Long scripts take roughly as long as their slowest chunk, and
+    each chunk is cached on its own.
+
+    Args:
+        text: Script text, with scenes separated by blank lines
+        voice_id: ID of the voice to use
+        output_format: Audio format (mp3, wav, pcm)
+        voice_settings: Provider voice settings (stability, similarity_boost, ...)
+        force_refresh: Skip the cache and synthesize every chunk again
+
+    Returns:
+        Dictionary with the temporary audio file path, total duration and
+        each chunk's and scene's start/end offsets in seconds, or None if
+        generation failed
+    """
+    chunks = split_script(text or "")
+    if not chunks:
+        return None
+
+    logger.info(f"Generating voice for text of length {len(text)} in {len(chunks)} chunks with voice {voice_id}")
+    paths = await asyncio.gather(*(
+        synthesize_speech(chunk["text"], voice_id, output_format, voice_settings, force_refresh)
+        for chunk in chunks
+    ))
+
+    temp_file = None
+    try:
+        failed = sum(1 for path in paths if path is None)
+        if failed:
+            logger.error(f"Voice generation failed for {failed} of {len(chunks)} chunks")
+            return None
+
+        parts = []
+        for path in paths:
+            async with aiofiles.open(path, 'rb') as f:
+                parts.append(await f.read())
+        audio, durations = join_audio(parts, output_format)
+
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{output_format}")
+        temp_file.close()
+        async with aiofiles.open(temp_file.name, 'wb') as f:
+            await f.write(audio)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error joining voice audio: {str(e)}")
+        if temp_file and os.path.exists(temp_file.name):
+            os.remove(temp_file.name)
+        return None
+    finally:
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    offset = 0.0
+    scenes: Dict[int, Dict[str, Any]] = {}
+    for chunk, duration in zip(chunks, durations):
+        chunk["start_seconds"] = round(offset, 3)
+        offset += duration
+        chunk["end_seconds"] = round(offset, 3)
+        scene = scenes.setdefault(chunk["scene_index"], {"scene_index": chunk["scene_index"], "start_seconds": chunk["start_seconds"]})
+        scene["end_seconds"] = chunk["end_seconds"]
+
+    return {
+        "path": temp_file.name,
+        "output_format": output_format,
+        "duration_seconds": round(offset, 3),
+        "chunks": chunks,
+        "scenes": list(scenes.values()),
+    }
+
+async def generate_voice(
+    text: str,
+    voice_id: str = "default",
+    output_format: str = "mp3",
+    voice_settings: Optional[Dict[str, Any]] = None,
+    force_refresh: bool = False
+) -> Optional[str]:
+    """
+    Generate voice audio from text using the ElevenLabs streaming API.
+    See generate_voice_with_timings for how scripts are chunked.
+
+    Args:
+        text: Text to convert to speech
+        voice_id: ID of the voice to use
+        output_format: Audio format (mp3, wav, pcm)
+        voice_settings: Provider voice settings (stability, similarity_boost, ...)
+        force_refresh: Skip the cache and synthesize again
+
+    Returns:
+        Path to the temporary audio file or None if generation failed
+    """
+    result = await generate_voice_with_timings(text, voice_id, output_format, voice_settings, force_refresh)
+    return result["path"] if result else None
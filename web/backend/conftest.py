@@ -0,0 +1,32 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+
+class FakeClock:
+    """Stands in for the time module; advance it by setting now."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Replace the time module of the given modules with one FakeClock."""
+    clock = FakeClock()
+
+    def install(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, "time", clock)
+        return clock
+
+    return install
+
+@pytest.fixture
+def tmp_storage(monkeypatch, tmp_path):
+    """Point the local mock storage at a per-test directory."""
+    from app.services.mock_storage import storage
+    monkeypatch.setattr(storage, "storage_dir", str(tmp_path))
+    return storage
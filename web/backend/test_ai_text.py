@@ -0,0 +1,111 @@
+"""
+Tests for parsing and packing of batched scene rewrites.
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import app.services.ai_text as ai_text
+from app.services.ai_text import (
+    REWRITE_BATCH_MAX_INPUT_TOKENS,
+    REWRITE_BATCH_MAX_OUTPUT_TOKENS,
+    REWRITE_BATCH_MAX_SCENES,
+    _pack_batches,
+    batch_output_tokens,
+    parse_batch_rewrites,
+    rewrite_texts,
+)
+from app.services.rewrite_cache import rewrite_cache
+from app.services.token_budget import count_tokens
+
+MODEL = "gpt-4o-mini"
+
+def test_parse_batch_rewrites_orders_by_id():
+    content = '{"rewrites": [{"id": 1, "text": " Second. "}, {"id": 0, "text": "First."}]}'
+    assert parse_batch_rewrites(content, 2, None) == ["First.", "Second."]
+
+def test_parse_batch_rewrites_accepts_string_ids():
+    content = '{"rewrites": [{"id": "0", "text": "First."}, {"id": " 2 ", "text": "Third."}, {"id": "one", "text": "Lost."}]}'
+    assert parse_batch_rewrites(content, 3, None) == ["First.", None, "Third."]
+
+def test_parse_batch_rewrites_partial_response():
+    content = """{"rewrites": [
+        {"id": 0, "text": "Kept."},
+        {"id": 1, "text": "   "},
+        {"id": 5, "text": "Out of range."},
+        {"id": -1, "text": "Negative."},
+        {"id": true, "text": "Not an id."},
+        {"id": 2},
+        "not an entry"
+    ]}"""
+    assert parse_batch_rewrites(content, 3, None) == ["Kept.", None, None]
+
+def test_parse_batch_rewrites_malformed_json():
+    for content in ["not json", '{"rewrites": [{"id": 0, "te', None, '{"other": []}', '{"rewrites": {"id": 0}}', "42"]:
+        assert parse_batch_rewrites(content, 2, None) == [None, None]
+
+def test_parse_batch_rewrites_accepts_bare_list_and_trims():
+    content = '[{"id": 0, "text": "A short sentence. Then a much longer one that runs past the limit."}]'
+    assert parse_batch_rewrites(content, 1, 25) == ["A short sentence."]
+
+def test_pack_batches_caps_scene_count():
+    count = 2 * REWRITE_BATCH_MAX_SCENES + 3
+    texts = ["A short scene."] * count
+    batches = _pack_batches(list(range(count)), texts, MODEL, max_length=100)
+    assert [len(batch) for batch in batches] == [REWRITE_BATCH_MAX_SCENES, REWRITE_BATCH_MAX_SCENES, 3]
+    assert [index for batch in batches for index in batch] == list(range(count))
+
+def test_pack_batches_caps_input_tokens():
+    # Two of these fit in a batch, three don't (with tiktoken or the character heuristic)
+    tokens_per_word = count_tokens("word " * 100, MODEL) / 100
+    text = "word " * int(0.45 * REWRITE_BATCH_MAX_INPUT_TOKENS / tokens_per_word)
+    tokens = count_tokens(text, MODEL)
+    assert 2 * tokens <= REWRITE_BATCH_MAX_INPUT_TOKENS < 3 * tokens
+
+    texts = [text] * 5
+    assert _pack_batches(list(range(5)), texts, MODEL) == [[0, 1], [2, 3], [4]]
+
+def test_pack_batches_oversized_scene_gets_own_batch():
+    texts = ["Short.", "word " * (4 * REWRITE_BATCH_MAX_INPUT_TOKENS), "Short too."]
+    assert _pack_batches([0, 1, 2], texts, MODEL) == [[0], [1], [2]]
+
+def test_pack_batches_caps_output_tokens():
+    # At a 1000-character limit twelve rewrites don't fit in one completion's output
+    per_scene = batch_output_tokens(1000)
+    assert REWRITE_BATCH_MAX_SCENES * per_scene > REWRITE_BATCH_MAX_OUTPUT_TOKENS
+
+    texts = ["A short scene."] * REWRITE_BATCH_MAX_SCENES
+    batches = _pack_batches(list(range(len(texts))), texts, MODEL, max_length=1000)
+    assert len(batches) > 1
+    for batch in batches:
+        assert len(batch) * per_scene <= REWRITE_BATCH_MAX_OUTPUT_TOKENS
+    assert [index for batch in batches for index in batch] == list(range(len(texts)))
+
+def test_rewrite_texts_counts_force_refresh_bypass_once(monkeypatch):
+    calls = []
+
+    async def fake_complete_rewrite(messages, **kwargs):
+        calls.append(kwargs.get("response_format"))
+        if kwargs.get("response_format"):
+            # The batch answer leaves out scene 1, which is then rewritten on its own
+            content = json.dumps({"rewrites": [{"id": 0, "text": "Zero rewritten."}, {"id": 2, "text": "Two rewritten."}]})
+        else:
+            content = "One rewritten."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))]), False
+
+    async def fake_set(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(ai_text, "complete_rewrite", fake_complete_rewrite)
+    monkeypatch.setattr(rewrite_cache, "set", fake_set)
+    bypassed = rewrite_cache.bypassed
+
+    results = asyncio.run(rewrite_texts(["Zero.", "One.", "Two."], force_refresh=True))
+    assert results == ["Zero rewritten.", "One rewritten.", "Two rewritten."]
+    assert len(calls) == 2
+    assert rewrite_cache.bypassed == bypassed + 3
+
+def test_pack_batches_only_packs_given_indexes():
+    texts = ["Zero.", "One.", "Two.", "Three."]
+    assert _pack_batches([3, 1], texts, MODEL) == [[3, 1]]
+    assert _pack_batches([], texts, MODEL) == []
@@ -0,0 +1,94 @@
+"""
+Tests for the in-process MP3/WAV duration and frame index parser.
+"""
+import asyncio
+import math
+import os
+import tempfile
+
+import pytest
+
+from app.services.audio_frames import wav_header
+from app.services.audio_metadata import audio_metadata, audio_probe, seek_offset
+from app.services.video_processing import video_processor
+
+# MPEG-1 Layer III, 44.1 kHz, joint stereo: 128 kbps (417 bytes) and 64 kbps (208 bytes)
+MP3_FRAME_128 = b"\xff\xfb\x90\x64" + bytes(413)
+MP3_FRAME_64 = b"\xff\xfb\x50\x64" + bytes(204)
+FRAME_SECONDS = 1152 / 44100
+
+# Keep uploaded test videos out of the working tree
+pytestmark = pytest.mark.usefixtures("tmp_storage")
+
+def write_temp(data, suffix):
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    temp_file.write(data)
+    temp_file.close()
+    return temp_file.name
+
+def test_mp3_duration_and_frame_index():
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + bytes(10)
+    info_frame = b"\xff\xfb\x90\x64" + bytes(32) + b"Info" + bytes(377)
+    # A VBR stream: the frame index has to follow the real frame sizes
+    frames = [MP3_FRAME_128, MP3_FRAME_64, MP3_FRAME_64, MP3_FRAME_128] * 25
+    data = id3 + info_frame + b"".join(frames) + b"TAG" + bytes(125)
+
+    metadata = audio_metadata(data)
+    assert metadata["format"] == "mp3"
+    assert metadata["frame_count"] == 100
+    assert math.isclose(metadata["duration_seconds"], 100 * FRAME_SECONDS)
+    assert metadata["sample_rate"] == 44100
+    assert metadata["bitrate"] == round((50 * 417 + 50 * 208) * 8 / (100 * FRAME_SECONDS))
+
+    first_audio = len(id3) + len(info_frame)
+    assert metadata["frame_offsets"][0] == first_audio
+    assert metadata["frame_offsets"][2] == first_audio + 417 + 208
+    assert seek_offset(metadata, 0) == first_audio
+    assert seek_offset(metadata, 2.5 * FRAME_SECONDS) == first_audio + 417 + 208
+    assert seek_offset(metadata, 1000) == metadata["frame_offsets"][-1]
+
+def test_mp3_resyncs_past_garbage():
+    data = MP3_FRAME_128 * 3 + b"\xff\x00garbage\xff" + MP3_FRAME_128 * 2
+    metadata = audio_metadata(data)
+    assert metadata["frame_count"] == 5
+    assert metadata["frame_offsets"][3] == 3 * 417 + 10
+
+def test_wav_duration_and_seek():
+    samples = bytes(24000 * 2 * 3)
+    data = wav_header(len(samples), 24000) + samples
+    metadata = audio_metadata(data)
+    assert metadata["format"] == "wav"
+    assert metadata["duration_seconds"] == 3.0
+    assert seek_offset(metadata, 1.5) == 44 + 36000 * 2
+    assert seek_offset(metadata, 10) == 44 + len(samples)
+
+def test_unrecognized_audio_returns_none():
+    assert audio_metadata(b"not audio at all") is None
+
+def test_probe_caches_per_object():
+    path = write_temp(MP3_FRAME_128 * 10, ".mp3")
+    try:
+        first = asyncio.run(audio_probe.probe(path))
+        hits = audio_probe.stats()["hits"]
+        second = asyncio.run(audio_probe.probe(path))
+        assert audio_probe.stats()["hits"] == hits + 1
+        assert first["frame_count"] == second["frame_count"] == 10
+
+        # A changed file is probed again
+        with open(path, "ab") as f:
+            f.write(MP3_FRAME_128 * 5)
+        assert math.isclose(asyncio.run(audio_probe.duration(path)), 15 * FRAME_SECONDS)
+    finally:
+        os.remove(path)
+
+def test_probe_missing_file():
+    assert asyncio.run(audio_probe.duration("/nonexistent/voice.mp3")) is None
+
+def test_create_video_uses_voice_duration():
+    path = write_temp(MP3_FRAME_128 * 383, ".mp3")
+    try:
+        success, info = asyncio.run(video_processor.create_video("Some text", path, "Title", "user123"))
+    finally:
+        os.remove(path)
+    assert success
+    assert info["duration_seconds"] == round(383 * FRAME_SECONDS, 3)
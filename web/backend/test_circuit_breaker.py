@@ -0,0 +1,121 @@
+"""
+Tests for circuit breaker state transitions.
+
+The circuit breaker module's clock is replaced by a fake one so the open
+period can elapse without sleeping.
+"""
+import pytest
+
+import app.services.circuit_breaker as circuit_breaker_module
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(circuit_breaker_module)
+
+def make_breaker():
+    return CircuitBreaker(
+        "test",
+        window_seconds=60,
+        min_requests=4,
+        failure_rate=0.5,
+        slow_call_seconds=1.0,
+        open_seconds=10,
+        half_open_probes=1,
+    )
+
+def open_breaker(breaker):
+    for _ in range(2):
+        breaker.record_success(0.1)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+def test_stays_closed_below_min_requests_and_failure_rate(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    # Too few calls to judge
+    assert breaker.state == CLOSED
+
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+def test_closed_to_open_to_half_open_to_closed(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    assert breaker.times_opened == 1
+
+    # Open: calls fail fast until open_seconds pass
+    assert not breaker.allow()
+    clock.now += 9.9
+    assert not breaker.allow()
+    assert breaker.rejected == 2
+
+    # Half-open: one probe at a time
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_requests"] == 0
+    assert breaker.allow()
+
+def test_failed_or_slow_probe_reopens(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    assert not breaker.allow()
+
+    # A probe that succeeds too slowly counts as bad too
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success(5.0)
+    assert breaker.state == OPEN
+
+    # As does one abandoned for being slow
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_slow(2.0)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 4
+
+def test_released_probe_frees_its_slot(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+def test_slow_calls_open_the_circuit(clock):
+    breaker = make_breaker()
+    breaker.record_success(0.1)
+    breaker.record_success(0.2)
+    breaker.record_success(3.0)
+    breaker.record_slow(1.5)
+    assert breaker.state == OPEN
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 61
+    for _ in range(3):
+        breaker.record_success(0.1)
+    breaker.record_failure()
+    # Only the last four calls count: one failure in four
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_failure_rate"] == 0.25
@@ -0,0 +1,95 @@
+"""
+Tests for revalidating stale cached content with ETag / Last-Modified.
+
+Reddit is replaced by an httpx MockTransport that answers the conditional
+JSON request with 304 or a new 200, depending on the test.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.core.http_client import http_client
+from app.services.content_cache import CachedContent, content_cache
+from app.services.content_retrieval import content_cache_key, extract_url_content
+from app.services.reddit_session import reddit_session
+
+POST_URL = "https://www.reddit.com/r/pics/comments/abc123/title/"
+CACHED = {"url": POST_URL, "title": "Cached title", "text": "Cached body"}
+
+def reddit_listing(title, body):
+    post = {"title": title, "selftext": body, "author": "someone", "subreddit": "pics"}
+    return [{"data": {"children": [{"data": post}]}}]
+
+@pytest.fixture
+def stale_entry():
+    """Cache POST_URL as an entry whose freshness window has passed."""
+    key = content_cache_key(POST_URL)
+    entry = CachedContent(dict(CACHED), {"etag": '"v1"'}, time.time() - 60)
+    content_cache._remember(key, entry)
+    reddit_session.reset()
+    yield key
+    content_cache.memory.delete(key)
+    reddit_session.reset()
+
+def run_against(handler, coro_fn):
+    requests = []
+
+    def record(request):
+        requests.append(request)
+        if request.url.path == "/":
+            return httpx.Response(200, headers={"set-cookie": "session=1; Path=/"})
+        return handler(request)
+
+    async def main():
+        original = http_client.client
+        http_client.client = httpx.AsyncClient(transport=httpx.MockTransport(record))
+        try:
+            return await coro_fn()
+        finally:
+            await http_client.client.aclose()
+            http_client.client = original
+
+    return asyncio.run(main()), [request for request in requests if request.url.path != "/"]
+
+def test_304_keeps_cached_body_and_extends_freshness(stale_entry):
+    def handler(request):
+        return httpx.Response(304, headers={"etag": '"v1"'})
+
+    not_modified = content_cache.not_modified
+    content, requests = run_against(handler, lambda: extract_url_content(POST_URL))
+
+    assert content == CACHED
+    assert len(requests) == 1
+    assert requests[0].url.path.endswith(".json")
+    assert requests[0].headers["if-none-match"] == '"v1"'
+    assert content_cache.not_modified == not_modified + 1
+
+    entry = asyncio.run(content_cache.lookup(stale_entry))
+    assert entry.is_fresh
+    assert entry.fresh_until > time.time() + content_cache.ttl_for_domain("www.reddit.com") - 60
+    assert entry.content == CACHED
+    assert entry.validators == {"etag": '"v1"'}
+
+def test_200_replaces_entry_and_validators(stale_entry):
+    def handler(request):
+        body = json.dumps(reddit_listing("New title", "New body")).encode()
+        return httpx.Response(200, content=body, headers={
+            "content-type": "application/json",
+            "etag": '"v2"',
+            "last-modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+        })
+
+    content, requests = run_against(handler, lambda: extract_url_content(POST_URL))
+
+    assert content["title"] == "New title"
+    assert content["text"] == "New body"
+    assert "cache_validators" not in content
+    assert requests[0].headers["if-none-match"] == '"v1"'
+
+    entry = asyncio.run(content_cache.lookup(stale_entry))
+    assert entry.is_fresh
+    assert entry.content["title"] == "New title"
+    assert entry.validators == {"etag": '"v2"', "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
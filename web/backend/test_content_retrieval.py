@@ -0,0 +1,245 @@
+"""
+Tests for content extraction: coalescing of concurrent extractions, image
+variant selection, bulk Reddit post lookups and listing requests.
+
+fetch_url_content is replaced by a stub that blocks until the test releases
+it, so several callers can be made to overlap on one in-flight extraction.
+Reddit's /api/info.json is served by an httpx MockTransport.
+"""
+import asyncio
+import itertools
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import app.services.content_retrieval as content_retrieval
+from app.main import app
+from app.services.content_cache import content_cache
+from app.services.content_retrieval import (
+    REDDIT_INFO_BATCH_SIZE,
+    content_cache_key,
+    extract_url_content,
+    fetch_reddit_posts,
+    reddit_gallery_item,
+    reddit_listing_request,
+    select_image_variant,
+)
+from app.services.reddit_session import reddit_session
+
+_url_ids = itertools.count()
+
+@pytest.fixture
+def url():
+    """A URL no other test has cached."""
+    url = f"https://example.com/article-{next(_url_ids)}"
+    yield url
+    content_cache.memory.delete(url)
+
+class StubFetch:
+    def __init__(self, error=None):
+        self.calls = 0
+        self.cancelled = False
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self, url, validators=None):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return {"url": url, "title": "Shared", "tags": ["a"]}
+
+async def start_waiters(url, count):
+    waiters = [asyncio.ensure_future(extract_url_content(url)) for _ in range(count)]
+    # Let every waiter reach the in-flight task
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return waiters
+
+def test_concurrent_extractions_share_one_fetch(monkeypatch, url):
+    async def main():
+        fetch = StubFetch()
+        monkeypatch.setattr(content_retrieval, "fetch_url_content", fetch)
+        waiters = await start_waiters(url, 5)
+        assert content_retrieval.get_inflight_stats()["in_flight"] == 1
+
+        fetch.release.set()
+        results = await asyncio.gather(*waiters)
+        return fetch, results
+
+    coalesced = content_retrieval.get_inflight_stats()["coalesced"]
+    fetch, results = asyncio.run(main())
+    assert fetch.calls == 1
+    assert all(result["title"] == "Shared" for result in results)
+    assert content_retrieval.get_inflight_stats() == {"in_flight": 0, "coalesced": coalesced + 4}
+
+    # Every waiter gets its own copy
+    results[0]["tags"].append("mutated")
+    assert results[1]["tags"] == ["a"]
+
+def test_cancelled_waiter_does_not_cancel_the_others(monkeypatch, url):
+    async def main():
+        fetch = StubFetch()
+        monkeypatch.setattr(content_retrieval, "fetch_url_content", fetch)
+        waiters = await start_waiters(url, 3)
+
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        fetch.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return fetch, results
+
+    fetch, results = asyncio.run(main())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert [result["title"] for result in results[1:]] == ["Shared", "Shared"]
+    assert fetch.calls == 1
+    assert not fetch.cancelled
+    assert content_retrieval.get_inflight_stats()["in_flight"] == 0
+
+def test_error_reaches_every_waiter(monkeypatch, url):
+    async def main():
+        fetch = StubFetch(error=RuntimeError("origin down"))
+        monkeypatch.setattr(content_retrieval, "fetch_url_content", fetch)
+        waiters = await start_waiters(url, 4)
+        fetch.release.set()
+        return fetch, await asyncio.gather(*waiters, return_exceptions=True)
+
+    fetch, results = asyncio.run(main())
+    assert fetch.calls == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "origin down" for result in results)
+    assert content_retrieval.get_inflight_stats()["in_flight"] == 0
+
+    # A failed extraction isn't remembered; the next call fetches again
+    async def retry():
+        fetch = StubFetch()
+        fetch.release.set()
+        monkeypatch.setattr(content_retrieval, "fetch_url_content", fetch)
+        return fetch, await extract_url_content(url)
+
+    fetch, result = asyncio.run(retry())
+    assert fetch.calls == 1
+    assert result["title"] == "Shared"
+
+# Landscape 3:2 image in Reddit's usual preview widths
+VARIANTS = [
+    {"url": f"https://preview.redd.it/a.jpg?width={width}", "width": width, "height": width * 2 // 3}
+    for width in (108, 216, 320, 640, 960, 1080, 3000)
+]
+
+def test_select_image_variant_smallest_covering_target():
+    # Fitted into a 1080x1920 frame the image is shown 1080 wide
+    assert select_image_variant(VARIANTS, 1080, 1920)["width"] == 1080
+    assert select_image_variant(VARIANTS, 600, 1000)["width"] == 640
+    # A landscape frame limits by height: 400 * 1.5 = 600 wide
+    assert select_image_variant(VARIANTS, 1920, 400)["width"] == 640
+    # Order of the input doesn't matter
+    assert select_image_variant(list(reversed(VARIANTS)), 300, 1000)["width"] == 320
+
+def test_select_image_variant_falls_back_to_largest():
+    small = VARIANTS[:3]
+    assert select_image_variant(small, 1080, 1920)["width"] == 320
+
+def test_select_image_variant_missing_variants():
+    assert select_image_variant([], 1080, 1920) is None
+    assert select_image_variant([None], 1080, 1920) is None
+    # Without sizes there is nothing to compare; the first known variant is used
+    unsized = [None, {"url": "https://i.redd.it/a.jpg", "width": None, "height": None}]
+    assert select_image_variant(unsized, 1080, 1920)["url"] == "https://i.redd.it/a.jpg"
+
+def test_reddit_gallery_item_variants():
+    metadata = {
+        "e": "Image",
+        "m": "image/jpg",
+        "s": {"u": "https://preview.redd.it/x.jpg?width=2000&amp;s=src", "x": 2000, "y": 3000},
+        "p": [
+            {"u": "https://preview.redd.it/x.jpg?width=640&amp;s=a", "x": 640, "y": 960},
+            {"u": "https://preview.redd.it/x.jpg?width=1080&amp;s=b", "x": 1080, "y": 1620},
+        ],
+    }
+    item = reddit_gallery_item("x", metadata, 1080, 1920)
+    assert item["url"] == "https://preview.redd.it/x.jpg?width=1080&s=b"
+    assert item["source_url"] == "https://preview.redd.it/x.jpg?width=2000&s=src"
+    assert len(item["variants"]) == 3
+
+    # Items Reddit hasn't processed yet have no variants at all
+    assert reddit_gallery_item("y", {"status": "unprocessed"}, 1080, 1920) is None
+
+def post_url(post_id):
+    return f"https://www.reddit.com/r/pics/comments/{post_id}/title/"
+
+def test_fetch_reddit_posts_batches_ids_and_keeps_input_order():
+    post_ids = [f"p{i:04d}" for i in range(2 * REDDIT_INFO_BATCH_SIZE + 50)]
+    missing = {"p0003", "p0150", "p0249"}
+    # Input order differs from ID order, includes a URL that isn't a post and a duplicate post
+    urls = [post_url(post_id) for post_id in reversed(post_ids)]
+    urls.insert(10, "https://www.reddit.com/r/pics/")
+    urls.append("https://old.reddit.com/r/pics/comments/p0007/title/")
+    info_requests = []
+
+    def handler(request):
+        if request.url.path == "/":
+            return httpx.Response(200)
+        ids = parse_qs(urlparse(str(request.url)).query)["id"][0].split(",")
+        info_requests.append(ids)
+        children = [
+            {"kind": "t3", "data": {"id": full_id[3:], "title": f"Post {full_id[3:]}", "selftext": "", "author": "a"}}
+            for full_id in ids if full_id[3:] not in missing
+        ]
+        return httpx.Response(200, json={"data": {"children": children}})
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch_reddit_posts(urls, client)
+
+    reddit_session.reset()
+    try:
+        results = asyncio.run(main())
+    finally:
+        reddit_session.reset()
+        for url in urls:
+            content_cache.memory.delete(content_cache_key(url))
+
+    assert [len(ids) for ids in info_requests] == [REDDIT_INFO_BATCH_SIZE, REDDIT_INFO_BATCH_SIZE, 50]
+    assert sorted(full_id[3:] for ids in info_requests for full_id in ids) == post_ids
+
+    assert list(results) == urls
+    assert results["https://www.reddit.com/r/pics/"] is None
+    for post_id in post_ids:
+        result = results[post_url(post_id)]
+        if post_id in missing:
+            assert result is None
+        else:
+            assert result["title"] == f"Post {post_id}"
+    assert results[urls[-1]]["title"] == "Post p0007"
+
+def test_reddit_listing_request_builds_listing_and_search_urls():
+    assert reddit_listing_request(subreddit="r/pics", sort="top", time_filter="week") == (
+        "https://www.reddit.com/r/pics/top.json", {"t": "week"},
+    )
+    assert reddit_listing_request(subreddit="AskReddit", sort="relevance", query="cats") == (
+        "https://www.reddit.com/r/AskReddit/search.json", {"q": "cats", "restrict_sr": "1", "sort": "relevance"},
+    )
+
+@pytest.mark.parametrize("subreddit,sort,query", [
+    ("pics", "best", None),
+    ("pics", "../../api/me", None),
+    ("pics", "rising", "cats"),
+    ("../api", "hot", None),
+    ("pics/comments", "hot", None),
+    ("p", "hot", None),
+    ("a" * 22, "hot", None),
+])
+def test_reddit_listing_request_rejects_invalid_subreddit_or_sort(subreddit, sort, query):
+    with pytest.raises(ValueError):
+        reddit_listing_request(subreddit=subreddit, sort=sort, query=query)
+
+def test_listing_endpoint_rejects_invalid_parameters_with_400():
+    client = TestClient(app)
+    assert client.get("/api/v1/content/listing", params={"subreddit": "pics", "sort": "best"}).status_code == 400
+    assert client.get("/api/v1/content/listing", params={"subreddit": "pics/../api"}).status_code == 400
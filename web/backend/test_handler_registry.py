@@ -0,0 +1,66 @@
+"""
+Tests for domain handler lookup and deadlines.
+"""
+import asyncio
+
+from app.services.content_retrieval import handler_registry
+from app.services.handler_registry import DomainHandler, HandlerRegistry
+
+async def no_op(url, client, validators, context):
+    return {"url": url}
+
+def make_registry():
+    registry = HandlerRegistry()
+    registry.register(DomainHandler("reddit", ["reddit.com", "redd.it"], no_op))
+    registry.register(DomainHandler("old-reddit", ["old.reddit.com"], no_op))
+    registry.register(DomainHandler("generic", [], no_op), default=True)
+    return registry
+
+def test_resolve_matches_domain_suffixes():
+    registry = make_registry()
+    assert registry.resolve("reddit.com").name == "reddit"
+    assert registry.resolve("www.reddit.com").name == "reddit"
+    assert registry.resolve("WWW.Reddit.COM:443").name == "reddit"
+    assert registry.resolve("i.redd.it").name == "reddit"
+    # The longest registered suffix wins
+    assert registry.resolve("old.reddit.com").name == "old-reddit"
+    assert registry.resolve("np.old.reddit.com").name == "old-reddit"
+
+def test_resolve_falls_back_to_default():
+    registry = make_registry()
+    assert registry.resolve("example.com").name == "generic"
+    assert registry.resolve("notreddit.com").name == "generic"
+    assert registry.resolve("").name == "generic"
+    assert HandlerRegistry().resolve("example.com") is None
+
+def test_application_registry_routes_reddit_and_others():
+    assert handler_registry.resolve("www.reddit.com") is not handler_registry.default
+    assert handler_registry.resolve("example.com") is handler_registry.default
+
+def test_run_returns_partial_result_on_timeout():
+    async def slow(url, client, validators, context):
+        context.publish({"url": url, "title": "Known so far"})
+        await asyncio.sleep(10)
+        return {"url": url, "title": "Complete"}
+
+    handler = DomainHandler("slow", ["slow.example.com"], slow, timeout=0.05)
+    result = asyncio.run(HandlerRegistry().run(handler, "https://slow.example.com/a", None))
+    assert result == {"url": "https://slow.example.com/a", "title": "Known so far", "partial": True}
+    assert handler.timeouts == 1
+    assert handler.partial_results == 1
+    assert handler.in_flight == 0
+
+def test_run_returns_none_on_timeout_without_partial():
+    async def silent(url, client, validators, context):
+        await asyncio.sleep(10)
+
+    handler = DomainHandler("silent", ["silent.example.com"], silent, timeout=0.05)
+    assert asyncio.run(HandlerRegistry().run(handler, "https://silent.example.com/a", None)) is None
+    assert handler.timeouts == 1
+    assert handler.partial_results == 0
+
+def test_run_returns_complete_result_in_time():
+    handler = DomainHandler("fast", ["fast.example.com"], no_op, timeout=1)
+    assert asyncio.run(HandlerRegistry().run(handler, "https://fast.example.com/a", None)) == {"url": "https://fast.example.com/a"}
+    assert handler.calls == 1
+    assert handler.timeouts == 0
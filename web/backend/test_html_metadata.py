@@ -0,0 +1,112 @@
+"""
+Tests for the streaming page metadata parser and content sniffing.
+"""
+import asyncio
+
+import httpx
+
+from app.services.content_retrieval import handle_generic_url
+from app.services.html_metadata import (
+    CHARSET_PRESCAN_BYTES,
+    StreamingMetadataExtractor,
+    sniff_content_kind,
+)
+
+PAGE = (
+    b"<!DOCTYPE html><html><head>"
+    b"<title>  Plain\n  title </title>"
+    b'<meta property="og:title" content="OpenGraph title">'
+    b'<meta name="description" content="A description">'
+    b'<meta property="og:image" content="/images/cover.jpg">'
+    b'<link rel="alternate" type="application/json+oembed" href="https://example.com/oembed?url=x">'
+    b"</head><body>" + b"<p>body text</p>" * 200 + b"</body></html>"
+)
+
+def feed_in_chunks(extractor, data, size):
+    for start in range(0, len(data), size):
+        if extractor.feed(data[start:start + size]):
+            return True
+    extractor.finish()
+    return False
+
+def test_head_split_across_chunks():
+    extractor = StreamingMetadataExtractor("text/html; charset=utf-8", 1_000_000)
+    assert feed_in_chunks(extractor, PAGE, 7)
+    assert extractor.done and not extractor.truncated
+    # Reading stopped at the end of the head, not the end of the page
+    assert extractor.bytes_read < PAGE.index(b"<body>") + 7
+
+    metadata = extractor.parser.metadata("https://example.com/articles/1")
+    assert metadata["title"] == "OpenGraph title"
+    assert metadata["description"] == "A description"
+    assert metadata["thumbnail_url"] == "https://example.com/images/cover.jpg"
+    assert metadata["oembed_url"] == "https://example.com/oembed?url=x"
+    assert extractor.parser.title == "Plain title"
+
+def test_meta_charset_decodes_non_utf8_page():
+    page = '<html><head><meta charset="windows-1252"><title>Café – naïve</title></head><body></body></html>'
+    extractor = StreamingMetadataExtractor("text/html", 1_000_000)
+    feed_in_chunks(extractor, page.encode("windows-1252"), 16)
+    assert extractor.done
+    assert extractor.charset == "windows-1252"
+    assert extractor.parser.title == "Café – naïve"
+
+def test_http_equiv_charset_and_header_precedence():
+    page = (
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-1">'
+        "<title>Résumé</title></head><body></body></html>"
+    ).encode("iso-8859-1")
+    extractor = StreamingMetadataExtractor("text/html", 1_000_000)
+    feed_in_chunks(extractor, page, 1000)
+    assert extractor.parser.title == "Résumé"
+
+    # A charset in the Content-Type header wins over the page's own declaration
+    page = '<html><head><meta charset="iso-8859-1"><title>Résumé</title></head>'.encode("utf-8")
+    extractor = StreamingMetadataExtractor("text/html; charset=utf-8", 1_000_000)
+    feed_in_chunks(extractor, page, 1000)
+    assert extractor.parser.title == "Résumé"
+
+def test_short_page_without_head_end_is_parsed_on_finish():
+    page = "<title>Only a title</title>".encode()
+    assert len(page) < CHARSET_PRESCAN_BYTES
+    extractor = StreamingMetadataExtractor("text/html", 1_000_000)
+    assert not extractor.feed(page)
+    assert extractor.parser.title is None
+    extractor.finish()
+    assert extractor.parser.title == "Only a title"
+
+def test_stops_at_byte_cap():
+    page = b"<html><head><title>Endless</title>" + b"<meta name='x' content='y'>" * 1000
+    extractor = StreamingMetadataExtractor("text/html", 500)
+    assert feed_in_chunks(extractor, page, 64)
+    assert extractor.bytes_read == 500
+    assert extractor.truncated
+    assert extractor.parser.title == "Endless"
+    # Nothing more is taken once the cap is reached
+    assert extractor.feed(b"<title>Later</title>")
+    assert extractor.bytes_read == 500
+
+def test_sniff_content_kind_by_magic_number():
+    assert sniff_content_kind("text/html", b"\x89PNG\r\n\x1a\n" + bytes(16)) == "image"
+    assert sniff_content_kind("application/octet-stream", b"\xff\xd8\xff\xe0" + bytes(16)) == "image"
+    assert sniff_content_kind("", b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image"
+    assert sniff_content_kind("text/html", b"\x00\x00\x00\x18ftypmp42") == "video"
+    assert sniff_content_kind("text/html", b"%PDF-1.7") == "binary"
+    assert sniff_content_kind("", b"  <!DOCTYPE html><html>") == "html"
+    assert sniff_content_kind("application/json", b"{}") == "other"
+
+def test_generic_url_does_not_parse_binary_served_as_html():
+    png = b"\x89PNG\r\n\x1a\n" + bytes(4096)
+
+    def handler(request):
+        return httpx.Response(200, content=png, headers={"content-type": "text/html"})
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await handle_generic_url("https://files.example.com/download/cover.png", client)
+
+    result = asyncio.run(main())
+    assert result["has_media"]
+    assert result["media_type"] == "image"
+    assert result["title"] == "cover.png"
+    assert "bytes_read" not in result
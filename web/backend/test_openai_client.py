@@ -0,0 +1,187 @@
+"""
+Tests for retries, backoff headers and deadlines in the shared OpenAI client,
+for plain and streamed completions.
+
+The AsyncOpenAI client is replaced by a fake whose chat.completions.create
+replays a scripted sequence of errors and responses.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.core.config import settings
+from app.core.openai_client import openai_client, parse_reset_duration, retry_delay_from_headers
+
+API_URL = "https://api.openai.com/v1/chat/completions"
+
+def api_error(error_class, status_code, headers=None):
+    response = httpx.Response(status_code, headers=headers or {}, request=httpx.Request("POST", API_URL))
+    return error_class(f"{status_code} from the API", response=response, body=None)
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", API_URL))
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+class FakeStream:
+    """A streamed completion that yields deltas and then optionally fails."""
+
+    def __init__(self, deltas, error=None):
+        self.deltas = deltas
+        self.error = error
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for delta in self.deltas:
+            yield chunk(delta)
+        if self.error:
+            raise self.error
+
+    async def close(self):
+        self.closed = True
+
+class FakeCompletions:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+class FakeClient:
+    def __init__(self, outcomes):
+        self.chat = SimpleNamespace(completions=FakeCompletions(outcomes))
+
+    def is_closed(self):
+        return False
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Install a fake AsyncOpenAI client with near-zero backoff."""
+    monkeypatch.setattr(settings, "OPENAI_BACKOFF_BASE_SECONDS", 0.001)
+    original = openai_client.client
+
+    def install(outcomes):
+        openai_client.client = FakeClient(outcomes)
+        return openai_client.client.chat.completions
+
+    yield install
+    openai_client.client = original
+
+def test_retry_delay_from_headers():
+    assert retry_delay_from_headers(httpx.Headers({"retry-after-ms": "250"})) == 0.25
+    assert retry_delay_from_headers(httpx.Headers({"retry-after": "3"})) == 3.0
+    # retry-after-ms is the more precise of the two
+    assert retry_delay_from_headers(httpx.Headers({"retry-after-ms": "1500", "retry-after": "2"})) == 1.5
+    assert retry_delay_from_headers(httpx.Headers({"retry-after-ms": "soon", "retry-after": "2"})) == 2.0
+    assert retry_delay_from_headers(httpx.Headers({
+        "x-ratelimit-reset-requests": "20ms",
+        "x-ratelimit-reset-tokens": "6m0s",
+    })) == 360.0
+    assert retry_delay_from_headers(httpx.Headers({})) is None
+    assert retry_delay_from_headers(None) is None
+
+def test_parse_reset_duration():
+    assert parse_reset_duration("1s") == 1.0
+    assert parse_reset_duration("1m30.5s") == 90.5
+    assert parse_reset_duration("250ms") == 0.25
+    assert parse_reset_duration("") is None
+    assert parse_reset_duration("later") is None
+
+def test_chat_completion_retries_retryable_errors(fake_openai):
+    completions = fake_openai([
+        api_error(openai.RateLimitError, 429, {"retry-after-ms": "1"}),
+        connection_error(),
+        "completion",
+    ])
+    retries = openai_client.retries
+    assert asyncio.run(openai_client.chat_completion(model="m", messages=[])) == "completion"
+    assert len(completions.calls) == 3
+    assert openai_client.retries == retries + 2
+
+def test_chat_completion_does_not_retry_client_errors(fake_openai):
+    completions = fake_openai([api_error(openai.BadRequestError, 400), "completion"])
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(openai_client.chat_completion(model="m", messages=[]))
+    assert len(completions.calls) == 1
+
+def test_chat_completion_gives_up_when_retry_would_pass_deadline(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_DEADLINE_SECONDS", 5.0)
+    completions = fake_openai([api_error(openai.RateLimitError, 429, {"retry-after": "30"}), "completion"])
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(openai_client.chat_completion(model="m", messages=[]))
+    assert len(completions.calls) == 1
+
+def test_chat_completion_attempt_timeout_respects_deadline(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_DEADLINE_SECONDS", 10.0)
+    completions = fake_openai(["completion"])
+    asyncio.run(openai_client.chat_completion(model="m", messages=[], timeout=30))
+    assert completions.calls[0]["timeout"] <= 10.0
+
+def test_chat_completion_stops_after_max_retries(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_MAX_RETRIES", 2)
+    completions = fake_openai([connection_error() for _ in range(5)])
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(openai_client.chat_completion(model="m", messages=[]))
+    assert len(completions.calls) == 3
+
+def collect_stream():
+    async def main():
+        deltas = []
+        async for delta in openai_client.stream_chat_completion(model="m", messages=[]):
+            deltas.append(delta)
+        return deltas
+    return asyncio.run(main())
+
+def test_stream_retries_error_before_first_delta(fake_openai):
+    failed_stream = FakeStream([None, ""], error=connection_error())
+    completions = fake_openai([
+        api_error(openai.RateLimitError, 429, {"retry-after-ms": "1"}),
+        failed_stream,
+        FakeStream(["Hello", " world"]),
+    ])
+    assert collect_stream() == ["Hello", " world"]
+    assert len(completions.calls) == 3
+    assert all(call["stream"] for call in completions.calls)
+    assert failed_stream.closed
+
+def test_stream_does_not_retry_after_first_delta(fake_openai):
+    completions = fake_openai([
+        FakeStream(["Hello"], error=connection_error()),
+        FakeStream(["Hello", " again"]),
+    ])
+    received = []
+
+    async def main():
+        async for delta in openai_client.stream_chat_completion(model="m", messages=[]):
+            received.append(delta)
+
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(main())
+    assert received == ["Hello"]
+    assert len(completions.calls) == 1
+
+def test_closing_stream_early_closes_upstream(fake_openai):
+    stream = FakeStream(["one", "two", "three"])
+    fake_openai([stream])
+
+    async def main():
+        deltas = openai_client.stream_chat_completion(model="m", messages=[])
+        first = await deltas.__anext__()
+        await deltas.aclose()
+        return first
+
+    assert asyncio.run(main()) == "one"
+    assert stream.closed
+    assert openai_client.in_flight == 0
@@ -0,0 +1,112 @@
+"""
+Tests for the per-domain token buckets and 429/Retry-After handling.
+
+The rate limiter module's clock is replaced by a fake one so refill and
+blocking can be checked without sleeping.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+import app.services.rate_limiter as rate_limiter_module
+from app.core.http_client import parse_retry_after
+from app.services.rate_limiter import DomainBucket, RateLimiter
+
+@pytest.fixture
+def clock(fake_clock):
+    return fake_clock(rate_limiter_module)
+
+def test_bucket_allows_burst_then_refills(clock):
+    # One request per second, bursts of two
+    bucket = DomainBucket("example.com", 60, burst=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 1.0
+    assert bucket.throttled == 1
+
+    # The queued request's token comes back first, then the bucket refills up to its capacity
+    clock.now += 10
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 1.0
+
+def test_429_halves_rate_and_blocks_for_retry_after(clock):
+    bucket = DomainBucket("example.com", 60, burst=5)
+    bucket.record_response(httpx.Response(429, headers={"retry-after": "7"}))
+    assert bucket.rate_limited == 1
+    assert bucket.rate == bucket.max_rate / 2
+    assert bucket.reserve() == 7.0
+
+    clock.now += 7
+    assert bucket.reserve() == 0
+
+    # Successes without rate-limit headers creep back up to the configured rate
+    for _ in range(10):
+        bucket.record_response(httpx.Response(200))
+    assert bucket.rate == bucket.max_rate
+
+def test_ratelimit_headers_set_rate_and_block(clock):
+    bucket = DomainBucket("example.com", 600, burst=5)
+    bucket.record_response(httpx.Response(200, headers={"x-ratelimit-remaining": "20", "x-ratelimit-reset": "40"}))
+    assert bucket.rate == 0.5
+
+    bucket.record_response(httpx.Response(200, headers={"x-ratelimit-remaining": "0", "x-ratelimit-reset": "12"}))
+    assert bucket.reserve() == 12.0
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-4") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+def test_domain_key_uses_configured_suffix_or_full_host():
+    limiter = RateLimiter()
+    limiter.configure("reddit.com", 60)
+    assert limiter.domain_key("https://www.reddit.com/r/pics") == "reddit.com"
+    assert limiter.domain_key("https://old.reddit.com/") == "reddit.com"
+    # Unconfigured sites under a public suffix get their own buckets
+    assert limiter.domain_key("https://www.bbc.co.uk/news") == "www.bbc.co.uk"
+    assert limiter.domain_key("https://www.theguardian.co.uk/") == "www.theguardian.co.uk"
+
+def run_requests(limiter, statuses, retry_after="0"):
+    calls = []
+
+    def handler(request):
+        status = statuses[min(len(calls), len(statuses) - 1)]
+        calls.append(request)
+        return httpx.Response(status, headers={"retry-after": retry_after} if status == 429 else {})
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await limiter.get(client, "https://api.example.com/items")
+    return asyncio.run(main()), calls
+
+def test_request_retries_429_with_retry_after():
+    limiter = RateLimiter()
+    response, calls = run_requests(limiter, [429, 429, 200])
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert limiter.buckets["api.example.com"].rate_limited == 2
+
+def test_request_returns_last_429_when_retries_run_out():
+    limiter = RateLimiter()
+    limiter.max_retries = 1
+    response, calls = run_requests(limiter, [429])
+    assert response.status_code == 429
+    assert len(calls) == 2
+
+def test_backoff_delay_prefers_retry_after_capped_at_max():
+    limiter = RateLimiter()
+    assert limiter.backoff_delay(0, httpx.Response(429, headers={"retry-after": "2"})) == 2.0
+    assert limiter.backoff_delay(0, httpx.Response(429, headers={"retry-after": "3600"})) == limiter.backoff_max
+    for attempt in range(10):
+        delay = limiter.backoff_delay(attempt, httpx.Response(503))
+        assert 0 <= delay <= min(limiter.backoff_max, limiter.backoff_base * 2 ** attempt)
@@ -0,0 +1,85 @@
+"""
+Tests for priming and refreshing the shared Reddit session.
+
+Reddit is replaced by an httpx MockTransport that scripts the homepage and
+post responses for each test.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.rate_limiter import rate_limiter
+from app.services.reddit_session import REDDIT_HOME_URL, reddit_session
+
+POST_URL = "https://www.reddit.com/r/pics/comments/abc123/title.json"
+
+@pytest.fixture(autouse=True)
+def fresh_session(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "max_retries", 0)
+    # Keep throttling from one test out of the next
+    monkeypatch.setattr(rate_limiter, "buckets", {})
+    reddit_session.reset()
+    yield
+    reddit_session.reset()
+
+def run_get(home_responses, post_responses):
+    """GET POST_URL through the session, answering from the scripted responses in order."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        responses = home_responses if request.url.path == "/" else post_responses
+        outcome = responses.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await reddit_session.get(client, POST_URL, {})
+
+    return asyncio.run(main()), requests
+
+def home(status_code=200, cookie="session=1"):
+    return httpx.Response(status_code, headers={"set-cookie": f"{cookie}; Path=/"})
+
+def test_prime_stores_cookies_on_success():
+    response, requests = run_get([home()], [httpx.Response(200)])
+    assert response.status_code == 200
+    assert str(requests[0].url) == REDDIT_HOME_URL
+    assert requests[1].headers["cookie"] == "session=1"
+    assert reddit_session.is_valid()
+
+def test_prime_ignores_non_2xx_homepage():
+    response, requests = run_get([home(503, cookie="blocked=1")], [httpx.Response(200)])
+    assert response.status_code == 200
+    assert len(requests) == 2
+    assert not reddit_session.is_valid()
+    assert len(reddit_session.cookies.jar) == 0
+
+def test_403_refreshes_session_and_retries():
+    response, requests = run_get(
+        [home(cookie="session=old"), home(cookie="session=new")],
+        [httpx.Response(403), httpx.Response(200)],
+    )
+    assert response.status_code == 200
+    assert [request.url.path for request in requests] == ["/", POST_URL[22:], "/", POST_URL[22:]]
+    assert requests[3].headers["cookie"] == "session=new"
+
+def test_failed_refresh_returns_original_response():
+    connect_error = httpx.ConnectError("reddit unreachable")
+    response, requests = run_get([home(), connect_error], [httpx.Response(403)])
+    assert response.status_code == 403
+    assert len(requests) == 3
+
+def test_unsuccessful_refresh_does_not_retry():
+    response, requests = run_get([home(), home(503)], [httpx.Response(403)])
+    assert response.status_code == 403
+    assert len(requests) == 3
+
+def test_429_is_not_retried_by_the_session():
+    response, requests = run_get([home()], [httpx.Response(429)])
+    assert response.status_code == 429
+    # The rate limiter owns 429 retries; the session adds no refresh or retry of its own
+    assert len(requests) == 2
@@ -0,0 +1,69 @@
+"""
+Tests for the server-sent events of the streaming rewrite endpoint.
+
+stream_rewrite_text is replaced by a generator replaying scripted deltas, so
+only the event framing and the final done / error events are exercised.
+"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.ai as ai_api
+from app.main import app
+
+client = TestClient(app)
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+@pytest.fixture
+def scripted_stream(monkeypatch):
+    """Replace the rewrite stream with one yielding the given deltas."""
+    def install(deltas, error=None):
+        async def stream_rewrite_text(text, style="engaging", max_length=None, force_refresh=False):
+            for delta in deltas:
+                yield delta
+            if error:
+                raise error
+        monkeypatch.setattr(ai_api, "stream_rewrite_text", stream_rewrite_text)
+    return install
+
+def post_stream(text="A story about a cat."):
+    response = client.post(
+        "/api/v1/ai/rewrite/stream",
+        json={"text": text, "style": "engaging", "force_refresh": True},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.text)
+
+def test_stream_ends_with_done_event(scripted_stream):
+    scripted_stream(["A cat ", "saves ", "the day."])
+    events = post_stream()
+    assert [name for name, _ in events] == ["token", "token", "token", "done"]
+    assert [data["text"] for _, data in events[:-1]] == ["A cat ", "saves ", "the day."]
+    assert events[-1][1] == {
+        "original": "A story about a cat.",
+        "rewritten": "A cat saves the day.",
+        "character_count": len("A cat saves the day."),
+    }
+
+def test_stream_ends_with_error_event_on_empty_completion(scripted_stream):
+    scripted_stream([" ", "\n"])
+    events = post_stream()
+    assert events[-1][0] == "error"
+    assert all(name != "done" for name, _ in events)
+
+def test_stream_ends_with_error_event_on_failure(scripted_stream):
+    scripted_stream(["A cat "], error=RuntimeError("upstream failed"))
+    events = post_stream()
+    assert [name for name, _ in events] == ["token", "error"]
+
+def test_stream_rejects_blank_text():
+    response = client.post("/api/v1/ai/rewrite/stream", json={"text": "   "})
+    assert response.status_code == 422
@@ -0,0 +1,115 @@
+"""
+Tests for scheduling and backoff in the scene refresher.
+
+MongoDB is replaced by a fake projects collection that returns canned due
+scenes from aggregate() and records the bulk_write operations.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.core.database import db
+from app.services.scene_refresher import (
+    SceneRefresher,
+    scene_refresh_due_at,
+    scene_retry_at,
+    stamp_scene_sources,
+)
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+class FakeProjects:
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipelines = []
+        self.operations = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeCursor(self.docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+class FakeDatabase:
+    def __init__(self, projects):
+        self.projects = projects
+
+def run_with_projects(projects, refresher, sources):
+    async def fetch_sources(urls):
+        return {url: sources.get(url) for url in urls}
+    refresher._fetch_sources = fetch_sources
+
+    original_client, original_mock = db.client, db.is_mock
+    db.client, db.is_mock = {db.db_name: FakeDatabase(projects)}, False
+    try:
+        return asyncio.run(refresher.run_once())
+    finally:
+        db.client, db.is_mock = original_client, original_mock
+
+def test_run_once_reschedules_refreshed_and_backs_off_failed_scenes():
+    ok_url = "https://www.reddit.com/r/pics/comments/abc123/title/"
+    gone_url = "https://www.reddit.com/r/pics/comments/gone42/title/"
+    projects = FakeProjects([
+        {"_id": "p1", "scene_index": 0, "scenes": {"url": ok_url}},
+        {"_id": "p1", "scene_index": 3, "scenes": {"url": gone_url, "source_refresh_attempts": 1}},
+    ])
+    before = datetime.utcnow()
+    result = run_with_projects(projects, SceneRefresher(), {ok_url: {"score": 42, "title": "ignored"}})
+    assert result == {"due": 2, "refreshed": 1, "failed": 1}
+
+    # Due scenes are selected by the query, not by scanning projects in Python
+    assert projects.pipelines[0][-1] == {"$limit": settings.SCENE_REFRESH_BATCH_SIZE}
+
+    refreshed, failed = (operation._doc["$set"] for operation in projects.operations)
+    assert refreshed["scenes.0.score"] == 42
+    assert "scenes.0.title" not in refreshed
+    assert refreshed["scenes.0.source_refresh_attempts"] == 0
+    assert refreshed["scenes.0.source_fetched_at"] >= before
+    assert refreshed["scenes.0.source_refresh_due_at"] >= before + timedelta(seconds=settings.SCENE_REFRESH_MAX_AGE_SECONDS)
+
+    # The failed attempt is recorded and the scene is retried later, not on the next run
+    attempted_at = failed["scenes.3.source_refresh_attempted_at"]
+    assert failed["scenes.3.source_refresh_attempts"] == 2
+    assert failed["scenes.3.source_refresh_due_at"] == attempted_at + timedelta(seconds=2 * settings.SCENE_REFRESH_RETRY_SECONDS)
+    assert "scenes.3.source_fetched_at" not in failed
+
+def test_retry_backoff_is_capped():
+    now = datetime(2024, 1, 1)
+    assert scene_retry_at(1, now) == now + timedelta(seconds=settings.SCENE_REFRESH_RETRY_SECONDS)
+    assert scene_retry_at(50, now) == now + timedelta(seconds=settings.SCENE_REFRESH_MAX_BACKOFF_SECONDS)
+
+def test_due_at_follows_media_expiry_but_not_sooner_than_retry_delay():
+    now = datetime(2024, 1, 1)
+    epoch = (now - datetime(1970, 1, 1)).total_seconds()
+
+    expires_in_a_day = {"media_url": f"https://cdn.example.com/a.jpg?expires={int(epoch + 86400)}"}
+    assert scene_refresh_due_at(expires_in_a_day, now, now) == min(
+        now + timedelta(seconds=settings.SCENE_REFRESH_MAX_AGE_SECONDS),
+        now + timedelta(seconds=86400 - settings.SCENE_REFRESH_EXPIRY_MARGIN_SECONDS),
+    )
+
+    # New media that already expires within the margin doesn't make the scene due on every run
+    expires_soon = {"media_url": f"https://cdn.example.com/a.jpg?expires={int(epoch + 60)}"}
+    assert scene_refresh_due_at(expires_soon, now, now) == now + timedelta(seconds=settings.SCENE_REFRESH_RETRY_SECONDS)
+
+def test_stamp_scene_sources_on_save():
+    now = datetime(2024, 1, 1)
+    scenes = stamp_scene_sources([
+        {"url": "https://example.com/new"},
+        {"url": "https://example.com/old", "source_fetched_at": "2023-12-31T20:00:00"},
+        {"text_content": "no source"},
+    ], now)
+    assert scenes[0]["source_fetched_at"] == now
+    assert scenes[0]["source_refresh_due_at"] == now + timedelta(seconds=settings.SCENE_REFRESH_MAX_AGE_SECONDS)
+    assert scenes[1]["source_fetched_at"] == datetime(2023, 12, 31, 20)
+    assert "source_refresh_due_at" not in scenes[2]
@@ -0,0 +1,71 @@
+"""
+Tests for token budgeting and local max_length enforcement.
+
+The heuristic tests force the character heuristic by replacing the
+encoding lookup, so they behave the same with or without tiktoken.
+"""
+import math
+
+import pytest
+
+import app.services.token_budget as token_budget
+from app.core.config import settings
+from app.services.token_budget import (
+    HEURISTIC_CHARS_PER_TOKEN,
+    completion_token_budget,
+    count_tokens,
+    trim_to_length,
+    truncate_to_tokens,
+)
+
+MODEL = "gpt-3.5-turbo"
+TEXT = "First sentence is here. Second one follows it. Third sentence runs on and on without stopping"
+
+@pytest.fixture
+def heuristic(monkeypatch):
+    monkeypatch.setattr(token_budget, "_encoding_for", lambda model: None)
+
+def test_heuristic_count(heuristic):
+    assert count_tokens("a" * 10, MODEL) == math.ceil(10 / HEURISTIC_CHARS_PER_TOKEN)
+    assert count_tokens("", MODEL) == 0
+
+def test_truncate_keeps_text_that_fits(heuristic):
+    assert truncate_to_tokens(TEXT, 1000, MODEL) == TEXT
+
+def test_truncate_ends_on_sentence_or_word(heuristic):
+    # 51 characters: the second sentence ends within the last 20%
+    assert truncate_to_tokens(TEXT, 17, MODEL) == "First sentence is here. Second one follows it."
+    # 60 characters: no sentence end late enough, so the cut falls back to the last word
+    assert truncate_to_tokens(TEXT, 20, MODEL) == "First sentence is here. Second one follows it. Third"
+    for max_tokens in (5, 10, 17, 20, 25):
+        assert len(truncate_to_tokens(TEXT, max_tokens, MODEL)) <= max_tokens * HEURISTIC_CHARS_PER_TOKEN
+
+def test_truncate_with_tiktoken():
+    encoding = token_budget._encoding_for(MODEL)
+    if encoding is None:
+        pytest.skip("tiktoken or its encoding is not available")
+    truncated = truncate_to_tokens(TEXT, 12, MODEL)
+    assert len(encoding.encode(truncated)) <= 12
+    assert TEXT.startswith(truncated)
+
+def test_completion_token_budget():
+    assert completion_token_budget(None) == settings.REWRITE_MAX_OUTPUT_TOKENS
+    assert completion_token_budget(0) == settings.REWRITE_MAX_OUTPUT_TOKENS
+    assert completion_token_budget(300) == math.ceil(300 / 3.0 * 1.2) + 16
+    assert completion_token_budget(1000) < completion_token_budget(2000)
+    assert completion_token_budget(10 ** 6) == settings.REWRITE_MAX_OUTPUT_TOKENS
+
+def test_trim_to_length_leaves_short_text():
+    assert trim_to_length("  Short text.  ", 100) == "Short text."
+    assert trim_to_length(TEXT, None) == TEXT
+
+def test_trim_to_length_prefers_sentence_end():
+    assert trim_to_length(TEXT, 30) == "First sentence is here."
+    assert trim_to_length(TEXT, 70) == "First sentence is here. Second one follows it."
+
+def test_trim_to_length_falls_back_to_word_boundary():
+    # No sentence end; the dangling comma goes with the cut word
+    assert trim_to_length("Alpha beta, gamma delta epsilon", 18) == "Alpha beta, gamma"
+    assert trim_to_length("Alpha beta, gamma delta epsilon", 12) == "Alpha beta"
+    # A single long word can only be cut mid-word
+    assert trim_to_length("Supercalifragilisticexpialidocious", 10) == "Supercalif"
@@ -0,0 +1,38 @@
+"""
+Tests for building preview cards from Reddit posts.
+"""
+from app.services.url_preview import reddit_preview_from_post
+
+def gallery_metadata(name):
+    return {
+        "status": "valid",
+        "e": "Image",
+        "m": "image/jpg",
+        "s": {"u": f"https://preview.redd.it/{name}.jpg?width=1200&amp;s=src", "x": 1200, "y": 800},
+        "p": [{"u": f"https://preview.redd.it/{name}.jpg?width=640&amp;s=p", "x": 640, "y": 427}],
+    }
+
+def test_gallery_thumbnail_uses_first_item_in_gallery_order():
+    post = {
+        "title": "Gallery",
+        # Keyed in a different order than the gallery is shown in
+        "media_metadata": {
+            "last": gallery_metadata("last"),
+            "pending": {"status": "unprocessed"},
+            "first": gallery_metadata("first"),
+        },
+        "gallery_data": {"items": [{"media_id": "missing"}, {"media_id": "pending"}, {"media_id": "first"}, {"media_id": "last"}]},
+        "thumbnail": "https://b.thumbs.redditmedia.com/fallback.jpg",
+    }
+    preview = reddit_preview_from_post(post, "https://www.reddit.com/gallery/abc123")
+    assert preview["thumbnail"].startswith("https://preview.redd.it/first.jpg")
+
+def test_gallery_without_usable_items_falls_back_to_thumbnail():
+    post = {
+        "title": "Gallery",
+        "media_metadata": {"pending": {"status": "unprocessed"}},
+        "gallery_data": {"items": [{"media_id": "pending"}]},
+        "thumbnail": "https://b.thumbs.redditmedia.com/fallback.jpg",
+    }
+    preview = reddit_preview_from_post(post, "https://www.reddit.com/gallery/abc123")
+    assert preview["thumbnail"] == "https://b.thumbs.redditmedia.com/fallback.jpg"
@@ -0,0 +1,308 @@
+"""
+Tests for streaming voice generation against a stub TTS server.
+
+The stub speaks the ElevenLabs streaming endpoint and streams canned MP3
+frames with small pauses in between, so the tests can check that audio is
+written and yielded while the response is still arriving.
+"""
+import asyncio
+import json
+import math
+import os
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.core.http_client import http_client
+from app.services.tts_cache import tts_cache
+from app.services.audio_frames import concat_mp3
+from app.services.voice_generation import (
+    VoiceGenerationError,
+    generate_voice,
+    generate_voice_with_timings,
+    iter_voice_chunks,
+    split_script,
+)
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames
+MP3_HEADER = b"\xff\xfb\x90\x64"
+MP3_FRAME = MP3_HEADER + bytes(413)
+FRAME_COUNT = 6
+FRAME_SECONDS = 1152 / 44100
+FRAME_DELAY_SECONDS = 0.05
+PCM_AUDIO = bytes(range(256)) * 8
+
+# Keep cached test audio out of the working tree
+pytestmark = pytest.mark.usefixtures("tmp_storage")
+
+def tagged_frames(text):
+    """Canned MP3 frames carrying the synthesized text, so joined audio can be checked for order."""
+    return (MP3_HEADER + text.encode()[:413].ljust(413, b"\0")) * FRAME_COUNT
+
+class StubTTSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+
+        if "/v1/text-to-speech/bad-voice/" in self.path:
+            payload = b'{"detail": "voice not found"}'
+            self.send_response(404)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        with self.server.lock:
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        try:
+            self.stream_audio(body["text"])
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def stream_audio(self, text):
+        pcm = "output_format=pcm_" in self.path
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/pcm" if pcm else "audio/mpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunks = [PCM_AUDIO[i:i + 512] for i in range(0, len(PCM_AUDIO), 512)] if pcm else [MP3_FRAME] * FRAME_COUNT
+        if text.startswith("Tagged"):
+            frames = tagged_frames(text)
+            chunks = [frames[i:i + 417] for i in range(0, len(frames), 417)]
+        for chunk in chunks:
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+            time.sleep(FRAME_DELAY_SECONDS)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+        self.server.finished_at = time.monotonic()
+
+class StubTTSServer:
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubTTSHandler)
+        self.server.requests = []
+        self.server.finished_at = None
+        self.server.lock = threading.Lock()
+        self.server.active = 0
+        self.server.max_active = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.original_base_url = settings.ELEVENLABS_BASE_URL
+        settings.ELEVENLABS_BASE_URL = f"http://127.0.0.1:{self.server.server_port}"
+        tts_cache.local_index.clear()
+        return self.server
+
+    def __exit__(self, *exc):
+        settings.ELEVENLABS_BASE_URL = self.original_base_url
+        self.server.shutdown()
+        self.server.server_close()
+
+def run(coro):
+    """Run a coroutine on a fresh event loop, closing the shared HTTP client afterwards."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await http_client.close()
+    return asyncio.run(main())
+
+def test_generate_voice_writes_streamed_audio():
+    with StubTTSServer() as server:
+        path = run(generate_voice("Hello there", voice_id="voice-1"))
+    try:
+        assert path is not None
+        with open(path, "rb") as f:
+            assert f.read() == MP3_FRAME * FRAME_COUNT
+
+        request = server.requests[0]
+        assert request["path"] == "/v1/text-to-speech/voice-1/stream?output_format=mp3_44100_128"
+        assert request["headers"]["xi-api-key"] == settings.ELEVENLABS_API_KEY
+        assert request["body"]["text"] == "Hello there"
+        assert request["body"]["model_id"] == settings.ELEVENLABS_MODEL_ID
+    finally:
+        os.remove(path)
+
+def test_iter_voice_chunks_yields_before_synthesis_finishes():
+    async def first_chunk_and_total():
+        first_chunk_at = None
+        total = b""
+        async for chunk in iter_voice_chunks("Hello there"):
+            if first_chunk_at is None:
+                first_chunk_at = time.monotonic()
+            total += chunk
+        return first_chunk_at, total
+
+    with StubTTSServer() as server:
+        first_chunk_at, total = run(first_chunk_and_total())
+        finished_at = server.finished_at
+
+    assert total == MP3_FRAME * FRAME_COUNT
+    # The first audio arrived well before the server sent the last frame
+    assert finished_at - first_chunk_at > FRAME_DELAY_SECONDS * (FRAME_COUNT - 2)
+
+def test_generate_voice_default_voice():
+    with StubTTSServer() as server:
+        path = run(generate_voice("Hello there"))
+    os.remove(path)
+    assert f"/v1/text-to-speech/{settings.ELEVENLABS_DEFAULT_VOICE_ID}/stream" in server.requests[0]["path"]
+
+def test_generate_voice_wav_has_patched_header():
+    with StubTTSServer():
+        path = run(generate_voice("Hello there", output_format="wav"))
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        assert data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+        assert struct.unpack("<I", data[4:8])[0] == 36 + len(PCM_AUDIO)
+        assert struct.unpack("<I", data[40:44])[0] == len(PCM_AUDIO)
+        assert struct.unpack("<I", data[24:28])[0] == 24000
+        assert data[44:] == PCM_AUDIO
+    finally:
+        os.remove(path)
+
+def test_generate_voice_returns_none_on_provider_error():
+    with StubTTSServer():
+        assert run(generate_voice("Hello there", voice_id="bad-voice")) is None
+
+def test_iter_voice_chunks_raises_provider_error():
+    async def consume():
+        async for _ in iter_voice_chunks("Hello there", voice_id="bad-voice"):
+            pass
+
+    with StubTTSServer():
+        try:
+            run(consume())
+        except VoiceGenerationError as e:
+            assert "404" in str(e)
+        else:
+            raise AssertionError("Expected VoiceGenerationError")
+
+def test_generate_voice_reuses_cached_audio():
+    with StubTTSServer() as server:
+        first = run(generate_voice("Scene one text.", voice_id="voice-1"))
+        # Differs only in whitespace, so it is the same audio
+        second = run(generate_voice("Scene  one text.\n", voice_id="voice-1"))
+        assert len(server.requests) == 1
+
+        other_voice = run(generate_voice("Scene one text.", voice_id="voice-2"))
+        assert len(server.requests) == 2
+
+        refreshed = run(generate_voice("Scene one text.", voice_id="voice-1", force_refresh=True))
+        assert len(server.requests) == 3
+    try:
+        with open(second, "rb") as f:
+            assert f.read() == MP3_FRAME * FRAME_COUNT
+        assert first != second
+    finally:
+        for path in (first, second, other_voice, refreshed):
+            os.remove(path)
+
+def test_tts_cache_evicts_least_recently_used():
+    original_max_bytes = tts_cache.max_bytes
+    # Room for two clips
+    tts_cache.max_bytes = len(MP3_FRAME) * FRAME_COUNT * 2
+    paths = []
+    try:
+        with StubTTSServer() as server:
+            paths.append(run(generate_voice("First scene.")))
+            paths.append(run(generate_voice("Second scene.")))
+            # Touch the first clip so the second becomes least recently used
+            paths.append(run(generate_voice("First scene.")))
+            paths.append(run(generate_voice("Third scene.")))
+            assert len(server.requests) == 3
+            assert len(tts_cache.local_index) == 2
+
+            paths.append(run(generate_voice("First scene.")))
+            assert len(server.requests) == 3
+            paths.append(run(generate_voice("Second scene.")))
+            assert len(server.requests) == 4
+    finally:
+        tts_cache.max_bytes = original_max_bytes
+        for path in paths:
+            os.remove(path)
+
+def test_split_script_packs_sentences_within_scenes():
+    script = "Tagged one. Tagged two. Tagged three.\n\nTagged four is a longer sentence here. Tagged five."
+    chunks = split_script(script, max_chars=25)
+    assert [(chunk["scene_index"], chunk["text"]) for chunk in chunks] == [
+        (0, "Tagged one. Tagged two."),
+        (0, "Tagged three."),
+        (1, "Tagged four is a longer"),
+        (1, "sentence here."),
+        (1, "Tagged five."),
+    ]
+    assert [chunk["index"] for chunk in chunks] == list(range(5))
+
+def test_generate_voice_with_timings_joins_chunks_in_order():
+    script = "Tagged alpha. Tagged bravo.\n\nTagged charlie. Tagged delta."
+    original_max_chars = settings.TTS_CHUNK_MAX_CHARS
+    settings.TTS_CHUNK_MAX_CHARS = 15
+    try:
+        with StubTTSServer() as server:
+            started = time.monotonic()
+            result = run(generate_voice_with_timings(script))
+            elapsed = time.monotonic() - started
+            max_active = server.max_active
+    finally:
+        settings.TTS_CHUNK_MAX_CHARS = original_max_chars
+
+    try:
+        texts = ["Tagged alpha.", "Tagged bravo.", "Tagged charlie.", "Tagged delta."]
+        with open(result["path"], "rb") as f:
+            assert f.read() == b"".join(tagged_frames(text) for text in texts)
+
+        # Chunks were synthesized concurrently, not one after another
+        assert max_active > 1
+        assert elapsed < 4 * FRAME_COUNT * FRAME_DELAY_SECONDS
+
+        assert [chunk["text"] for chunk in result["chunks"]] == texts
+        assert [chunk["start_seconds"] for chunk in result["chunks"]] == [round(i * FRAME_COUNT * FRAME_SECONDS, 3) for i in range(4)]
+        assert math.isclose(result["duration_seconds"], 4 * FRAME_COUNT * FRAME_SECONDS, abs_tol=0.001)
+        assert result["scenes"][0]["end_seconds"] == result["scenes"][1]["start_seconds"]
+        assert result["scenes"][0]["end_seconds"] == round(2 * FRAME_COUNT * FRAME_SECONDS, 3)
+    finally:
+        os.remove(result["path"])
+
+def test_concat_mp3_drops_tags_and_info_frames():
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x05" + b"\xff" * 5
+    # Side info for MPEG-1 joint stereo is 32 bytes, then the Info tag
+    info_frame = MP3_HEADER + bytes(32) + b"Info" + bytes(413 - 36)
+    id3v1 = b"TAG" + bytes(125)
+    part = id3 + info_frame + MP3_FRAME * 3 + id3v1
+
+    joined, durations = concat_mp3([part, part])
+    assert joined == MP3_FRAME * 6
+    assert [round(duration, 6) for duration in durations] == [round(3 * FRAME_SECONDS, 6)] * 2
+
+def test_generate_voice_survives_cache_write_failure():
+    original_set = tts_cache.set
+
+    async def failing_set(*args, **kwargs):
+        raise RuntimeError("storage unavailable")
+
+    tts_cache.set = failing_set
+    try:
+        with StubTTSServer():
+            path = run(generate_voice("Uncached scene."))
+    finally:
+        tts_cache.set = original_set
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == MP3_FRAME * FRAME_COUNT
+    finally:
+        os.remove(path)
+
+def test_generate_voice_skips_empty_text():
+    assert run(generate_voice("   ")) is None